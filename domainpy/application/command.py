@@ -1,7 +1,7 @@
 import datetime
 import functools
 
-from domainpy.utils.data import SystemData
+from domainpy.utils.data import SystemData, Validation
 from domainpy.utils.traceable import Traceable
 from domainpy.utils.contextualized import Contextualized
 
@@ -11,8 +11,11 @@ class ApplicationCommand(SystemData, Traceable, Contextualized):
     __version__: int
     __message__: str = "command"
 
+    # Commands enter from the edge, always type checked
+    __validation__ = Validation()
+
     class Struct(SystemData):
-        pass
+        __validation__ = Validation()
 
     @classmethod
     def stamp(cls, *, trace_id: str = None) -> functools.partial:
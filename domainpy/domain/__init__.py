@@ -1,4 +1,4 @@
-from .repository import IRepository
+from .repository import IRepository, IAsyncRepository
 from .service import IDomainService
 
-__all__ = ["IRepository", "IDomainService"]
+__all__ = ["IRepository", "IAsyncRepository", "IDomainService"]
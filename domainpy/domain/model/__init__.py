@@ -1,6 +1,16 @@
 from .aggregate import AggregateRoot, mutator
 from .entity import DomainEntity
 from .event import DomainEvent
+from .history import (
+    IEventHistory,
+    SeenEvents,
+    SeenRetention,
+    KeepAll,
+    KeepNone,
+    KeepLast,
+    KeepEventTypes,
+    KeepTraceWindow,
+)
 from .specification import Specification
 from .value_object import Identity, ValueObject
 from .exceptions import DomainError
@@ -10,6 +20,14 @@ __all__ = [
     "mutator",
     "DomainEntity",
     "DomainEvent",
+    "IEventHistory",
+    "SeenEvents",
+    "SeenRetention",
+    "KeepAll",
+    "KeepNone",
+    "KeepLast",
+    "KeepEventTypes",
+    "KeepTraceWindow",
     "Specification",
     "ValueObject",
     "Identity",
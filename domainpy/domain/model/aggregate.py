@@ -2,9 +2,17 @@ from __future__ import annotations
 
 import typing
 import functools
+import itertools
+import collections.abc
 
 from domainpy.domain.model.entity import DomainEntity
 from domainpy.domain.model.event import DomainEvent
+from domainpy.domain.model.history import (
+    EventTypes,
+    IEventHistory,
+    KeepAll,
+    SeenEvents,
+)
 from domainpy.domain.model.value_object import Identity
 from domainpy.exceptions import (
     DefinitionError,
@@ -13,16 +21,86 @@ from domainpy.exceptions import (
 
 
 class AggregateRoot(DomainEntity):
+    # Not annotated, annotations of aggregates are its state fields
+    __retention__ = KeepAll()
+
     def __init__(self, identity: Identity):
         super().__init__(identity, self)
 
         self.__version__: int = 0
         self.__changes__: typing.List[DomainEvent] = []  # New events
-        self.__seen__: typing.List[DomainEvent] = []  # Routed events (mutated)
+        self.__seen__ = SeenEvents()  # Routed events (mutated)
+        self.__routed__: int = 0  # Routed events, snapshots excluded
+        # Number of first routed event, earlier ones are in a snapshot
+        self.__routed_from__: typing.Optional[int] = None
+
+        # Stored events, set by repository
+        self.__history__: typing.Optional[IEventHistory] = None
 
     @property
     def __selector__(self):
-        return Selector(e for e in self.__seen__)
+        return Selector(self.__seen__, aggregate=self)
+
+    def __covers__(
+        self,
+        *,
+        trace_id: typing.Optional[str] = None,
+        event_type: typing.Optional[EventTypes] = None,
+    ) -> bool:
+        # Seen events answer the query if every event since the first
+        # routed one was routed here and retention kept what the query
+        # needs, events in a snapshot are never queried
+        routed_from = self.__routed_from__
+        if routed_from is not None and (
+            self.__routed__ != self.__version__ - routed_from + 1
+        ):
+            return False
+
+        if len(self.__seen__) == self.__routed__:
+            return True
+
+        return self.__retention__.covers(
+            self.__seen__, trace_id=trace_id, event_type=event_type
+        )
+
+    def __lookup__(
+        self,
+        *,
+        trace_id: typing.Optional[str] = None,
+        event_type: typing.Optional[EventTypes] = None,
+    ) -> typing.List[DomainEvent]:
+        # Stored events merged with retained and new ones
+        stream_id = self.create_stream_id(self.__identity__)
+
+        found: typing.Dict[int, DomainEvent] = {}
+        if self.__history__ is not None:
+            events = self.__history__.get_events(
+                trace_id=trace_id,
+                event_type=event_type,
+                from_number=self.__routed_from__,
+            )
+            found.update((e.__number__, e) for e in events)
+
+        # Seen events are narrowed by their indexes
+        seen: typing.Iterable[DomainEvent] = self.__seen__
+        if trace_id is not None:
+            seen = self.__seen__.get_trace(trace_id)
+        elif event_type is not None:
+            seen = self.__seen__.get_types(event_type)
+
+        for event in itertools.chain(seen, self.__changes__):
+            if event.__stream_id__ != stream_id:
+                continue
+
+            if trace_id is not None and event.__trace_id__ != trace_id:
+                continue
+
+            if event_type is not None and not isinstance(event, event_type):
+                continue
+
+            found[event.__number__] = event
+
+        return [found[n] for n in sorted(found)]
 
     def __stamp__(self, event_type: typing.Type[DomainEvent]):
         return event_type.stamp(
@@ -36,7 +114,8 @@ class AggregateRoot(DomainEntity):
         self.__changes__.append(event)
 
     def __route__(self, event: DomainEvent, **kwargs):
-        if kwargs.pop("is_snapshot", False):
+        is_snapshot = kwargs.pop("is_snapshot", False)
+        if is_snapshot:
             self.__version__ = event.__number__ - 1
 
         next_version = self.__version__ + 1
@@ -45,7 +124,13 @@ class AggregateRoot(DomainEntity):
             raise VersionError(next_version, event.__number__)
 
         self.__version__ = next_version
-        self.__seen__.append(event)
+        if not is_snapshot:
+            if self.__routed_from__ is None:
+                self.__routed_from__ = next_version
+
+            self.__routed__ += 1
+
+        self.__retention__.retain(self.__seen__, event)
 
         self.mutate(event)
 
@@ -71,8 +156,57 @@ class AggregateRoot(DomainEntity):
 TDomainEvent = typing.TypeVar("TDomainEvent", bound=DomainEvent)
 
 
-class Selector(tuple):
+class Selector(collections.abc.Sequence):
+    # Selector of an aggregate answers queries from the indexes of seen
+    # events, and queries its history for events that were not retained
+
+    def __init__(
+        self,
+        events: typing.Iterable[DomainEvent] = (),
+        *,
+        aggregate: AggregateRoot = None,
+    ):
+        # Seen events are a view, not copied
+        self.__events__: typing.Union[
+            SeenEvents, typing.Tuple[DomainEvent, ...]
+        ]
+        if isinstance(events, SeenEvents):
+            self.__events__ = events
+        else:
+            self.__events__ = tuple(events)
+
+        self.__aggregate__ = aggregate
+
+    def __len__(self) -> int:
+        return len(self.__events__)
+
+    def __iter__(self) -> typing.Iterator[DomainEvent]:
+        return iter(self.__events__)
+
+    def __getitem__(self, index):
+        return self.__events__[index]
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (Selector, tuple, list)):
+            return tuple(self) == tuple(other)
+
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(tuple(self))
+
+    def __repr__(self) -> str:  # pragma: no cover
+        return f"{self.__class__.__name__}({tuple(self)})"
+
     def filter_trace(self, trace_id: str) -> Selector:
+        aggregate = self.__aggregate__
+        if aggregate is not None:
+            if not aggregate.__covers__(trace_id=trace_id):
+                return Selector(aggregate.__lookup__(trace_id=trace_id))
+
+            if isinstance(self.__events__, SeenEvents):
+                return Selector(self.__events__.get_trace(trace_id))
+
         return Selector([e for e in self if e.__trace_id__ == trace_id])
 
     def filter_event_type(
@@ -81,6 +215,14 @@ class Selector(tuple):
             typing.Type[TDomainEvent], typing.Tuple[typing.Type[TDomainEvent]]
         ],
     ) -> Selector:
+        aggregate = self.__aggregate__
+        if aggregate is not None:
+            if not aggregate.__covers__(event_type=event_type):
+                return Selector(aggregate.__lookup__(event_type=event_type))
+
+            if isinstance(self.__events__, SeenEvents):
+                return Selector(self.__events__.get_types(event_type))
+
         return Selector([e for e in self if isinstance(e, event_type)])
 
     def get_events_for_compensation(
@@ -92,20 +234,16 @@ class Selector(tuple):
         return_event: typing.Union[
             typing.Type[TDomainEvent], typing.Tuple[typing.Type[TDomainEvent]]
         ],
-    ) -> typing.Tuple[TDomainEvent, ...]:
-        # fmt: off
-        compensation_events = (
-            self
-            .filter_trace(trace_id)
-            .filter_event_type(empty_if_has_event)
-        )
-        # fmt: on
+    ) -> typing.Sequence[TDomainEvent]:
+        traced = self.filter_trace(trace_id)
+
+        compensation_events = traced.filter_event_type(empty_if_has_event)
         compensated = len(compensation_events) > 0
 
         if compensated:
             return ()
 
-        return self.filter_trace(trace_id).filter_event_type(return_event)
+        return traced.filter_event_type(return_event)
 
 
 class mutator:  # pylint: disable=invalid-name
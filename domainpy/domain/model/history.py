@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import abc
+import heapq
+import bisect
+import typing
+import operator
+
+from domainpy.domain.model.event import DomainEvent
+
+EventTypes = typing.Union[
+    typing.Type[DomainEvent], typing.Tuple[typing.Type[DomainEvent], ...]
+]
+
+
+class IEventHistory(abc.ABC):
+    # Stored events of one aggregate, queried when not retained in memory
+
+    @abc.abstractmethod
+    def get_events(
+        self,
+        *,
+        trace_id: typing.Optional[str] = None,
+        event_type: typing.Optional[EventTypes] = None,
+        from_number: typing.Optional[int] = None,
+    ) -> typing.Iterable[DomainEvent]:
+        pass  # pragma: no cover
+
+
+_number = operator.attrgetter("__number__")
+
+
+class SeenEvents:
+    # Routed events in order, indexed by trace id and by event class,
+    # queries take time of its result
+
+    def __init__(self, events: typing.Iterable[DomainEvent] = ()) -> None:
+        self._events: typing.Dict[int, DomainEvent] = {}
+        # Numbers in order, for positional access
+        self._numbers: typing.List[int] = []
+        self._traces: typing.Dict[
+            typing.Optional[str], typing.Dict[int, DomainEvent]
+        ] = {}
+        self._classes: typing.Dict[type, typing.Dict[int, DomainEvent]] = {}
+
+        for event in events:
+            self.append(event)
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def __iter__(self) -> typing.Iterator[DomainEvent]:
+        return iter(self._events.values())
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._events[n] for n in self._numbers[index]]
+
+        return self._events[self._numbers[index]]
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (SeenEvents, list, tuple)):
+            return list(self) == list(other)
+
+        return NotImplemented
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self) -> str:  # pragma: no cover
+        return f"{self.__class__.__name__}({list(self)})"
+
+    @property
+    def traces(self) -> typing.KeysView[typing.Optional[str]]:
+        # In order of first retained event
+        return self._traces.keys()
+
+    def first(self) -> typing.Optional[DomainEvent]:
+        if len(self._numbers) == 0:
+            return None
+
+        return self._events[self._numbers[0]]
+
+    def last(self) -> typing.Optional[DomainEvent]:
+        if len(self._numbers) == 0:
+            return None
+
+        return self._events[self._numbers[-1]]
+
+    def append(self, event: DomainEvent) -> None:
+        # Events are routed in number order
+        number = event.__number__
+
+        self._events[number] = event
+        self._numbers.append(number)
+        self._traces.setdefault(event.__trace_id__, {})[number] = event
+        self._classes.setdefault(event.__class__, {})[number] = event
+
+    def remove(self, event: DomainEvent) -> None:
+        number = event.__number__
+
+        del self._events[number]
+        del self._numbers[bisect.bisect_left(self._numbers, number)]
+        _discard(self._traces, event.__trace_id__, number)
+        _discard(self._classes, event.__class__, number)
+
+    def copy(self) -> SeenEvents:
+        # Events are immutable, only containers are copied
+        seen = SeenEvents()
+        seen._events = dict(self._events)
+        seen._numbers = list(self._numbers)
+        seen._traces = {k: dict(g) for k, g in self._traces.items()}
+        seen._classes = {k: dict(g) for k, g in self._classes.items()}
+        return seen
+
+    def remove_trace(self, trace_id: typing.Optional[str]) -> None:
+        for event in list(self._traces.get(trace_id, {}).values()):
+            self.remove(event)
+
+    def get_trace(
+        self, trace_id: typing.Optional[str]
+    ) -> typing.List[DomainEvent]:
+        return list(self._traces.get(trace_id, {}).values())
+
+    def get_types(self, event_type: EventTypes) -> typing.List[DomainEvent]:
+        # Classes are few, subclasses are found scanning them
+        groups = [
+            g.values()
+            for c, g in self._classes.items()
+            if issubclass(c, event_type)
+        ]
+        if len(groups) == 1:
+            return list(groups[0])
+
+        return list(heapq.merge(*groups, key=_number))
+
+
+def _discard(
+    index: typing.Dict[typing.Any, typing.Dict[int, DomainEvent]],
+    key: typing.Any,
+    number: int,
+) -> None:
+    group = index[key]
+    del group[number]
+    if len(group) == 0:
+        del index[key]
+
+
+class SeenRetention(abc.ABC):
+    # Which routed events an aggregate keeps in __seen__
+
+    @abc.abstractmethod
+    def retain(self, seen: SeenEvents, event: DomainEvent) -> None:
+        pass  # pragma: no cover
+
+    def covers(
+        self,
+        seen: SeenEvents,
+        *,
+        trace_id: typing.Optional[str] = None,
+        event_type: typing.Optional[EventTypes] = None,
+    ) -> bool:
+        # Whether retained events answer the query, even if some
+        # events were dropped
+        return False
+
+
+class KeepAll(SeenRetention):
+    def retain(self, seen: SeenEvents, event: DomainEvent) -> None:
+        seen.append(event)
+
+    def covers(
+        self,
+        seen: SeenEvents,
+        *,
+        trace_id: typing.Optional[str] = None,
+        event_type: typing.Optional[EventTypes] = None,
+    ) -> bool:
+        return True
+
+
+class KeepNone(SeenRetention):
+    def retain(self, seen: SeenEvents, event: DomainEvent) -> None:
+        pass
+
+
+class KeepLast(SeenRetention):
+    def __init__(self, n: int) -> None:
+        self.n = n
+
+    def retain(self, seen: SeenEvents, event: DomainEvent) -> None:
+        seen.append(event)
+        if len(seen) > self.n:
+            seen.remove(typing.cast(DomainEvent, seen.first()))
+
+
+class KeepEventTypes(SeenRetention):
+    def __init__(self, *event_types: typing.Type[DomainEvent]) -> None:
+        self.event_types = event_types
+
+    def retain(self, seen: SeenEvents, event: DomainEvent) -> None:
+        if isinstance(event, self.event_types):
+            seen.append(event)
+
+    def covers(
+        self,
+        seen: SeenEvents,
+        *,
+        trace_id: typing.Optional[str] = None,
+        event_type: typing.Optional[EventTypes] = None,
+    ) -> bool:
+        if event_type is None:
+            return False
+
+        if not isinstance(event_type, tuple):
+            event_type = (event_type,)
+
+        return all(issubclass(t, self.event_types) for t in event_type)
+
+
+class KeepTraceWindow(SeenRetention):
+    # Events of the n most recent traces, older traces are dropped whole
+
+    def __init__(self, n: int) -> None:
+        self.n = n
+
+    def retain(self, seen: SeenEvents, event: DomainEvent) -> None:
+        seen.append(event)
+
+        if len(seen.traces) > self.n:
+            seen.remove_trace(next(iter(seen.traces)))
+
+    def covers(
+        self,
+        seen: SeenEvents,
+        *,
+        trace_id: typing.Optional[str] = None,
+        event_type: typing.Optional[EventTypes] = None,
+    ) -> bool:
+        if trace_id is None:
+            return False
+
+        return trace_id in seen.traces
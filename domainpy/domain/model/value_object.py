@@ -9,8 +9,8 @@ class ValueObject(SystemData):
 
 
 class MetaIdentity(MetaSystemData):
-    def __new__(cls, name, bases, dct):
-        new_cls = super().__new__(cls, name, bases, dct)
+    def __new__(cls, name, bases, dct, **kwargs):
+        new_cls = super().__new__(cls, name, bases, dct, **kwargs)
 
         if not hasattr(new_cls, "__annotations__"):
             raise DefinitionError(
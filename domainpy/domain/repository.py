@@ -23,3 +23,19 @@ class IRepository(typing.Generic[TAggregateRoot, TIdentity], abc.ABC):
     @abc.abstractmethod
     def attach(self, subscriber: ISubscriber) -> None:
         pass  # pragma: no cover
+
+
+class IAsyncRepository(typing.Generic[TAggregateRoot, TIdentity], abc.ABC):
+    @abc.abstractmethod
+    async def save(self, aggregate: TAggregateRoot) -> None:
+        pass  # pragma: no cover
+
+    @abc.abstractmethod
+    async def get(
+        self, identity: typing.Union[TIdentity, str]
+    ) -> typing.Optional[TAggregateRoot]:
+        pass  # pragma: no cover
+
+    @abc.abstractmethod
+    def attach(self, subscriber: ISubscriber) -> None:
+        pass  # pragma: no cover
@@ -1,11 +1,49 @@
-from .eventsourced.eventstore import EventStore
-from .eventsourced.recordmanager import EventRecordManager
+from .eventsourced.eventstore import (
+    EventStore,
+    EventStoreHistory,
+    AsyncEventStore,
+)
+from .eventsourced.recordmanager import (
+    EventRecordManager,
+    AsyncEventRecordManager,
+    RecordBatch,
+)
 from .eventsourced.eventstream import EventStream
-from .eventsourced.managers.dynamodb import DynamoDBEventRecordManager
-from .eventsourced.managers.memory import MemoryEventRecordManager
+from .eventsourced.managers.dynamodb import (
+    DynamoDBEventRecordManager,
+    AsyncDynamoDBEventRecordManager,
+    UnprocessedItemsError,
+)
+from .eventsourced.managers.memory import (
+    MemoryEventRecordManager,
+    AsyncMemoryEventRecordManager,
+)
+from .eventsourced.managers.sqlite import SQLiteEventRecordManager
+from .eventsourced.managers.file import FileEventRecordManager
+from .eventsourced.cache import AggregateCache
+from .eventsourced.snapshot import (
+    ReplayStats,
+    SnapshotPolicy,
+    EventCountPolicy,
+    EventTypePolicy,
+    ReplayTimePolicy,
+    ReplaySizePolicy,
+    AnyPolicy,
+    AllPolicy,
+)
+from .eventsourced.statesnapshot import (
+    AggregateSnapshot,
+    AggregateStateCodec,
+)
+from .eventsourced.snapshotwriter import (
+    SnapshotHint,
+    SnapshotWriter,
+    AsyncSnapshotWriter,
+)
 from .eventsourced.repository import (
     SnapshotConfiguration,
     make_adapter as make_eventsourced_repository_adapter,
+    make_async_adapter as make_async_eventsourced_repository_adapter,
 )
 from .idempotent import (
     Idempotency,
@@ -27,6 +65,11 @@ from .publishers.aws_sns import AwsSimpleNotificationServicePublisher
 from .publishers.aws_sqs import AwsSimpleQueueServicePublisher
 from .publishers.aws_sfn import AwsStepFunctionSchedulerPublisher
 from .records import CommandRecord, EventRecord, IntegrationRecord
+from .recordformat import (
+    RecordFormat,
+    JsonRecordFormat,
+    BinaryRecordFormat,
+)
 from .transcoder import (
     Transcoder,
     ICodec,
@@ -43,12 +86,36 @@ from .tracer.managers.memory import MemoryTraceStore, MemoryTraceSegmentStore
 
 __all__ = [
     "EventStore",
+    "EventStoreHistory",
+    "AsyncEventStore",
     "EventStream",
     "EventRecordManager",
+    "AsyncEventRecordManager",
+    "RecordBatch",
     "MemoryEventRecordManager",
+    "AsyncMemoryEventRecordManager",
     "DynamoDBEventRecordManager",
+    "AsyncDynamoDBEventRecordManager",
+    "UnprocessedItemsError",
+    "SQLiteEventRecordManager",
+    "FileEventRecordManager",
     "SnapshotConfiguration",
+    "AggregateCache",
+    "ReplayStats",
+    "SnapshotPolicy",
+    "EventCountPolicy",
+    "EventTypePolicy",
+    "ReplayTimePolicy",
+    "ReplaySizePolicy",
+    "AnyPolicy",
+    "AllPolicy",
+    "AggregateSnapshot",
+    "AggregateStateCodec",
+    "SnapshotHint",
+    "SnapshotWriter",
+    "AsyncSnapshotWriter",
     "make_eventsourced_repository_adapter",
+    "make_async_eventsourced_repository_adapter",
     "Idempotency",
     "IdempotencyRecordManager",
     "MemoryIdempotencyRecordManager",
@@ -78,4 +145,7 @@ __all__ = [
     "EventRecord",
     "record_asdict",
     "record_fromdict",
+    "RecordFormat",
+    "JsonRecordFormat",
+    "BinaryRecordFormat",
 ]
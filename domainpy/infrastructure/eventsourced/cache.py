@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import copy
+import time
+import typing
+import threading
+import collections
+
+from domainpy.domain.model.aggregate import AggregateRoot
+
+TAggregateRoot = typing.TypeVar("TAggregateRoot", bound=AggregateRoot)
+
+
+class AggregateCache:
+    # Hydrated aggregates by stream id, least recently used are evicted
+    # above max_size, entries older than ttl seconds are not returned
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: typing.Optional[float] = None,
+        *,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+
+        self._entries: collections.OrderedDict[
+            str, typing.Tuple[AggregateRoot, typing.Optional[float]]
+        ] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def pop(self, stream_id: str) -> typing.Optional[AggregateRoot]:
+        # Taken out while it is caught up, concurrent loads of same
+        # stream never share an instance
+        with self._lock:
+            entry = self._entries.pop(stream_id, None)
+
+        if entry is None:
+            return None
+
+        aggregate, expires_at = entry
+        if expires_at is not None and expires_at <= self.clock():
+            return None
+
+        return aggregate
+
+    def put(self, stream_id: str, aggregate: AggregateRoot) -> None:
+        expires_at = None
+        if self.ttl is not None:
+            expires_at = self.clock() + self.ttl
+
+        with self._lock:
+            self._entries[stream_id] = (aggregate, expires_at)
+            self._entries.move_to_end(stream_id)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, stream_id: str) -> None:
+        with self._lock:
+            self._entries.pop(stream_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_SHARED = frozenset(["__retention__", "__history__"])
+
+
+def copy_aggregate(aggregate: TAggregateRoot) -> TAggregateRoot:
+    # Events are immutable, shared instead of copied, as retention and
+    # history; only state fields are deep copied, entities of the copy
+    # point to the copy
+    cls = aggregate.__class__
+    copied = cls.__new__(cls)
+
+    memo: typing.Dict[int, typing.Any] = {id(aggregate): copied}
+    for name, value in aggregate.__dict__.items():
+        if name == "__seen__":
+            value = value.copy()
+        elif name == "__changes__":
+            value = list(value)
+        elif name not in _SHARED:
+            value = copy.deepcopy(value, memo)
+
+        copied.__dict__[name] = value
+
+    return copied
@@ -4,11 +4,14 @@ import datetime
 import typing
 
 from domainpy.domain.model.event import DomainEvent
+from domainpy.domain.model.history import EventTypes, IEventHistory
 from domainpy.infrastructure.eventsourced.eventstream import EventStream
 from domainpy.infrastructure.mappers import Mapper
+from domainpy.infrastructure.records import EventRecord
 
 if typing.TYPE_CHECKING:  # pragma: no cover
     from domainpy.infrastructure.eventsourced.recordmanager import (
+        AsyncEventRecordManager,
         EventRecordManager,
     )
     from domainpy.utils.bus import Bus
@@ -28,8 +31,8 @@ class EventStore:
 
     def store_events(self, stream: EventStream) -> None:
         with self.record_manager.session() as session:
-            for event in stream:
-                session.append(self.event_mapper.serialize(event))
+            for record in self.event_mapper.serialize_many(stream):
+                session.append(typing.cast(EventRecord, record))
 
             session.commit()
 
@@ -63,10 +66,319 @@ class EventStore:
             to_number=to_number,
         )
 
-        stream = EventStream()
-        for record in records:
-            stream.append(
-                typing.cast(DomainEvent, self.event_mapper.deserialize(record))
+        return EventStream(
+            typing.cast(
+                typing.Iterable[DomainEvent],
+                self.event_mapper.deserialize_many(records, stream=True),
+            )
+        )
+
+    def get_trace_events(
+        self, stream_id: str, trace_id: str, *, from_number: int = None
+    ) -> EventStream:
+        records = self.record_manager.get_trace_records(
+            stream_id, trace_id, from_number=from_number
+        )
+
+        return EventStream(
+            typing.cast(
+                typing.Iterable[DomainEvent],
+                self.event_mapper.deserialize_many(records, stream=True),
+            )
+        )
+
+    def get_last_event(
+        self,
+        stream_id: str,
+        *,
+        event_type: typing.Type[DomainEvent] = None,
+    ) -> typing.Optional[DomainEvent]:
+        topic: typing.Optional[str]
+
+        if event_type is not None:
+            topic = event_type.__name__
+        else:
+            topic = None
+
+        record = self.record_manager.get_last_record(stream_id, topic=topic)
+        if record is None:
+            return None
+
+        return typing.cast(DomainEvent, self.event_mapper.deserialize(record))
+
+    def get_last_events_many(
+        self, stream_ids: typing.Iterable[str]
+    ) -> typing.Dict[str, typing.Optional[DomainEvent]]:
+        records = self.record_manager.get_last_records_many(stream_ids)
+
+        return {
+            stream_id: (
+                None
+                if record is None
+                else typing.cast(
+                    DomainEvent, self.event_mapper.deserialize(record)
+                )
+            )
+            for stream_id, record in records.items()
+        }
+
+    def get_events_from_snapshot(
+        self, stream_id: str, snapshot_stream_id: str
+    ) -> typing.Tuple[typing.Optional[DomainEvent], EventStream]:
+        record_manager = self.record_manager
+        snapshot_record, records = record_manager.get_records_from_snapshot(
+            stream_id, snapshot_stream_id
+        )
+
+        snapshot = None
+        if snapshot_record is not None:
+            snapshot = typing.cast(
+                DomainEvent, self.event_mapper.deserialize(snapshot_record)
+            )
+
+        return snapshot, EventStream(
+            typing.cast(
+                typing.Iterable[DomainEvent],
+                self.event_mapper.deserialize_many(records, stream=True),
             )
+        )
+
+    def prune_stream(self, stream_id: str, *, retain: int) -> int:
+        # Keep only the newest retain records of stream
+        numbers = [
+            r.number for r in self.record_manager.get_records(stream_id)
+        ]
+        if len(numbers) <= retain:
+            return 0
 
-        return stream
+        pruned = numbers[: len(numbers) - retain]
+        self.record_manager.delete_records(stream_id, to_number=pruned[-1])
+        return len(pruned)
+
+    def get_events_many(
+        self,
+        stream_ids: typing.Iterable[str],
+        *,
+        event_type: typing.Type[DomainEvent] = None,
+        from_numbers: typing.Mapping[str, int] = None,
+    ) -> typing.Dict[str, EventStream]:
+        topic: typing.Optional[str]
+
+        if event_type is not None:
+            topic = event_type.__name__
+        else:
+            topic = None
+
+        records = self.record_manager.get_records_many(
+            stream_ids, topic=topic, from_numbers=from_numbers
+        )
+
+        return {
+            stream_id: EventStream(
+                typing.cast(
+                    typing.Iterable[DomainEvent],
+                    self.event_mapper.deserialize_many(
+                        stream_records, stream=True
+                    ),
+                )
+            )
+            for stream_id, stream_records in records.items()
+        }
+
+    def upcast_stream(self, stream_id: str, *, batch_size: int = 25) -> int:
+        # Rewrite stored records of stream to its latest version,
+        # each batch is commited in its own session
+        upcasted = 0
+
+        batch: typing.List[EventRecord] = []
+        for record in list(self.record_manager.get_records(stream_id)):
+            new_record = self.event_mapper.upcast(record)
+            if new_record is record:
+                continue
+
+            batch.append(typing.cast(EventRecord, new_record))
+            if len(batch) == batch_size:
+                upcasted += self._replace_records(batch)
+                batch = []
+
+        if len(batch) > 0:
+            upcasted += self._replace_records(batch)
+
+        return upcasted
+
+    def _replace_records(self, records: typing.List[EventRecord]) -> int:
+        with self.record_manager.session() as session:
+            for record in records:
+                session.replace(record)
+
+            session.commit()
+
+        return len(records)
+
+
+class EventStoreHistory(IEventHistory):
+    # Queries by trace are filtered by the record manager, queries by type
+    # read the topic of each registered subclass, topics are indexed by
+    # record managers
+
+    def __init__(self, event_store: EventStore, stream_id: str) -> None:
+        self.event_store = event_store
+        self.stream_id = stream_id
+
+    def get_events(
+        self,
+        *,
+        trace_id: typing.Optional[str] = None,
+        event_type: typing.Optional[EventTypes] = None,
+        from_number: typing.Optional[int] = None,
+    ) -> typing.List[DomainEvent]:
+        event_store = self.event_store
+        stream_id = self.stream_id
+
+        events: typing.List[DomainEvent] = []
+        if trace_id is not None:
+            events.extend(
+                event_store.get_trace_events(
+                    stream_id, trace_id, from_number=from_number
+                )
+            )
+        elif event_type is None:
+            events.extend(
+                event_store.get_events(stream_id, from_number=from_number)
+            )
+        else:
+            classes = event_store.event_mapper.get_subclasses(event_type)
+            for event_class in {c.__name__: c for c in classes}.values():
+                events.extend(
+                    event_store.get_events(
+                        stream_id,
+                        event_type=event_class,
+                        from_number=from_number,
+                    )
+                )
+
+            events.sort(key=lambda e: e.__number__)
+
+        if event_type is not None:
+            # Same topic may be registered in other context
+            events = [e for e in events if isinstance(e, event_type)]
+
+        return events
+
+
+class AsyncEventStore:
+    def __init__(
+        self,
+        event_mapper: Mapper,
+        record_manager: AsyncEventRecordManager,
+        *,
+        bus: Bus = None,
+    ) -> None:
+        self.event_mapper = event_mapper
+        self.record_manager = record_manager
+        self.bus = bus
+
+    async def store_events(self, stream: EventStream) -> None:
+        async with self.record_manager.session() as session:
+            for record in self.event_mapper.serialize_many(stream):
+                session.append(typing.cast(EventRecord, record))
+
+            await session.commit()
+
+        if self.bus is not None:
+            for event in stream:
+                self.bus.publish(event)
+
+    async def get_events(
+        self,
+        stream_id: str,
+        *,
+        event_type: typing.Type[DomainEvent] = None,
+        from_timestamp: datetime.datetime = None,
+        to_timestamp: datetime.datetime = None,
+        from_number: int = None,
+        to_number: int = None,
+    ) -> EventStream:
+        topic: typing.Optional[str]
+
+        if event_type is not None:
+            topic = event_type.__name__
+        else:
+            topic = None
+
+        records = [
+            record
+            async for record in self.record_manager.get_records(
+                stream_id=stream_id,
+                topic=topic,
+                from_timestamp=from_timestamp,
+                to_timestamp=to_timestamp,
+                from_number=from_number,
+                to_number=to_number,
+            )
+        ]
+
+        return EventStream(
+            typing.cast(
+                typing.Iterable[DomainEvent],
+                self.event_mapper.deserialize_many(records, stream=True),
+            )
+        )
+
+    async def get_last_event(
+        self,
+        stream_id: str,
+        *,
+        event_type: typing.Type[DomainEvent] = None,
+    ) -> typing.Optional[DomainEvent]:
+        topic: typing.Optional[str]
+
+        if event_type is not None:
+            topic = event_type.__name__
+        else:
+            topic = None
+
+        record = await self.record_manager.get_last_record(
+            stream_id, topic=topic
+        )
+        if record is None:
+            return None
+
+        return typing.cast(DomainEvent, self.event_mapper.deserialize(record))
+
+    async def get_events_from_snapshot(
+        self, stream_id: str, snapshot_stream_id: str
+    ) -> typing.Tuple[typing.Optional[DomainEvent], EventStream]:
+        record_manager = self.record_manager
+        (
+            snapshot_record,
+            records,
+        ) = await record_manager.get_records_from_snapshot(
+            stream_id, snapshot_stream_id
+        )
+
+        snapshot = None
+        if snapshot_record is not None:
+            snapshot = typing.cast(
+                DomainEvent, self.event_mapper.deserialize(snapshot_record)
+            )
+
+        return snapshot, EventStream(
+            typing.cast(
+                typing.Iterable[DomainEvent],
+                self.event_mapper.deserialize_many(records, stream=True),
+            )
+        )
+
+    async def prune_stream(self, stream_id: str, *, retain: int) -> int:
+        numbers = [
+            r.number async for r in self.record_manager.get_records(stream_id)
+        ]
+        if len(numbers) <= retain:
+            return 0
+
+        pruned = numbers[: len(numbers) - retain]
+        await self.record_manager.delete_records(
+            stream_id, to_number=pruned[-1]
+        )
+        return len(pruned)
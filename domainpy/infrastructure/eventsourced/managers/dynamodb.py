@@ -1,27 +1,57 @@
+import time
+import random
 import typing
+import asyncio
 import datetime
+import dataclasses
+import concurrent.futures
 import boto3  # type: ignore
 
 from domainpy.exceptions import ConcurrencyError
 from domainpy.infrastructure.eventsourced.recordmanager import (
+    AsyncEventRecordManager,
+    AsyncSession,
     EventRecordManager,
+    RecordBatch,
     Session,
 )
 from domainpy.infrastructure.records import EventRecord
-from domainpy.utils.dynamodb import client_deserialize as deserialize
-from domainpy.utils.dynamodb import client_serialize as serialize
+from domainpy.infrastructure.recordformat import (
+    BinaryRecordFormat,
+    SchemaMismatchError,
+)
+from domainpy.utils.dynamodb import get_record_plan
 
 
-class DynamoDBEventRecordManager(EventRecordManager):
-    def __init__(self, table_name, **kwargs):
-        self.table_name = table_name
+_LOG_COUNTER_KEY = {"shard": {"N": "-1"}, "position": {"N": "0"}}
 
-        self.client = boto3.client("dynamodb", **kwargs)
+# Items of one TransactWriteItems request
+_MAX_TRANSACT_ITEMS = 100
 
-    def session(self):
-        return DynamoSession(self)
 
-    def get_records(
+class UnprocessedItemsError(Exception):
+    pass
+
+
+# Partition of binary payload schemas, sort key is the schema id
+_SCHEMAS_STREAM_ID = "__schemas__"
+
+
+class DynamoDBItemCodec:
+    # Item layout and requests, shared by sync and async managers
+    table_name: str
+    record_format: typing.Optional[BinaryRecordFormat]
+    page_size: typing.Optional[int]
+
+    # Ids of payload schemas known to be in the table
+    stored_schemas: typing.Set[int]
+
+    # Streams ending with suffix are stored in the partition of the
+    # stream they snapshot, at sort key number + 0.5 and flagged, so a
+    # reverse query meets events after a snapshot before the snapshot
+    snapshot_suffix: typing.Optional[str] = None
+
+    def query_params(
         self,
         stream_id: str,
         *,
@@ -30,38 +60,65 @@ class DynamoDBEventRecordManager(EventRecordManager):
         to_timestamp: datetime.datetime = None,
         from_number: int = None,
         to_number: int = None,
-    ) -> typing.Generator[EventRecord, None, None]:
+        trace_id: str = None,
+        attributes: typing.Sequence[str] = None,
+    ) -> dict:
+        # Number range is part of key condition, only the range is read
         key_conditions_expressions = []
         filter_expressions = []
+        expression_attribute_names = {}
         expression_attribute_values = {}
 
         key_conditions_expressions.append("stream_id = :stream_id")
-        expression_attribute_values.update({":stream_id": {"S": stream_id}})
+        expression_attribute_values.update(
+            {":stream_id": {"S": self.partition_of(stream_id)}}
+        )
 
-        if topic is not None:
-            filter_expressions.append("topic = :topic")
-            expression_attribute_values.update({":topic": {"S": topic}})
+        if self.snapshot_suffix is not None:
+            if self.is_colocated(stream_id):
+                filter_expressions.append("attribute_exists(snapshot)")
+            else:
+                filter_expressions.append("attribute_not_exists(snapshot)")
+
+        if from_number is not None and to_number is not None:
+            key_conditions_expressions.append(
+                "#number BETWEEN :from_number AND :to_number"
+            )
+        elif from_number is not None:
+            key_conditions_expressions.append("#number >= :from_number")
+        elif to_number is not None:
+            key_conditions_expressions.append("#number <= :to_number")
 
         if from_number is not None:
-            filter_expressions.append("number >= :from_numer")
+            expression_attribute_names.update({"#number": "number"})
             expression_attribute_values.update(
-                {":from_numer": {"N": str(from_number)}}
+                {":from_number": {"N": str(from_number)}}
             )
 
         if to_number is not None:
-            filter_expressions.append("number <= :to_number")
+            expression_attribute_names.update({"#number": "number"})
             expression_attribute_values.update(
-                {":to_number": {"N": str(to_number)}}
+                {":to_number": self.number_key(stream_id, to_number)}
             )
 
+        if topic is not None:
+            filter_expressions.append("topic = :topic")
+            expression_attribute_values.update({":topic": {"S": topic}})
+
+        if trace_id is not None:
+            filter_expressions.append("trace_id = :trace_id")
+            expression_attribute_values.update({":trace_id": {"S": trace_id}})
+
         if from_timestamp is not None:
-            filter_expressions.append("timestamp >= :from_timestamp")
+            filter_expressions.append("#timestamp >= :from_timestamp")
+            expression_attribute_names.update({"#timestamp": "timestamp"})
             expression_attribute_values.update(
                 {":from_timestamp": {"N": str(from_timestamp)}}
             )
 
         if to_timestamp is not None:
-            filter_expressions.append("timestamp <= :to_timestamp")
+            filter_expressions.append("#timestamp <= :to_timestamp")
+            expression_attribute_names.update({"#timestamp": "timestamp"})
             expression_attribute_values.update(
                 {":to_timestamp": {"N": str(to_timestamp)}}
             )
@@ -77,39 +134,573 @@ class DynamoDBEventRecordManager(EventRecordManager):
                 {"FilterExpression": " and ".join(filter_expressions)}
             )
 
-        query_result = self.client.query(**query_params)
+        if attributes is not None:
+            projection = []
+            for i, attribute in enumerate(attributes):
+                expression_attribute_names.update({f"#a{i}": attribute})
+                projection.append(f"#a{i}")
+
+            query_params.update(
+                {"ProjectionExpression": ", ".join(projection)}
+            )
+
+        if len(expression_attribute_names) > 0:
+            query_params.update(
+                {"ExpressionAttributeNames": expression_attribute_names}
+            )
+
+        if self.page_size is not None:
+            query_params.update({"Limit": self.page_size})
+
+        return query_params
+
+    def last_record_params(self, stream_id: str, *, topic: str = None) -> dict:
+        # Newest first. Limit applies before the filter, a filtered
+        # query limited to one item would take a round trip per item
+        query_params = self.query_params(stream_id, topic=topic)
+        query_params.update({"ScanIndexForward": False})
+        if "FilterExpression" not in query_params:
+            query_params.update({"Limit": 1})
+        elif topic is None and not self.is_colocated(stream_id):
+            # Only snapshots are filtered out, at most one of them sits
+            # after the newest event
+            query_params.update({"Limit": 2})
+
+        return query_params
 
-        return (self.deserialize(i) for i in query_result["Items"])
+    def delete_requests(
+        self, stream_id: str, items: typing.Iterable[dict]
+    ) -> typing.List[dict]:
+        # Batches of request items, items hold the number of each record
+        partition = {"stream_id": {"S": self.partition_of(stream_id)}}
+        requests = [
+            {"DeleteRequest": {"Key": {**partition, **item}}} for item in items
+        ]
+        return [
+            {self.table_name: requests[i : i + 25]}
+            for i in range(0, len(requests), 25)
+        ]
+
+    def put_requests(
+        self,
+        heap: typing.Sequence[EventRecord],
+        replaced: typing.Sequence[EventRecord] = (),
+    ) -> typing.List[dict]:
+        # New records must not exist, replaced ones must
+        items = []
+        for event_record in heap:
+            items.append(
+                {
+                    "TableName": self.table_name,
+                    "Item": self.serialize_item(event_record),
+                    "ConditionExpression": "attribute_not_exists(stream_id) "
+                    "and attribute_not_exists(#number)",
+                    "ExpressionAttributeNames": {"#number": "number"},
+                }
+            )
+
+        for event_record in replaced:
+            items.append(
+                {
+                    "TableName": self.table_name,
+                    "Item": self.serialize_item(event_record),
+                    "ConditionExpression": "attribute_exists(stream_id) "
+                    "and attribute_exists(#number)",
+                    "ExpressionAttributeNames": {"#number": "number"},
+                }
+            )
+
+        return items
+
+    def schema_requests(
+        self, items: typing.Sequence[dict]
+    ) -> typing.List[dict]:
+        # Schemas of binary payloads not stored yet, put before the
+        # payloads written with them
+        if self.record_format is None:
+            return []
+
+        schemas = self.record_format.payload_schemas(
+            i["Item"]["payload"]["B"]
+            for i in items
+            if "B" in i["Item"]["payload"]
+        )
+        return [
+            {
+                "TableName": self.table_name,
+                "Item": {
+                    "stream_id": {"S": _SCHEMAS_STREAM_ID},
+                    "number": {"N": str(schema_id)},
+                    "names": {"L": [{"S": n} for n in names]},
+                },
+            }
+            for schema_id, names in schemas.items()
+            if schema_id not in self.stored_schemas
+        ]
+
+    def schemas_query_params(self) -> dict:
+        return {
+            "TableName": self.table_name,
+            "KeyConditionExpression": "stream_id = :stream_id",
+            "ExpressionAttributeValues": {
+                ":stream_id": {"S": _SCHEMAS_STREAM_ID}
+            },
+            "ConsistentRead": True,
+        }
+
+    def load_schema_items(self, items: typing.Iterable[dict]) -> None:
+        schemas = {
+            int(i["number"]["N"]): [n["S"] for n in i["names"]["L"]]
+            for i in items
+        }
+        typing.cast(BinaryRecordFormat, self.record_format).load_schemas(
+            schemas
+        )
+        self.stored_schemas.update(schemas)
+
+    def is_colocated(self, stream_id: str) -> bool:
+        return self.snapshot_suffix is not None and stream_id.endswith(
+            self.snapshot_suffix
+        )
+
+    def partition_of(self, stream_id: str) -> str:
+        if self.is_colocated(stream_id):
+            return stream_id[: -len(typing.cast(str, self.snapshot_suffix))]
+
+        return stream_id
+
+    def number_key(self, stream_id: str, number: int) -> dict:
+        if self.is_colocated(stream_id):
+            return {"N": f"{number}.5"}
+
+        return {"N": str(number)}
+
+    def item_key(self, event_record: EventRecord) -> dict:
+        stream_id = event_record.stream_id
+        return {
+            "stream_id": {"S": self.partition_of(stream_id)},
+            "number": self.number_key(stream_id, event_record.number),
+        }
+
+    def serialize_item(self, event_record: EventRecord) -> dict:
+        item = self.serialize(event_record)
+
+        if self.is_colocated(event_record.stream_id):
+            item.update(self.item_key(event_record))
+            item["snapshot"] = {"BOOL": True}
+
+        if self.record_format is not None:
+            # Payload stored as compact binary, keys stay queryable
+            item["payload"] = {
+                "B": self.record_format.dumps_payload(event_record)
+            }
+
+        return item
+
+    def deserialize_item(self, dct: dict) -> EventRecord:
+        if "snapshot" in dct:
+            if self.snapshot_suffix is None:
+                raise TypeError("snapshot_suffix required for snapshots")
+
+            number = dct["number"]["N"]
+            dct = dict(
+                dct,
+                stream_id={"S": dct["stream_id"]["S"] + self.snapshot_suffix},
+                number={"N": number[: number.index(".")]},
+            )
+
+        event_record = self.deserialize(dct)
+        if not isinstance(event_record.payload, bytes):
+            return event_record
+
+        if self.record_format is None:
+            raise TypeError("record_format required for binary payloads")
+
+        return dataclasses.replace(
+            event_record,
+            payload=self.record_format.loads_payload(
+                event_record.payload, event_record.topic, event_record.context
+            ),
+        )
 
     @classmethod
     def serialize(cls, event_record: EventRecord) -> dict:
-        serialized = {
-            "stream_id": serialize(event_record.stream_id),
-            "number": serialize(event_record.number),
-            "topic": serialize(event_record.topic),
-            "version": serialize(event_record.version),
-            "timestamp": serialize(event_record.timestamp),
-            "trace_id": serialize(event_record.trace_id),
-            "message": serialize(event_record.message),
-            "context": serialize(event_record.context),
-            "payload": serialize(event_record.payload),
-        }
-        return serialized
+        return get_record_plan(EventRecord).marshal(event_record)
 
     @classmethod
     def deserialize(cls, dct: dict) -> EventRecord:
-        event_record = EventRecord(
-            stream_id=deserialize(dct["stream_id"]),
-            number=deserialize(dct["number"]),
-            topic=deserialize(dct["topic"]),
-            version=deserialize(dct["version"]),
-            timestamp=deserialize(dct["timestamp"]),
-            trace_id=deserialize(dct["trace_id"]),
-            message=deserialize(dct["message"]),
-            context=deserialize(dct["context"]),
-            payload=deserialize(dct["payload"]),
+        return get_record_plan(EventRecord).unmarshal(dct)
+
+
+class DynamoDBEventRecordManager(DynamoDBItemCodec, EventRecordManager):
+    def __init__(
+        self,
+        table_name,
+        *,
+        record_format: typing.Optional[BinaryRecordFormat] = None,
+        page_size: typing.Optional[int] = None,
+        log_table_name: typing.Optional[str] = None,
+        log_shard_size: int = 1000,
+        max_workers: int = 8,
+        snapshot_suffix: typing.Optional[str] = None,
+        max_attempts: int = 8,
+        backoff_ms: int = 20,
+        **kwargs,
+    ):
+        self.table_name = table_name
+        self.record_format = record_format
+        self.page_size = page_size
+        self.max_workers = max_workers
+        self.snapshot_suffix = snapshot_suffix
+
+        # Global order table, hash key shard (N) and range key position
+        # (N), items point to stream_id and number of event table.
+        # Every commit moves one counter item, commits of all streams
+        # are serialized on it and bound by the write rate of one item;
+        # each record takes a log item, up to 49 records per commit
+        self.log_table_name = log_table_name
+        self.log_shard_size = log_shard_size
+
+        # Commits that lose the counter to other commit are retried
+        # after a jittered, doubling backoff
+        self.max_attempts = max_attempts
+        self.backoff_ms = backoff_ms
+
+        self.stored_schemas = set()
+
+        self.client = boto3.client("dynamodb", **kwargs)
+
+    def session(self):
+        return DynamoSession(self)
+
+    def deserialize_item(self, dct: dict) -> EventRecord:
+        try:
+            return super().deserialize_item(dct)
+        except SchemaMismatchError:
+            # Schemas are read from the table once one is missing
+            self.load_schemas()
+            return super().deserialize_item(dct)
+
+    def load_schemas(self) -> None:
+        self.load_schema_items(self._query_pages(self.schemas_query_params()))
+
+    def store_schemas(self, items: typing.Sequence[dict]) -> None:
+        for request in self.schema_requests(items):
+            self.client.put_item(**request)
+            self.stored_schemas.add(int(request["Item"]["number"]["N"]))
+
+    def get_records(
+        self,
+        stream_id: str,
+        *,
+        topic: str = None,
+        from_timestamp: datetime.datetime = None,
+        to_timestamp: datetime.datetime = None,
+        from_number: int = None,
+        to_number: int = None,
+    ) -> typing.Generator[EventRecord, None, None]:
+        items = self.get_items(
+            stream_id,
+            topic=topic,
+            from_timestamp=from_timestamp,
+            to_timestamp=to_timestamp,
+            from_number=from_number,
+            to_number=to_number,
+        )
+
+        return (self.deserialize_item(i) for i in items)
+
+    def get_items(
+        self,
+        stream_id: str,
+        *,
+        topic: str = None,
+        from_timestamp: datetime.datetime = None,
+        to_timestamp: datetime.datetime = None,
+        from_number: int = None,
+        to_number: int = None,
+        attributes: typing.Sequence[str] = None,
+    ) -> typing.Generator[dict, None, None]:
+        query_params = self.query_params(
+            stream_id,
+            topic=topic,
+            from_timestamp=from_timestamp,
+            to_timestamp=to_timestamp,
+            from_number=from_number,
+            to_number=to_number,
+            attributes=attributes,
+        )
+
+        return self._query_pages(query_params)
+
+    def get_trace_records(
+        self, stream_id: str, trace_id: str, *, from_number: int = None
+    ) -> typing.Iterable[EventRecord]:
+        # Filtered by DynamoDB, only items of the trace are returned
+        query_params = self.query_params(
+            stream_id, from_number=from_number, trace_id=trace_id
+        )
+        return (
+            self.deserialize_item(i) for i in self._query_pages(query_params)
         )
-        return event_record
+
+    def get_last_record(
+        self, stream_id: str, *, topic: str = None
+    ) -> typing.Optional[EventRecord]:
+        query_params = self.last_record_params(stream_id, topic=topic)
+        for item in self._query_pages(query_params):
+            return self.deserialize_item(item)
+
+        return None
+
+    def get_last_records_many(
+        self, stream_ids: typing.Iterable[str]
+    ) -> typing.Dict[str, typing.Optional[EventRecord]]:
+        # Queries of all streams in flight at once, as get_records_many
+        stream_ids = list(dict.fromkeys(stream_ids))
+        if len(stream_ids) <= 1:
+            return super().get_last_records_many(stream_ids)
+
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(stream_ids))
+        ) as executor:
+            return dict(
+                zip(
+                    stream_ids,
+                    executor.map(self.get_last_record, stream_ids),
+                )
+            )
+
+    def delete_records(self, stream_id: str, *, to_number: int) -> None:
+        items = self.get_items(
+            stream_id, to_number=to_number, attributes=["number"]
+        )
+
+        # Unprocessed items are left when throttled, retried after a
+        # backoff
+        for request in self.delete_requests(stream_id, items):
+            for attempt in range(self.max_attempts):
+                if attempt > 0:
+                    time.sleep(_backoff(attempt, self.backoff_ms))
+
+                response = self.client.batch_write_item(RequestItems=request)
+                request = response.get("UnprocessedItems") or {}
+                if len(request) == 0:
+                    break
+            else:
+                raise UnprocessedItemsError(
+                    f"records of {stream_id} left undeleted "
+                    f"in {self.max_attempts} attempts"
+                )
+
+    def get_records_from_snapshot(
+        self, stream_id: str, snapshot_stream_id: str
+    ) -> typing.Tuple[typing.Optional[EventRecord], typing.List[EventRecord]]:
+        if self.partition_of(snapshot_stream_id) != stream_id or (
+            not self.is_colocated(snapshot_stream_id)
+        ):
+            return super().get_records_from_snapshot(
+                stream_id, snapshot_stream_id
+            )
+
+        # One reverse query, stops at the first snapshot found
+        query_params = {
+            "TableName": self.table_name,
+            "KeyConditionExpression": "stream_id = :stream_id",
+            "ExpressionAttributeValues": {":stream_id": {"S": stream_id}},
+            "ScanIndexForward": False,
+        }
+        if self.page_size is not None:
+            query_params.update({"Limit": self.page_size})
+
+        snapshot = None
+        records = []
+        for item in self._query_pages(query_params):
+            if "snapshot" in item:
+                snapshot = self.deserialize_item(item)
+                break
+
+            records.append(self.deserialize_item(item))
+
+        records.reverse()
+        return snapshot, records
+
+    def get_records_many(
+        self,
+        stream_ids: typing.Iterable[str],
+        *,
+        topic: str = None,
+        from_numbers: typing.Mapping[str, int] = None,
+    ) -> typing.Dict[str, typing.List[EventRecord]]:
+        # Queries of all streams in flight at once, boto3 clients are
+        # thread safe
+        if from_numbers is None:
+            from_numbers = {}
+
+        stream_ids = list(dict.fromkeys(stream_ids))
+        if len(stream_ids) <= 1:
+            return super().get_records_many(
+                stream_ids, topic=topic, from_numbers=from_numbers
+            )
+
+        def get_records(stream_id):
+            return list(
+                self.get_records(
+                    stream_id,
+                    topic=topic,
+                    from_number=from_numbers.get(stream_id),
+                )
+            )
+
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(stream_ids))
+        ) as executor:
+            return dict(zip(stream_ids, executor.map(get_records, stream_ids)))
+
+    def get_all_records(
+        self, from_position: int = 0, batch_size: int = 100
+    ) -> typing.Generator[RecordBatch, None, None]:
+        if self.log_table_name is None:
+            raise NotImplementedError("log_table_name required")
+
+        last_position = self.get_last_position()
+
+        # Positions are dense, a missing one belongs to a commit not yet
+        # visible, reading stops before it and resumes from checkpoint
+        position = from_position
+        while position < last_position:
+            pointers = self._query_log(position, batch_size)
+
+            contiguous = []
+            for pointer in pointers:
+                if int(pointer["position"]["N"]) != position + 1:
+                    break
+
+                contiguous.append(pointer)
+                position += 1
+
+            if len(contiguous) == 0:
+                return
+
+            yield RecordBatch(self._get_pointed(contiguous), position)
+
+    def get_last_position(self) -> int:
+        response = self.client.get_item(
+            TableName=self.log_table_name,
+            Key=_LOG_COUNTER_KEY,
+            ConsistentRead=True,
+        )
+        item = response.get("Item")
+        if item is None:
+            return 0
+
+        return int(item["last_position"]["N"])
+
+    def log_requests(
+        self, heap: typing.Sequence[EventRecord], last_position: int
+    ) -> typing.List[dict]:
+        # Counter moves from last_position only if no other commit moved
+        # it first, positions are assigned in the commit that uses them
+        values = {":last": {"N": str(last_position + len(heap))}}
+        if last_position == 0:
+            condition = "attribute_not_exists(last_position)"
+        else:
+            condition = "last_position = :expected"
+            values.update({":expected": {"N": str(last_position)}})
+
+        requests = [
+            {
+                "Update": {
+                    "TableName": self.log_table_name,
+                    "Key": _LOG_COUNTER_KEY,
+                    "UpdateExpression": "SET last_position = :last",
+                    "ConditionExpression": condition,
+                    "ExpressionAttributeValues": values,
+                }
+            }
+        ]
+        for position, event_record in enumerate(heap, last_position + 1):
+            requests.append(
+                {
+                    "Put": {
+                        "TableName": self.log_table_name,
+                        "Item": self.log_item(event_record, position),
+                    }
+                }
+            )
+
+        return requests
+
+    def log_item(self, event_record: EventRecord, position: int) -> dict:
+        return {
+            "shard": {"N": str(position // self.log_shard_size)},
+            "position": {"N": str(position)},
+            **self.item_key(event_record),
+        }
+
+    def _query_log(self, from_position: int, batch_size: int) -> list:
+        # Only the shard of from_position, batches never span shards
+        response = self.client.query(
+            TableName=self.log_table_name,
+            KeyConditionExpression="#shard = :shard and #position > :position",
+            ExpressionAttributeNames={
+                "#shard": "shard",
+                "#position": "position",
+            },
+            ExpressionAttributeValues={
+                ":shard": {"N": str(self._shard_after(from_position))},
+                ":position": {"N": str(from_position)},
+            },
+            ConsistentRead=True,
+            Limit=batch_size,
+        )
+        return response["Items"]
+
+    def _shard_after(self, position: int) -> int:
+        return (position + 1) // self.log_shard_size
+
+    def _get_pointed(self, pointers: list) -> typing.List[EventRecord]:
+        keys = [
+            {"stream_id": p["stream_id"], "number": p["number"]}
+            for p in pointers
+        ]
+
+        items = {}
+        for i in range(0, len(keys), 100):
+            request = {
+                self.table_name: {
+                    "Keys": keys[i : i + 100],
+                    "ConsistentRead": True,
+                }
+            }
+            while len(request) > 0:
+                response = self.client.batch_get_item(RequestItems=request)
+                for item in response["Responses"].get(self.table_name, []):
+                    key = (item["stream_id"]["S"], item["number"]["N"])
+                    items[key] = item
+
+                request = response.get("UnprocessedKeys") or {}
+
+        # Pointers of deleted records are skipped
+        return [
+            self.deserialize_item(items[key])
+            for key in ((k["stream_id"]["S"], k["number"]["N"]) for k in keys)
+            if key in items
+        ]
+
+    def _query_pages(self, query_params: dict):
+        # Next page is requested only when previous one is consumed
+        while True:
+            query_result = self.client.query(**query_params)
+            yield from query_result["Items"]
+
+            last_evaluated_key = query_result.get("LastEvaluatedKey")
+            if last_evaluated_key is None:
+                return
+
+            query_params = dict(
+                query_params, ExclusiveStartKey=last_evaluated_key
+            )
 
 
 class DynamoSession(Session):
@@ -117,46 +708,289 @@ class DynamoSession(Session):
         self.record_manager = record_manager
 
         self.heap = []
+        self.replaced = []
 
     def append(self, event_record: EventRecord):
         self.heap.append(event_record)
 
+    def replace(self, event_record: EventRecord):
+        self.replaced.append(event_record)
+
     def commit(self):
-        self.batch_writer(self.heap)
-        self.heap = []
+        try:
+            self.batch_writer(self.heap, self.replaced)
+        finally:
+            self.heap = []
+            self.replaced = []
 
     def rollback(self):
         self.heap = []
+        self.replaced = []
 
-    def batch_writer(self, heap):
-        if len(self.heap) == 0:
+    def batch_writer(self, heap, replaced=()):
+        if len(heap) == 0 and len(replaced) == 0:
             return
 
-        items = []
-        for event_record in heap:
-            items.append(
-                {
-                    "TableName": self.record_manager.table_name,
-                    "Item": self.record_manager.serialize(event_record),
-                    "ConditionExpression": "attribute_not_exists(stream_id) "
-                    "and attribute_not_exists(#number)",
-                    "ExpressionAttributeNames": {"#number": "number"},
-                }
+        record_manager = self.record_manager
+
+        size = len(heap) + len(replaced)
+        if record_manager.log_table_name is not None and len(heap) > 0:
+            size += len(heap) + 1
+
+        if size > _MAX_TRANSACT_ITEMS:
+            raise ValueError(
+                f"commit of {size} items exceeds {_MAX_TRANSACT_ITEMS}"
+            )
+
+        requests = record_manager.put_requests(heap, replaced)
+        record_manager.store_schemas(requests)
+
+        items = [{"Put": i} for i in requests]
+
+        contended = None
+        for attempt in range(record_manager.max_attempts):
+            if attempt > 0:
+                time.sleep(_backoff(attempt, record_manager.backoff_ms))
+
+            log_items = []
+            if record_manager.log_table_name is not None and len(heap) > 0:
+                log_items = record_manager.log_requests(
+                    heap, record_manager.get_last_position()
+                )
+
+            try:
+                record_manager.client.transact_write_items(
+                    TransactItems=items + log_items
+                )
+                return
+            except (
+                record_manager.client.exceptions.TransactionCanceledException
+            ) as error:
+                reasons = _cancellation_reasons(error)
+                if "ConditionalCheckFailed" in reasons[: len(items)]:
+                    raise ConcurrencyError() from error
+
+                # Other commit took the positions, retried after them
+                counter_reason = None
+                if len(log_items) > 0 and len(reasons) > len(items):
+                    counter_reason = reasons[len(items)]
+
+                if counter_reason in (
+                    "ConditionalCheckFailed",
+                    "TransactionConflict",
+                ):
+                    contended = error
+                    continue
+
+                raise error
+
+        raise ConcurrencyError(
+            f"log counter contended in {record_manager.max_attempts} attempts"
+        ) from contended
+
+
+class AsyncDynamoDBEventRecordManager(
+    DynamoDBItemCodec, AsyncEventRecordManager
+):
+    def __init__(
+        self,
+        table_name,
+        client,
+        *,
+        record_format: typing.Optional[BinaryRecordFormat] = None,
+        page_size: typing.Optional[int] = None,
+        max_attempts: int = 8,
+        backoff_ms: int = 20,
+    ):
+        # client is an async DynamoDB client, as created by aiobotocore,
+        # its lifecycle is owned by the caller
+        self.table_name = table_name
+        self.client = client
+        self.record_format = record_format
+        self.page_size = page_size
+        self.max_attempts = max_attempts
+        self.backoff_ms = backoff_ms
+
+        self.stored_schemas = set()
+
+    def session(self):
+        return AsyncDynamoSession(self)
+
+    async def load_schemas(self) -> None:
+        self.load_schema_items(
+            [i async for i in self._query_pages(self.schemas_query_params())]
+        )
+
+    async def store_schemas(self, items: typing.Sequence[dict]) -> None:
+        for request in self.schema_requests(items):
+            await self.client.put_item(**request)
+            self.stored_schemas.add(int(request["Item"]["number"]["N"]))
+
+    async def _deserialize(self, item: dict) -> EventRecord:
+        try:
+            return self.deserialize_item(item)
+        except SchemaMismatchError:
+            await self.load_schemas()
+            return self.deserialize_item(item)
+
+    async def get_records(
+        self,
+        stream_id: str,
+        *,
+        topic: str = None,
+        from_timestamp: datetime.datetime = None,
+        to_timestamp: datetime.datetime = None,
+        from_number: int = None,
+        to_number: int = None,
+    ) -> typing.AsyncIterator[EventRecord]:
+        items = self.get_items(
+            stream_id,
+            topic=topic,
+            from_timestamp=from_timestamp,
+            to_timestamp=to_timestamp,
+            from_number=from_number,
+            to_number=to_number,
+        )
+        async for item in items:
+            yield await self._deserialize(item)
+
+    async def get_items(
+        self,
+        stream_id: str,
+        *,
+        topic: str = None,
+        from_timestamp: datetime.datetime = None,
+        to_timestamp: datetime.datetime = None,
+        from_number: int = None,
+        to_number: int = None,
+        attributes: typing.Sequence[str] = None,
+    ) -> typing.AsyncIterator[dict]:
+        query_params = self.query_params(
+            stream_id,
+            topic=topic,
+            from_timestamp=from_timestamp,
+            to_timestamp=to_timestamp,
+            from_number=from_number,
+            to_number=to_number,
+            attributes=attributes,
+        )
+
+        async for item in self._query_pages(query_params):
+            yield item
+
+    async def get_last_record(
+        self, stream_id: str, *, topic: str = None
+    ) -> typing.Optional[EventRecord]:
+        query_params = self.last_record_params(stream_id, topic=topic)
+        async for item in self._query_pages(query_params):
+            return await self._deserialize(item)
+
+        return None
+
+    async def delete_records(self, stream_id: str, *, to_number: int) -> None:
+        items = [
+            item
+            async for item in self.get_items(
+                stream_id, to_number=to_number, attributes=["number"]
             )
+        ]
+
+        for request in self.delete_requests(stream_id, items):
+            for attempt in range(self.max_attempts):
+                if attempt > 0:
+                    await asyncio.sleep(_backoff(attempt, self.backoff_ms))
+
+                response = await self.client.batch_write_item(
+                    RequestItems=request
+                )
+                request = response.get("UnprocessedItems") or {}
+                if len(request) == 0:
+                    break
+            else:
+                raise UnprocessedItemsError(
+                    f"records of {stream_id} left undeleted "
+                    f"in {self.max_attempts} attempts"
+                )
+
+    async def _query_pages(self, query_params: dict):
+        while True:
+            query_result = await self.client.query(**query_params)
+            for item in query_result["Items"]:
+                yield item
+
+            last_evaluated_key = query_result.get("LastEvaluatedKey")
+            if last_evaluated_key is None:
+                return
+
+            query_params = dict(
+                query_params, ExclusiveStartKey=last_evaluated_key
+            )
+
+
+class AsyncDynamoSession(AsyncSession):
+    def __init__(self, record_manager):  # pylint: disable=all
+        self.record_manager = record_manager
+
+        self.heap = []
+        self.replaced = []
+
+    def append(self, event_record: EventRecord):
+        self.heap.append(event_record)
+
+    def replace(self, event_record: EventRecord):
+        self.replaced.append(event_record)
 
+    async def commit(self):
         try:
-            self.record_manager.client.transact_write_items(
+            await self.batch_writer(self.heap, self.replaced)
+        finally:
+            self.heap = []
+            self.replaced = []
+
+    async def rollback(self):
+        self.heap = []
+        self.replaced = []
+
+    async def batch_writer(self, heap, replaced=()):
+        if len(heap) == 0 and len(replaced) == 0:
+            return
+
+        items = self.record_manager.put_requests(heap, replaced)
+        await self.record_manager.store_schemas(items)
+
+        try:
+            await self.record_manager.client.transact_write_items(
                 TransactItems=[{"Put": i} for i in items]
             )
         except (
             self.record_manager.client.exceptions.TransactionCanceledException
         ) as error:
-            if (
-                error.response["Error"]["Message"]
-                == "Transaction cancelled, please refer "
-                "cancellation reasons for specific reasons "
-                "[ConditionalCheckFailed]"
-            ):
+            if _is_conditional_check_failed(error):
                 raise ConcurrencyError() from error
 
             raise error
+
+
+def _backoff(attempt: int, backoff_ms: int) -> float:
+    # Seconds before a retry, full jitter over a doubling window
+    return random.uniform(0, backoff_ms * 2 ** (attempt - 1)) / 1000
+
+
+def _is_conditional_check_failed(error: typing.Any) -> bool:
+    return "ConditionalCheckFailed" in _cancellation_reasons(error)
+
+
+def _cancellation_reasons(
+    error: typing.Any,
+) -> typing.List[typing.Optional[str]]:
+    # Reason of each item in order, None for items that did not fail
+    reasons = error.response.get("CancellationReasons")
+    if reasons is not None:
+        return [
+            None if r.get("Code") in (None, "None") else r["Code"]
+            for r in reasons
+        ]
+
+    message = error.response["Error"]["Message"]
+    listed = message[message.rfind("[") + 1 : message.rfind("]")]
+    return [None if r == "None" else r for r in listed.split(", ")]
@@ -0,0 +1,807 @@
+import os
+import json
+import mmap
+import bisect
+import zlib
+import struct
+import typing
+import datetime
+import threading
+
+from domainpy.exceptions import ConcurrencyError
+from domainpy.infrastructure.eventsourced.managers.memory import StreamIndex
+from domainpy.infrastructure.eventsourced.recordmanager import (
+    EventRecordManager,
+    RecordBatch,
+    Session,
+)
+from domainpy.infrastructure.records import EventRecord
+from domainpy.infrastructure.recordformat import BinaryRecordFormat
+from domainpy.utils.binary import (
+    BinaryFormatError,
+    pack_value,
+    unpack_value,
+    read_varint,
+    write_varint,
+)
+
+_RECORD = 0
+_TOMBSTONE = 1
+_TRUNCATE = 2
+# Ends the frames of one commit, frames after the last one are a torn
+# commit and discarded on recovery
+_COMMIT = 3
+
+# Frame: body length, body crc32, body
+_header = struct.Struct("<II")
+
+_SEGMENT_SUFFIX = ".segment"
+_INDEX_SUFFIX = ".index"
+# Field names by schema id of binary payloads, next to the segments
+_SCHEMAS_FILE = "schemas.json"
+
+
+class Entry:
+    # Location of a frame, with the attributes StreamIndex sorts on
+
+    __slots__ = [
+        "kind",
+        "position",
+        "stream_id",
+        "number",
+        "topic",
+        "timestamp",
+        "segment",
+        "offset",
+        "length",
+    ]
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        kind: int,
+        position: int,
+        stream_id: str,
+        number: typing.Optional[int],
+        topic: typing.Optional[str],
+        timestamp: typing.Any,
+        segment: int,
+        offset: int,
+        length: int,
+    ) -> None:
+        self.kind = kind
+        self.position = position
+        self.stream_id = stream_id
+        self.number = number
+        self.topic = topic
+        self.timestamp = timestamp
+        self.segment = segment
+        self.offset = offset
+        self.length = length
+
+    def astuple(self) -> list:
+        return [
+            self.kind,
+            self.position,
+            self.stream_id,
+            self.number,
+            self.topic,
+            self.timestamp,
+            self.offset,
+            self.length,
+        ]
+
+    def __repr__(self):  # pragma: no cover
+        return (
+            f"{self.__class__.__name__}("
+            f"{self.stream_id}:{self.number} at {self.segment}:{self.offset}"
+            ")"
+        )
+
+
+class Segment:
+    __slots__ = ["number", "path", "size", "_map"]
+
+    def __init__(self, number: int, path: str, size: int) -> None:
+        self.number = number
+        self.path = path
+        self.size = size
+
+        self._map: typing.Optional[mmap.mmap] = None
+
+    def read(self, offset: int, length: int) -> memoryview:
+        # Map is recreated only when file grew past it
+        end = offset + length
+        if self._map is None or len(self._map) < end:
+            self.unmap()
+            with open(self.path, "rb") as file:
+                self._map = mmap.mmap(
+                    file.fileno(), 0, access=mmap.ACCESS_READ
+                )
+
+        return memoryview(self._map)[offset:end]
+
+    def unmap(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+class FileEventRecordManager(EventRecordManager):
+    def __init__(
+        self,
+        directory: str,
+        *,
+        segment_size: int = 64 * 1024 * 1024,
+        group_commit: bool = True,
+        record_format: typing.Optional[BinaryRecordFormat] = None,
+    ):
+        # group_commit: commits return once synced, commits waiting at
+        # once share one fsync. False leaves syncing to the OS, commits
+        # are acknowledged before they are durable
+        self.directory = directory
+        self.segment_size = segment_size
+        self.group_commit = group_commit
+        self.record_format = record_format
+
+        self.lock = threading.RLock()
+
+        self.segments: typing.Dict[int, Segment] = {}
+        self.streams: typing.Dict[str, StreamIndex] = {}
+        self.position = 0
+
+        # Record entries in position order, dead ones skipped on read
+        self.log: typing.List[Entry] = []
+        self.log_positions: typing.List[int] = []
+
+        self._active: typing.Optional[typing.BinaryIO] = None
+        self._active_segment: typing.Optional[Segment] = None
+
+        # Commits written and commits known to be on disk
+        self._written = 0
+        self._synced = 0
+        self._syncing = False
+        self._sync_condition = threading.Condition()
+
+        # Payload schemas in the schemas file, and those to add to it
+        self._stored_schemas: typing.Dict[str, typing.List[str]] = {}
+        self._unstored_schemas: typing.Dict[str, typing.List[str]] = {}
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_schemas()
+        self._open()
+
+    def session(self):
+        return FileSession(self)
+
+    def get_records(
+        self,
+        stream_id: str,
+        *,
+        topic: str = None,
+        from_timestamp: datetime.datetime = None,
+        to_timestamp: datetime.datetime = None,
+        from_number: int = None,
+        to_number: int = None,
+    ) -> typing.Generator[EventRecord, None, None]:
+        with self.lock:
+            stream = self.streams.get(stream_id)
+            if stream is None:
+                return (er for er in ())
+
+            entries = stream.select(
+                topic=topic,
+                from_timestamp=from_timestamp,
+                to_timestamp=to_timestamp,
+                from_number=from_number,
+                to_number=to_number,
+            )
+            records = [self._read_record(e) for e in entries]
+
+        return (er for er in records)
+
+    def get_all_records(
+        self, from_position: int = 0, batch_size: int = 100
+    ) -> typing.Generator[RecordBatch, None, None]:
+        # Position is the frame position, replaced records move to the
+        # position of their newest frame
+        position = from_position
+        while True:
+            with self.lock:
+                log = self.log
+                i = bisect.bisect_right(self.log_positions, position)
+
+                entries = []
+                while i < len(log) and len(entries) < batch_size:
+                    if self._is_live(log[i]):
+                        entries.append(log[i])
+                    i += 1
+
+                if len(entries) == 0:
+                    return
+
+                records = [self._read_record(e) for e in entries]
+
+            position = entries[-1].position
+            yield RecordBatch(records, position)
+
+    def get_last_record(
+        self, stream_id: str, *, topic: str = None
+    ) -> typing.Optional[EventRecord]:
+        with self.lock:
+            stream = self.streams.get(stream_id)
+            if stream is None:
+                return None
+
+            entry = stream.last(topic)
+            if entry is None:
+                return None
+
+            return self._read_record(entry)
+
+    def get_records_from_snapshot(
+        self, stream_id: str, snapshot_stream_id: str
+    ) -> typing.Tuple[typing.Optional[EventRecord], typing.List[EventRecord]]:
+        # Both read under one lock, consistent with each other
+        with self.lock:
+            return super().get_records_from_snapshot(
+                stream_id, snapshot_stream_id
+            )
+
+    def delete_records(self, stream_id: str, *, to_number: int) -> None:
+        # Frames are kept until compaction, like delete_stream
+        with self.lock:
+            if stream_id not in self.streams:
+                return
+
+            body = bytearray((_TRUNCATE,))
+            write_varint(body, self.position + 1)
+            pack_value(body, [stream_id, to_number])
+
+            commit = self._write([(body, None)])
+
+        self._wait_synced(commit)
+
+    def exists(self, stream_id: str, number: int) -> bool:
+        stream = self.streams.get(stream_id)
+        return stream is not None and number in stream.records
+
+    def delete_stream(self, stream_id: str) -> None:
+        # Frames are kept until compaction, the tombstone hides them
+        with self.lock:
+            if stream_id not in self.streams:
+                return
+
+            body = bytearray((_TOMBSTONE,))
+            write_varint(body, self.position + 1)
+            pack_value(body, stream_id)
+
+            commit = self._write([(body, None)])
+
+        self._wait_synced(commit)
+
+    def compact(self) -> None:
+        # Rewrite sealed segments with live frames only, deleted records,
+        # replaced records, tombstones and truncations are dropped
+        with self.lock:
+            self.log = [e for e in self.log if self._is_live(e)]
+            self.log_positions = [e.position for e in self.log]
+
+            live: typing.Dict[int, typing.List[Entry]] = {}
+            for stream in self.streams.values():
+                for entry in stream.records.values():
+                    live.setdefault(entry.segment, []).append(entry)
+
+            for segment in list(self.segments.values()):
+                if segment is self._active_segment:
+                    continue
+
+                entries = sorted(
+                    live.get(segment.number, []), key=lambda e: e.offset
+                )
+                self._rewrite_segment(segment, entries)
+
+    def sync(self) -> None:
+        with self.lock:
+            if self._active is not None:
+                self._active.flush()
+                os.fsync(self._active.fileno())
+
+            self._mark_synced(self._written)
+
+    def close(self) -> None:
+        with self.lock:
+            if self._active is not None:
+                self.sync()
+                self._active.close()
+                self._active = None
+
+            for segment in self.segments.values():
+                segment.unmap()
+
+    def _open(self) -> None:
+        numbers = sorted(
+            int(name[: -len(_SEGMENT_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.endswith(_SEGMENT_SUFFIX)
+        )
+
+        for i, number in enumerate(numbers):
+            segment = Segment(
+                number,
+                self._path(number, _SEGMENT_SUFFIX),
+                os.path.getsize(self._path(number, _SEGMENT_SUFFIX)),
+            )
+            self.segments[number] = segment
+
+            is_last = i == len(numbers) - 1
+            index_path = self._path(number, _INDEX_SUFFIX)
+            if not is_last and os.path.exists(index_path):
+                entries = self._load_index(segment)
+            else:
+                # Active segment has no index, may have torn tail
+                entries = self._scan_segment(segment, truncate=is_last)
+                if not is_last:
+                    self._write_index(segment, entries)
+
+            for entry in entries:
+                self._apply(entry)
+
+        if len(numbers) == 0:
+            self._roll()
+        else:
+            self._active_segment = self.segments[numbers[-1]]
+            self._active = open(  # pylint: disable=consider-using-with
+                self._active_segment.path, "ab"
+            )
+
+    def _load_schemas(self) -> None:
+        path = os.path.join(self.directory, _SCHEMAS_FILE)
+        if self.record_format is None or not os.path.exists(path):
+            return
+
+        with open(path, "r", encoding="utf-8") as file:
+            self._stored_schemas = json.load(file)
+
+        self.record_format.load_schemas(
+            {int(k): names for k, names in self._stored_schemas.items()}
+        )
+
+    def _store_schemas(self) -> None:
+        # Synced before frames written with them
+        if len(self._unstored_schemas) == 0:
+            return
+
+        schemas = dict(self._stored_schemas, **self._unstored_schemas)
+        _write_file(
+            os.path.join(self.directory, _SCHEMAS_FILE),
+            json.dumps(schemas).encode("utf-8"),
+        )
+        _fsync_directory(self.directory)
+
+        self._stored_schemas = schemas
+        self._unstored_schemas = {}
+
+    def _scan_segment(
+        self, segment: Segment, *, truncate: bool
+    ) -> typing.List[Entry]:
+        entries: typing.List[Entry] = []
+        pending: typing.List[Entry] = []
+        committed = 0
+
+        with open(segment.path, "rb") as file:
+            data = file.read()
+
+        offset = 0
+        while offset + _header.size <= len(data):
+            length, crc = _header.unpack_from(data, offset)
+            end = offset + _header.size + length
+            if end > len(data):
+                break
+
+            body = memoryview(data)[offset + _header.size : end]
+            if zlib.crc32(body) != crc:
+                break
+
+            try:
+                if body[0] == _COMMIT:
+                    count, _ = read_varint(body, 1)
+                    if count != len(pending):
+                        break
+
+                    entries.extend(pending)
+                    pending = []
+                    committed = end
+                else:
+                    pending.append(
+                        self._entry_of(
+                            body, segment.number, offset, end - offset
+                        )
+                    )
+            except (BinaryFormatError, IndexError):
+                break
+
+            offset = end
+
+        if truncate and committed < len(data):
+            # Torn commit of a crash, never acknowledged
+            with open(segment.path, "r+b") as file:
+                file.truncate(committed)
+            segment.size = committed
+
+        return entries
+
+    def _entry_of(
+        self, body: memoryview, segment: int, offset: int, length: int
+    ) -> Entry:
+        kind = body[0]
+        position, cursor = read_varint(body, 1)
+
+        if kind == _TOMBSTONE:
+            stream_id, _ = unpack_value(body, cursor)
+            return Entry(
+                kind, position, stream_id, None, None, None,
+                segment, offset, length,
+            )  # fmt: skip
+
+        if kind == _TRUNCATE:
+            (stream_id, to_number), _ = unpack_value(body, cursor)
+            return Entry(
+                kind, position, stream_id, to_number, None, None,
+                segment, offset, length,
+            )  # fmt: skip
+
+        values, _ = unpack_value(body, cursor)
+        return Entry(
+            kind, position, values[0], values[1], values[2], values[4],
+            segment, offset, length,
+        )  # fmt: skip
+
+    def _load_index(self, segment: Segment) -> typing.List[Entry]:
+        with open(self._path(segment.number, _INDEX_SUFFIX), "rb") as file:
+            data = file.read()
+
+        entries = []
+        offset = 0
+        while offset < len(data):
+            values, offset = unpack_value(data, offset)
+            (
+                kind, position, stream_id, number, topic, timestamp,
+                frame_offset, length,
+            ) = values  # fmt: skip
+            entries.append(
+                Entry(
+                    kind, position, stream_id, number, topic, timestamp,
+                    segment.number, frame_offset, length,
+                )  # fmt: skip
+            )
+
+        return entries
+
+    def _write_index(
+        self, segment: Segment, entries: typing.List[Entry]
+    ) -> None:
+        buffer = bytearray()
+        for entry in entries:
+            pack_value(buffer, entry.astuple())
+
+        path = self._path(segment.number, _INDEX_SUFFIX)
+        _write_file(path, buffer)
+
+    def _apply(self, entry: Entry) -> None:
+        self.position = max(self.position, entry.position)
+
+        if entry.kind == _TOMBSTONE:
+            self.streams.pop(entry.stream_id, None)
+            return
+
+        if entry.kind == _TRUNCATE:
+            self._truncate(entry.stream_id, entry.number)
+            return
+
+        stream = self.streams.get(entry.stream_id)
+        if stream is None:
+            stream = StreamIndex()
+            self.streams[entry.stream_id] = stream
+
+        # Later frame of same record is a replacement
+        previous = stream.records.get(entry.number)
+        if previous is not None:
+            stream.remove(previous)
+
+        stream.add(entry)
+
+        self.log.append(entry)
+        self.log_positions.append(entry.position)
+
+    def _truncate(self, stream_id: str, to_number: int) -> None:
+        stream = self.streams.get(stream_id)
+        if stream is None:
+            return
+
+        numbers = stream.numbers
+        for number in numbers[: bisect.bisect_right(numbers, to_number)]:
+            stream.remove(stream.records[number])
+
+    def _is_live(self, entry: Entry) -> bool:
+        stream = self.streams.get(entry.stream_id)
+        return stream is not None and stream.records.get(entry.number) is entry
+
+    def _roll(self) -> None:
+        if self._active is not None:
+            self.sync()
+            self._active.close()
+
+            sealed = self._active_segment
+            self._write_index(
+                sealed, self._scan_segment(sealed, truncate=False)
+            )
+
+        number = max(self.segments, default=0) + 1
+        segment = Segment(number, self._path(number, _SEGMENT_SUFFIX), 0)
+        self.segments[number] = segment
+
+        self._active_segment = segment
+        self._active = open(  # pylint: disable=consider-using-with
+            segment.path, "ab"
+        )
+        _fsync_directory(self.directory)
+
+    def _write(
+        self,
+        bodies: typing.List[
+            typing.Tuple[bytearray, typing.Optional[EventRecord]]
+        ],
+    ) -> int:
+        # Frames of one commit and its marker, always in one segment
+        self._store_schemas()
+
+        marker = _commit_frame(len(bodies))
+
+        frames = [body for body, _ in bodies]
+        size = sum(_header.size + len(f) for f in frames) + len(marker)
+
+        segment = self._active_segment
+        if segment.size > 0 and segment.size + size > self.segment_size:
+            self._roll()
+            segment = self._active_segment
+
+        entries = []
+        buffer = bytearray()
+        for body in frames:
+            start = segment.size + len(buffer)
+            buffer += _header.pack(len(body), zlib.crc32(body))
+            buffer += body
+
+            entries.append(
+                self._entry_of(
+                    memoryview(body),
+                    segment.number,
+                    start,
+                    _header.size + len(body),
+                )
+            )
+
+        buffer += marker
+        self._flush(buffer)
+
+        for entry in entries:
+            self._apply(entry)
+
+        self._written += 1
+        return self._written
+
+    def _flush(self, buffer: bytearray) -> None:
+        if len(buffer) == 0:
+            return
+
+        self._active.write(buffer)
+        self._active.flush()
+        self._active_segment.size += len(buffer)
+
+    def _wait_synced(self, commit: int) -> None:
+        # First waiting commit syncs, the ones waiting meanwhile are
+        # covered by its fsync or by the next one
+        if not self.group_commit:
+            return
+
+        with self._sync_condition:
+            while self._synced < commit and self._syncing:
+                self._sync_condition.wait()
+
+            if self._synced >= commit:
+                return
+
+            self._syncing = True
+
+        try:
+            with self.lock:
+                written = self._written
+                # Synced outside the lock, new commits are not held
+                fd = os.dup(self._active.fileno())
+
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+            self._mark_synced(written)
+        finally:
+            with self._sync_condition:
+                self._syncing = False
+                self._sync_condition.notify_all()
+
+    def _mark_synced(self, written: int) -> None:
+        with self._sync_condition:
+            self._synced = max(self._synced, written)
+
+    def _rewrite_segment(
+        self, segment: Segment, entries: typing.List[Entry]
+    ) -> None:
+        # Live frames are committed as one, unless nothing shrinks
+        marker = _commit_frame(len(entries))
+        if sum(e.length for e in entries) + len(marker) >= segment.size:
+            return
+
+        buffer = bytearray()
+        for entry in entries:
+            frame = segment.read(entry.offset, entry.length)
+            try:
+                entry.offset = len(buffer)
+                buffer += frame
+            finally:
+                frame.release()
+
+        buffer += marker
+
+        # Stale index is dropped first, a crash here rescans the segment
+        os.remove(self._path(segment.number, _INDEX_SUFFIX))
+
+        segment.unmap()
+        _write_file(segment.path, buffer)
+        segment.size = len(buffer)
+        self._write_index(segment, entries)
+
+    def _read_record(self, entry: Entry) -> EventRecord:
+        frame = self.segments[entry.segment].read(entry.offset, entry.length)
+        try:
+            body = frame[_header.size :]
+            _, cursor = read_varint(body, 1)
+            values, _ = unpack_value(body, cursor)
+        finally:
+            frame.release()
+
+        payload = values[8]
+        if isinstance(payload, bytes):
+            if self.record_format is None:
+                raise TypeError("record_format required for binary payloads")
+
+            payload = self.record_format.loads_payload(
+                payload, values[2], values[7]
+            )
+
+        return EventRecord(
+            stream_id=values[0],
+            number=values[1],
+            topic=values[2],
+            version=values[3],
+            timestamp=values[4],
+            trace_id=values[5],
+            message=values[6],
+            context=values[7],
+            payload=payload,
+        )
+
+    def encode_record(self, event_record: EventRecord, position: int):
+        payload: typing.Any = event_record.payload
+        if self.record_format is not None:
+            payload = self.record_format.dumps_payload(event_record)
+
+            schemas = self.record_format.payload_schemas([payload])
+            for schema_id, names in schemas.items():
+                if str(schema_id) not in self._stored_schemas:
+                    self._unstored_schemas[str(schema_id)] = list(names)
+
+        body = bytearray((_RECORD,))
+        write_varint(body, position)
+        pack_value(
+            body,
+            [
+                event_record.stream_id,
+                event_record.number,
+                event_record.topic,
+                event_record.version,
+                event_record.timestamp,
+                event_record.trace_id,
+                event_record.message,
+                event_record.context,
+                payload,
+            ],
+        )
+        return body
+
+    def _path(self, number: int, suffix: str) -> str:
+        return os.path.join(self.directory, f"{number:010d}{suffix}")
+
+
+def _commit_frame(count: int) -> bytearray:
+    body = bytearray((_COMMIT,))
+    write_varint(body, count)
+
+    return bytearray(_header.pack(len(body), zlib.crc32(body))) + body
+
+
+def _write_file(path: str, data: bytes) -> None:
+    # Replaced atomically, never seen half written
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+
+    os.replace(tmp_path, path)
+
+
+def _fsync_directory(directory: str) -> None:
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class FileSession(Session):
+    def __init__(self, record_manager):  # pylint: disable=all
+        self.record_manager = record_manager
+
+        self.heap = []
+        self.replaced = []
+
+    def append(self, event_record: EventRecord):
+        self.heap.append(event_record)
+
+    def replace(self, event_record: EventRecord):
+        self.replaced.append(event_record)
+
+    def commit(self):  # pylint: disable=protected-access
+        try:
+            record_manager = self.record_manager
+
+            with record_manager.lock:
+                self._check()
+
+                position = record_manager.position
+                bodies = []
+                for record in self.heap + self.replaced:
+                    position += 1
+                    bodies.append(
+                        (
+                            record_manager.encode_record(record, position),
+                            record,
+                        )
+                    )
+
+                commit = record_manager._write(bodies)
+
+            record_manager._wait_synced(commit)
+        finally:
+            self.heap = []
+            self.replaced = []
+
+    def rollback(self):
+        self.heap = []
+        self.replaced = []
+
+    def _check(self):
+        record_manager = self.record_manager
+
+        keys = set()
+        for record in self.heap:
+            key = (record.stream_id, record.number)
+            if key in keys or record_manager.exists(*key):
+                raise ConcurrencyError()
+
+            keys.add(key)
+
+        for record in self.replaced:
+            if not record_manager.exists(record.stream_id, record.number):
+                raise ConcurrencyError()
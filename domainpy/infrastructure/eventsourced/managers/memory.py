@@ -1,9 +1,13 @@
+import bisect
 import typing
 from datetime import datetime
 
 from domainpy import exceptions as excs
 from domainpy.infrastructure.eventsourced.recordmanager import (
+    AsyncEventRecordManager,
+    AsyncSession,
     EventRecordManager,
+    RecordBatch,
     Session,
 )
 from domainpy.infrastructure.records import EventRecord
@@ -11,7 +15,13 @@ from domainpy.infrastructure.records import EventRecord
 
 class MemoryEventRecordManager(EventRecordManager):
     def __init__(self):
-        self.heap: typing.List[EventRecord] = []
+        # Global append order, indexes are built from it,
+        # deleted records leave None
+        self.heap: typing.List[typing.Optional[EventRecord]] = []
+
+        self._streams: typing.Dict[str, StreamIndex] = {}
+        self._positions: typing.Dict[typing.Tuple[str, int], int] = {}
+        self._indexed = 0
 
     def session(self):
         return MemorySession(self)
@@ -26,24 +36,208 @@ class MemoryEventRecordManager(EventRecordManager):
         from_number: int = None,
         to_number: int = None,
     ) -> typing.Generator[EventRecord, None, None]:
-        filters = [lambda er: er.stream_id == stream_id]
+        self._sync()
+
+        stream = self._streams.get(stream_id)
+        if stream is None:
+            return (er for er in ())
+
+        return stream.select(
+            topic=topic,
+            from_timestamp=from_timestamp,
+            to_timestamp=to_timestamp,
+            from_number=from_number,
+            to_number=to_number,
+        )
+
+    def get_all_records(
+        self, from_position: int = 0, batch_size: int = 100
+    ) -> typing.Generator[RecordBatch, None, None]:
+        # Position is one based index in heap
+        heap = self.heap
+
+        position = from_position
+        while position < len(heap):
+            records = []
+            while position < len(heap) and len(records) < batch_size:
+                if heap[position] is not None:
+                    records.append(heap[position])
+                position += 1
+
+            if len(records) > 0:
+                yield RecordBatch(records, position)
+
+    def get_last_record(
+        self, stream_id: str, *, topic: str = None
+    ) -> typing.Optional[EventRecord]:
+        self._sync()
+
+        stream = self._streams.get(stream_id)
+        if stream is None:
+            return None
+
+        return stream.last(topic)
+
+    def delete_records(self, stream_id: str, *, to_number: int) -> None:
+        # Heap slots are emptied, positions of other records stay
+        self._sync()
+
+        stream = self._streams.get(stream_id)
+        if stream is None:
+            return
+
+        numbers = stream.numbers
+        for number in numbers[: bisect.bisect_right(numbers, to_number)]:
+            stream.remove(stream.records[number])
+            position = self._positions.pop((stream_id, number))
+            self.heap[position] = None
+
+    def exists(self, stream_id: str, number: int) -> bool:
+        self._sync()
+        return (stream_id, number) in self._positions
+
+    def _sync(self) -> None:
+        # Records appended to heap directly are indexed on next access,
+        # heap is append only
+        heap = self.heap
+        for position in range(self._indexed, len(heap)):
+            if heap[position] is not None:
+                self._index(heap[position], position)
+
+        self._indexed = len(heap)
+
+    def _extend(self, records: typing.List[EventRecord]) -> None:
+        self._sync()
+
+        position = len(self.heap)
+        self.heap.extend(records)
+        for record in records:
+            self._index(record, position)
+            position += 1
+
+        self._indexed = len(self.heap)
+
+    def _replace(self, position: int, record: EventRecord) -> None:
+        self._streams[record.stream_id].remove(self.heap[position])
+        self._streams[record.stream_id].add(record)
+        self.heap[position] = record
+
+    def _index(self, record: EventRecord, position: int) -> None:
+        stream = self._streams.get(record.stream_id)
+        if stream is None:
+            stream = StreamIndex()
+            self._streams[record.stream_id] = stream
+
+        stream.add(record)
+        self._positions[(record.stream_id, record.number)] = position
+
 
+class StreamIndex:
+    # Records of one stream by number, with topic and timestamp
+    # secondary indexes, all kept sorted for bisect
+
+    __slots__ = ["records", "numbers", "topics", "timestamps"]
+
+    def __init__(self) -> None:
+        self.records: typing.Dict[int, EventRecord] = {}
+        self.numbers: typing.List[int] = []
+        self.topics: typing.Dict[str, typing.List[int]] = {}
+        self.timestamps: typing.List[typing.Tuple[typing.Any, int]] = []
+
+    def add(self, record: EventRecord) -> None:
+        number = record.number
+
+        self.records[number] = record
+        _insort(self.numbers, number)
+        _insort(self.topics.setdefault(record.topic, []), number)
+        _insort(self.timestamps, (record.timestamp, number))
+
+    def remove(self, record: EventRecord) -> None:
+        number = record.number
+
+        del self.records[number]
+        _remove(self.numbers, number)
+        _remove(self.topics[record.topic], number)
+        _remove(self.timestamps, (record.timestamp, number))
+
+    def last(self, topic: str = None) -> typing.Optional[EventRecord]:
+        numbers = self.numbers
         if topic is not None:
-            filters.append(lambda er: er.topic == topic)
+            numbers = self.topics.get(topic, [])
 
-        if from_timestamp is not None:
-            filters.append(lambda er: er.timestamp >= from_timestamp)
+        if len(numbers) == 0:
+            return None
 
-        if to_timestamp is not None:
-            filters.append(lambda er: er.timestamp <= to_timestamp)
+        return self.records[numbers[-1]]
 
+    def select(
+        self,
+        *,
+        topic: str = None,
+        from_timestamp: typing.Any = None,
+        to_timestamp: typing.Any = None,
+        from_number: int = None,
+        to_number: int = None,
+    ) -> typing.Generator[EventRecord, None, None]:
+        numbers = self.numbers
+        if topic is not None:
+            numbers = self.topics.get(topic, [])
+
+        low = 0
         if from_number is not None:
-            filters.append(lambda er: er.number >= from_number)
+            low = bisect.bisect_left(numbers, from_number)
 
+        high = len(numbers)
         if to_number is not None:
-            filters.append(lambda er: er.number <= to_number)
+            high = bisect.bisect_right(numbers, to_number)
+
+        selected = numbers[low:high]
 
-        return (er for er in self.heap if all(f(er) for f in filters))
+        if from_timestamp is not None or to_timestamp is not None:
+            in_range = self._numbers_between(from_timestamp, to_timestamp)
+            selected = [n for n in selected if n in in_range]
+
+        records = self.records
+        return (records[n] for n in selected)
+
+    def _numbers_between(
+        self, from_timestamp: typing.Any, to_timestamp: typing.Any
+    ) -> typing.Set[int]:
+        timestamps = self.timestamps
+
+        low = 0
+        if from_timestamp is not None:
+            low = bisect.bisect_left(timestamps, (from_timestamp,))
+
+        high = len(timestamps)
+        if to_timestamp is not None:
+            high = bisect.bisect_left(
+                timestamps, (to_timestamp, _Max()), lo=low
+            )
+
+        return {number for _, number in timestamps[low:high]}
+
+
+class _Max:
+    # Sorts after any number, bound of ranges over (value, number) pairs
+
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+
+def _insort(values: list, value: typing.Any) -> None:
+    # Records use to arrive in order, avoid bisect on the common path
+    if len(values) == 0 or values[-1] < value:
+        values.append(value)
+    else:
+        bisect.insort(values, value)
+
+
+def _remove(values: list, value: typing.Any) -> None:
+    del values[bisect.bisect_left(values, value)]
 
 
 class MemorySession(Session):
@@ -51,37 +245,122 @@ class MemorySession(Session):
         self.record_manager = record_manager
 
         self.heap = []
+        self.replaced = []
 
     def append(self, event_record: EventRecord):
         self.heap.append(event_record)
 
-    def commit(self):
+    def replace(self, event_record: EventRecord):
+        self.replaced.append(event_record)
+
+    def commit(self):  # pylint: disable=protected-access
         try:
             self._check_heap_merge()
+            positions = self._find_replaced()
 
-            self.record_manager.heap.extend(self.heap)
+            self.record_manager._extend(self.heap)
+            for position, record in zip(positions, self.replaced):
+                self.record_manager._replace(position, record)
 
         except UniqueEventRecordBroken as error:
             raise excs.ConcurrencyError() from error
         finally:
             self.heap = []
+            self.replaced = []
 
     def rollback(self):
         self.heap = []
+        self.replaced = []
 
     def _check_heap_merge(self):
+        keys = set()
         for record in self.heap:
-            if self._check_if_event_exists_in_rm(record):
+            key = (record.stream_id, record.number)
+            if key in keys or self._check_if_event_exists_in_rm(record):
                 raise UniqueEventRecordBroken(record)
 
+            keys.add(key)
+
     def _check_if_event_exists_in_rm(self, event: EventRecord) -> bool:
-        exists = any(
-            True
-            for e in self.record_manager.heap
-            if e.stream_id == event.stream_id and e.number == event.number
-        )
-        return exists
+        return self.record_manager.exists(event.stream_id, event.number)
+
+    def _find_replaced(  # pylint: disable=protected-access
+        self,
+    ) -> typing.List[int]:
+        if len(self.replaced) == 0:
+            return []
+
+        self.record_manager._sync()
+        positions = self.record_manager._positions
+
+        try:
+            return [positions[(r.stream_id, r.number)] for r in self.replaced]
+        except KeyError as error:
+            raise UniqueEventRecordBroken(error.args[0]) from error
 
 
 class UniqueEventRecordBroken(Exception):
     pass
+
+
+class AsyncMemoryEventRecordManager(AsyncEventRecordManager):
+    # Async facade of MemoryEventRecordManager, for tests
+
+    def __init__(self, record_manager: MemoryEventRecordManager = None):
+        if record_manager is None:
+            record_manager = MemoryEventRecordManager()
+
+        self.record_manager = record_manager
+
+    @property
+    def heap(self) -> typing.List[typing.Optional[EventRecord]]:
+        return self.record_manager.heap
+
+    def session(self):
+        return AsyncMemorySession(self.record_manager.session())
+
+    async def get_records(
+        self,
+        stream_id: str,
+        *,
+        topic: str = None,
+        from_timestamp: datetime = None,
+        to_timestamp: datetime = None,
+        from_number: int = None,
+        to_number: int = None,
+    ) -> typing.AsyncIterator[EventRecord]:
+        records = self.record_manager.get_records(
+            stream_id,
+            topic=topic,
+            from_timestamp=from_timestamp,
+            to_timestamp=to_timestamp,
+            from_number=from_number,
+            to_number=to_number,
+        )
+        for record in records:
+            yield record
+
+    async def get_last_record(
+        self, stream_id: str, *, topic: str = None
+    ) -> typing.Optional[EventRecord]:
+        return self.record_manager.get_last_record(stream_id, topic=topic)
+
+    async def delete_records(self, stream_id: str, *, to_number: int) -> None:
+        self.record_manager.delete_records(stream_id, to_number=to_number)
+
+
+class AsyncMemorySession(AsyncSession):
+    def __init__(self, session: MemorySession):  # pylint: disable=all
+        self.session = session
+
+    def append(self, event_record: EventRecord):
+        self.session.append(event_record)
+
+    def replace(self, event_record: EventRecord):
+        self.session.replace(event_record)
+
+    async def commit(self):
+        self.session.commit()
+
+    async def rollback(self):
+        self.session.rollback()
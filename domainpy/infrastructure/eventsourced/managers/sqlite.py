@@ -0,0 +1,464 @@
+import json
+import typing
+import sqlite3
+import datetime
+import threading
+
+from domainpy.exceptions import ConcurrencyError
+from domainpy.infrastructure.eventsourced.recordmanager import (
+    EventRecordManager,
+    RecordBatch,
+    Session,
+)
+from domainpy.infrastructure.records import EventRecord
+from domainpy.infrastructure.recordformat import (
+    BinaryRecordFormat,
+    SchemaMismatchError,
+)
+
+_COLUMNS = (
+    "stream_id",
+    "number",
+    "topic",
+    "version",
+    "timestamp",
+    "trace_id",
+    "message",
+    "context",
+    "payload",
+)
+
+# Streams per query of get_records_many, two variables each
+_MANY_CHUNK_SIZE = 400
+
+
+def _epoch(value: typing.Any) -> typing.Any:
+    # Timestamps are stored as REAL seconds
+    if isinstance(value, datetime.datetime):
+        return value.timestamp()
+
+    return value
+
+
+class SQLiteEventRecordManager(EventRecordManager):
+    def __init__(
+        self,
+        database: str,
+        *,
+        table_name: str = "event_records",
+        record_format: typing.Optional[BinaryRecordFormat] = None,
+        **kwargs,
+    ):
+        self.database = database
+        self.table_name = table_name
+        self.record_format = record_format
+
+        # Transactions are explicit, see SQLiteSession.commit
+        self.connection = sqlite3.connect(
+            database, isolation_level=None, check_same_thread=False, **kwargs
+        )
+        self.lock = threading.RLock()
+
+        columns = ", ".join(_COLUMNS)
+        placeholders = ", ".join("?" for _ in _COLUMNS)
+        assignments = ", ".join(f"{c} = ?" for c in _COLUMNS[2:])
+
+        self.insert_statement = (
+            f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
+        )
+        self.update_statement = (
+            f"UPDATE {table_name} SET {assignments} "
+            "WHERE stream_id = ? AND number = ?"
+        )
+        self.select_statement = f"SELECT {columns} FROM {table_name}"
+        self.select_all_statement = (
+            f"SELECT sequence, {columns} FROM {table_name} "
+            "WHERE sequence > ? ORDER BY sequence LIMIT ?"
+        )
+        self.insert_schema_statement = (
+            f"INSERT OR IGNORE INTO {table_name}_schemas "
+            "(schema_id, names) VALUES (?, ?)"
+        )
+
+        # Ids of payload schemas in the schemas table
+        self.stored_schemas: typing.Set[int] = set()
+
+        self._create_schema()
+        self._load_schemas()
+
+    def _create_schema(self) -> None:
+        table_name = self.table_name
+
+        with self.lock:
+            self.connection.execute("PRAGMA journal_mode = WAL")
+            self.connection.execute("PRAGMA synchronous = NORMAL")
+
+            # sequence is the global append order of all streams,
+            # (stream_id, number) unique key gives optimistic concurrency
+            self.connection.executescript(
+                f"""
+                CREATE TABLE IF NOT EXISTS {table_name} (
+                    sequence INTEGER PRIMARY KEY AUTOINCREMENT,
+                    stream_id TEXT NOT NULL,
+                    number INTEGER NOT NULL,
+                    topic TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    timestamp REAL NOT NULL,
+                    trace_id TEXT,
+                    message TEXT NOT NULL,
+                    context TEXT,
+                    payload BLOB NOT NULL,
+                    UNIQUE (stream_id, number)
+                );
+                CREATE INDEX IF NOT EXISTS {table_name}_topic
+                    ON {table_name} (stream_id, topic, number);
+                CREATE INDEX IF NOT EXISTS {table_name}_timestamp
+                    ON {table_name} (stream_id, timestamp);
+                CREATE INDEX IF NOT EXISTS {table_name}_trace
+                    ON {table_name} (stream_id, trace_id, number);
+                CREATE TABLE IF NOT EXISTS {table_name}_schemas (
+                    schema_id INTEGER PRIMARY KEY,
+                    names TEXT NOT NULL
+                );
+                """
+            )
+
+    def _load_schemas(self) -> None:
+        # Binary payloads are decoded with the schema they were written
+        # with, stored next to them
+        if self.record_format is None:
+            return
+
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT schema_id, names FROM {self.table_name}_schemas"
+            ).fetchall()
+
+        self.record_format.load_schemas(
+            {schema_id: json.loads(names) for schema_id, names in rows}
+        )
+        self.stored_schemas.update(schema_id for schema_id, _ in rows)
+
+    def schema_rows(
+        self, payloads: typing.Iterable[typing.Any]
+    ) -> typing.List[typing.Tuple[int, str]]:
+        # Schemas of binary payloads not stored yet
+        if self.record_format is None:
+            return []
+
+        schemas = self.record_format.payload_schemas(
+            p for p in payloads if isinstance(p, bytes)
+        )
+        return [
+            (schema_id, json.dumps(list(names)))
+            for schema_id, names in schemas.items()
+            if schema_id not in self.stored_schemas
+        ]
+
+    def session(self):
+        return SQLiteSession(self)
+
+    def get_records(
+        self,
+        stream_id: str,
+        *,
+        topic: str = None,
+        from_timestamp: datetime.datetime = None,
+        to_timestamp: datetime.datetime = None,
+        from_number: int = None,
+        to_number: int = None,
+    ) -> typing.Generator[EventRecord, None, None]:
+        conditions = ["stream_id = ?"]
+        parameters: typing.List[typing.Any] = [stream_id]
+
+        if topic is not None:
+            conditions.append("topic = ?")
+            parameters.append(topic)
+
+        if from_number is not None:
+            conditions.append("number >= ?")
+            parameters.append(from_number)
+
+        if to_number is not None:
+            conditions.append("number <= ?")
+            parameters.append(to_number)
+
+        if from_timestamp is not None:
+            conditions.append("timestamp >= ?")
+            parameters.append(_epoch(from_timestamp))
+
+        if to_timestamp is not None:
+            conditions.append("timestamp <= ?")
+            parameters.append(_epoch(to_timestamp))
+
+        query = (
+            f"{self.select_statement} WHERE {' AND '.join(conditions)} "
+            "ORDER BY number"
+        )
+
+        with self.lock:
+            rows = self.connection.execute(query, parameters).fetchall()
+
+        return (self.deserialize_row(r) for r in rows)
+
+    def get_trace_records(
+        self, stream_id: str, trace_id: str, *, from_number: int = None
+    ) -> typing.Iterable[EventRecord]:
+        query = f"{self.select_statement} WHERE stream_id = ? AND trace_id = ?"
+        parameters: typing.List[typing.Any] = [stream_id, trace_id]
+
+        if from_number is not None:
+            query += " AND number >= ?"
+            parameters.append(from_number)
+
+        query += " ORDER BY number"
+
+        with self.lock:
+            rows = self.connection.execute(query, parameters).fetchall()
+
+        return [self.deserialize_row(r) for r in rows]
+
+    def get_last_record(
+        self, stream_id: str, *, topic: str = None
+    ) -> typing.Optional[EventRecord]:
+        query = f"{self.select_statement} WHERE stream_id = ?"
+        parameters: typing.List[typing.Any] = [stream_id]
+
+        if topic is not None:
+            query += " AND topic = ?"
+            parameters.append(topic)
+
+        query += " ORDER BY number DESC LIMIT 1"
+
+        with self.lock:
+            row = self.connection.execute(query, parameters).fetchone()
+
+        if row is None:
+            return None
+
+        return self.deserialize_row(row)
+
+    def get_records_from_snapshot(
+        self, stream_id: str, snapshot_stream_id: str
+    ) -> typing.Tuple[typing.Optional[EventRecord], typing.List[EventRecord]]:
+        # Single statement, snapshot row first
+        columns = ", ".join(_COLUMNS)
+        query = f"""
+            WITH snapshot AS (
+                SELECT {columns} FROM {self.table_name}
+                WHERE stream_id = ? ORDER BY number DESC LIMIT 1
+            )
+            SELECT 1 AS is_snapshot, {columns} FROM snapshot
+            UNION ALL
+            SELECT 0 AS is_snapshot, {columns} FROM {self.table_name}
+            WHERE stream_id = ? AND (
+                NOT EXISTS (SELECT 1 FROM snapshot)
+                OR number > (SELECT number FROM snapshot)
+            )
+            ORDER BY is_snapshot DESC, number
+        """
+
+        with self.lock:
+            rows = self.connection.execute(
+                query, (snapshot_stream_id, stream_id)
+            ).fetchall()
+
+        snapshot = None
+        if len(rows) > 0 and rows[0][0] == 1:
+            snapshot = self.deserialize_row(rows[0][1:])
+            rows = rows[1:]
+
+        return snapshot, [self.deserialize_row(r[1:]) for r in rows]
+
+    def delete_records(self, stream_id: str, *, to_number: int) -> None:
+        with self.lock:
+            self.connection.execute(
+                f"DELETE FROM {self.table_name} "
+                "WHERE stream_id = ? AND number <= ?",
+                (stream_id, to_number),
+            )
+
+    def get_records_many(
+        self,
+        stream_ids: typing.Iterable[str],
+        *,
+        topic: str = None,
+        from_numbers: typing.Mapping[str, int] = None,
+    ) -> typing.Dict[str, typing.List[EventRecord]]:
+        # One query per chunk of streams, bound by sqlite variable limit
+        if from_numbers is None:
+            from_numbers = {}
+
+        records: typing.Dict[str, typing.List[EventRecord]] = {
+            stream_id: [] for stream_id in stream_ids
+        }
+
+        chunks = list(records)
+        for i in range(0, len(chunks), _MANY_CHUNK_SIZE):
+            conditions = []
+            parameters: typing.List[typing.Any] = []
+            for stream_id in chunks[i : i + _MANY_CHUNK_SIZE]:
+                conditions.append("(stream_id = ? AND number >= ?)")
+                parameters.append(stream_id)
+                parameters.append(from_numbers.get(stream_id, 0))
+
+            query = (
+                f"{self.select_statement} WHERE ({' OR '.join(conditions)})"
+            )
+            if topic is not None:
+                query += " AND topic = ?"
+                parameters.append(topic)
+
+            query += " ORDER BY stream_id, number"
+
+            with self.lock:
+                rows = self.connection.execute(query, parameters).fetchall()
+
+            for row in rows:
+                records[row[0]].append(self.deserialize_row(row))
+
+        return records
+
+    def get_all_records(
+        self, from_position: int = 0, batch_size: int = 100
+    ) -> typing.Generator[RecordBatch, None, None]:
+        # Position is the sequence column, writers are serialized so
+        # sequences become visible in order
+        position = from_position
+        while True:
+            with self.lock:
+                rows = self.connection.execute(
+                    self.select_all_statement, (position, batch_size)
+                ).fetchall()
+
+            if len(rows) == 0:
+                return
+
+            position = rows[-1][0]
+            yield RecordBatch(
+                [self.deserialize_row(r[1:]) for r in rows], position
+            )
+
+            if len(rows) < batch_size:
+                return
+
+    def serialize_row(self, event_record: EventRecord) -> tuple:
+        if self.record_format is not None:
+            payload = self.record_format.dumps_payload(event_record)
+        else:
+            payload = json.dumps(event_record.payload)
+
+        return (
+            event_record.stream_id,
+            event_record.number,
+            event_record.topic,
+            event_record.version,
+            event_record.timestamp,
+            event_record.trace_id,
+            event_record.message,
+            event_record.context,
+            payload,
+        )
+
+    def deserialize_row(self, row: tuple) -> EventRecord:
+        payload = row[8]
+        if isinstance(payload, bytes):
+            if self.record_format is None:
+                raise TypeError("record_format required for binary payloads")
+
+            try:
+                payload = self.record_format.loads_payload(
+                    payload, row[2], row[7]
+                )
+            except SchemaMismatchError:
+                # Schema stored by other connection after loading
+                self._load_schemas()
+                payload = self.record_format.loads_payload(
+                    payload, row[2], row[7]
+                )
+        else:
+            payload = json.loads(payload)
+
+        return EventRecord(
+            stream_id=row[0],
+            number=row[1],
+            topic=row[2],
+            version=row[3],
+            timestamp=row[4],
+            trace_id=row[5],
+            message=row[6],
+            context=row[7],
+            payload=payload,
+        )
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+
+class SQLiteSession(Session):
+    def __init__(self, record_manager):  # pylint: disable=all
+        self.record_manager = record_manager
+
+        self.heap = []
+        self.replaced = []
+
+    def append(self, event_record: EventRecord):
+        self.heap.append(event_record)
+
+    def replace(self, event_record: EventRecord):
+        self.replaced.append(event_record)
+
+    def commit(self):
+        try:
+            self._write(self.heap, self.replaced)
+        finally:
+            self.heap = []
+            self.replaced = []
+
+    def rollback(self):
+        self.heap = []
+        self.replaced = []
+
+    def _write(self, heap, replaced):
+        if len(heap) == 0 and len(replaced) == 0:
+            return
+
+        record_manager = self.record_manager
+        connection = record_manager.connection
+
+        inserts = [record_manager.serialize_row(r) for r in heap]
+        updates = [
+            record_manager.serialize_row(r)[2:] + (r.stream_id, r.number)
+            for r in replaced
+        ]
+        schemas = record_manager.schema_rows(
+            [row[8] for row in inserts] + [row[6] for row in updates]
+        )
+
+        with record_manager.lock:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                # Schemas commit with the payloads written with them
+                connection.executemany(
+                    record_manager.insert_schema_statement, schemas
+                )
+                connection.executemany(
+                    record_manager.insert_statement, inserts
+                )
+
+                if len(updates) > 0:
+                    cursor = connection.executemany(
+                        record_manager.update_statement, updates
+                    )
+                    if cursor.rowcount != len(updates):
+                        raise ConcurrencyError()
+
+                connection.execute("COMMIT")
+                record_manager.stored_schemas.update(s for s, _ in schemas)
+            except sqlite3.IntegrityError as error:
+                connection.execute("ROLLBACK")
+                raise ConcurrencyError() from error
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
@@ -4,6 +4,7 @@ import abc
 import typing
 import datetime
 import contextlib
+import dataclasses
 
 from domainpy.infrastructure.records import EventRecord
 
@@ -26,6 +27,94 @@ class EventRecordManager(abc.ABC):
     ) -> typing.Generator[EventRecord, None, None]:
         pass  # pragma: no cover
 
+    def get_trace_records(
+        self, stream_id: str, trace_id: str, *, from_number: int = None
+    ) -> typing.Iterable[EventRecord]:
+        # Filtered before payloads are decoded, managers able to filter
+        # in the query override this
+        return (
+            r
+            for r in self.get_records(stream_id, from_number=from_number)
+            if r.trace_id == trace_id
+        )
+
+    def get_last_record(
+        self, stream_id: str, *, topic: str = None
+    ) -> typing.Optional[EventRecord]:
+        # Managers read only the last record, this reads all of them
+        last_record = None
+        for last_record in self.get_records(stream_id, topic=topic):
+            pass
+
+        return last_record
+
+    def get_records_from_snapshot(
+        self, stream_id: str, snapshot_stream_id: str
+    ) -> typing.Tuple[typing.Optional[EventRecord], typing.List[EventRecord]]:
+        # Last record of snapshot stream and records of stream after it,
+        # managers able to read both at once override this
+        snapshot = self.get_last_record(snapshot_stream_id)
+
+        from_number = None
+        if snapshot is not None:
+            from_number = snapshot.number + 1
+
+        return snapshot, list(
+            self.get_records(stream_id, from_number=from_number)
+        )
+
+    def get_last_records_many(
+        self, stream_ids: typing.Iterable[str]
+    ) -> typing.Dict[str, typing.Optional[EventRecord]]:
+        # One stream after another, managers batch or parallelize reads
+        return {
+            stream_id: self.get_last_record(stream_id)
+            for stream_id in stream_ids
+        }
+
+    def delete_records(self, stream_id: str, *, to_number: int) -> None:
+        # Remove records of stream up to number, inclusive
+        raise NotImplementedError(
+            f"{self.__class__.__name__} does not support delete_records"
+        )
+
+    def get_records_many(
+        self,
+        stream_ids: typing.Iterable[str],
+        *,
+        topic: str = None,
+        from_numbers: typing.Mapping[str, int] = None,
+    ) -> typing.Dict[str, typing.List[EventRecord]]:
+        # One stream after another, managers batch or parallelize reads
+        if from_numbers is None:
+            from_numbers = {}
+
+        return {
+            stream_id: list(
+                self.get_records(
+                    stream_id,
+                    topic=topic,
+                    from_number=from_numbers.get(stream_id),
+                )
+            )
+            for stream_id in stream_ids
+        }
+
+    def get_all_records(
+        self, from_position: int = 0, batch_size: int = 100
+    ) -> typing.Generator[RecordBatch, None, None]:
+        # Records of all streams after from_position, in global order
+        raise NotImplementedError(
+            f"{self.__class__.__name__} does not support get_all_records"
+        )
+
+
+@dataclasses.dataclass(frozen=True)
+class RecordBatch:
+    records: typing.List[EventRecord]
+    # Position of last record, pass as from_position to resume
+    checkpoint: int
+
 
 class Session(contextlib.AbstractContextManager):
     def __enter__(self):
@@ -38,6 +127,12 @@ class Session(contextlib.AbstractContextManager):
     def append(self, event_record: EventRecord) -> None:
         pass  # pragma: no cover
 
+    def replace(self, event_record: EventRecord) -> None:
+        # Overwrite an already stored record, same stream_id and number
+        raise NotImplementedError(
+            f"{self.__class__.__name__} does not support replace"
+        )
+
     @abc.abstractmethod
     def commit(self) -> None:
         pass  # pragma: no cover
@@ -45,3 +140,78 @@ class Session(contextlib.AbstractContextManager):
     @abc.abstractmethod
     def rollback(self) -> None:
         pass  # pragma: no cover
+
+
+class AsyncEventRecordManager(abc.ABC):
+    @abc.abstractmethod
+    def session(self) -> AsyncSession:
+        pass  # pragma: no cover
+
+    @abc.abstractmethod
+    def get_records(
+        self,
+        stream_id: str,
+        *,
+        topic: str = None,
+        from_timestamp: datetime.datetime = None,
+        to_timestamp: datetime.datetime = None,
+        from_number: int = None,
+        to_number: int = None,
+    ) -> typing.AsyncIterator[EventRecord]:
+        pass  # pragma: no cover
+
+    async def get_last_record(
+        self, stream_id: str, *, topic: str = None
+    ) -> typing.Optional[EventRecord]:
+        # Managers read only the last record, this reads all of them
+        last_record = None
+        async for last_record in self.get_records(stream_id, topic=topic):
+            pass
+
+        return last_record
+
+    async def get_records_from_snapshot(
+        self, stream_id: str, snapshot_stream_id: str
+    ) -> typing.Tuple[typing.Optional[EventRecord], typing.List[EventRecord]]:
+        snapshot = await self.get_last_record(snapshot_stream_id)
+
+        from_number = None
+        if snapshot is not None:
+            from_number = snapshot.number + 1
+
+        return snapshot, [
+            record
+            async for record in self.get_records(
+                stream_id, from_number=from_number
+            )
+        ]
+
+    async def delete_records(self, stream_id: str, *, to_number: int) -> None:
+        raise NotImplementedError(
+            f"{self.__class__.__name__} does not support delete_records"
+        )
+
+
+class AsyncSession(contextlib.AbstractAsyncContextManager):
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args, **kwargs):
+        await self.rollback()
+
+    @abc.abstractmethod
+    def append(self, event_record: EventRecord) -> None:
+        pass  # pragma: no cover
+
+    def replace(self, event_record: EventRecord) -> None:
+        raise NotImplementedError(
+            f"{self.__class__.__name__} does not support replace"
+        )
+
+    @abc.abstractmethod
+    async def commit(self) -> None:
+        pass  # pragma: no cover
+
+    @abc.abstractmethod
+    async def rollback(self) -> None:
+        pass  # pragma: no cover
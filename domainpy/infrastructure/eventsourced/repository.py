@@ -1,16 +1,54 @@
 from __future__ import annotations
 
+import time
 import typing
 import dataclasses
 
+from domainpy.domain.model.aggregate import AggregateRoot
 from domainpy.domain.model.event import DomainEvent
+from domainpy.domain.model.history import SeenRetention
 from domainpy.domain.model.value_object import Identity
-from domainpy.domain.repository import IRepository, TAggregateRoot, TIdentity
+from domainpy.domain.repository import (
+    IAsyncRepository,
+    IRepository,
+    TAggregateRoot,
+    TIdentity,
+)
+from domainpy.exceptions import ConcurrencyError, VersionError
+from domainpy.infrastructure.eventsourced.cache import (
+    AggregateCache,
+    copy_aggregate,
+)
+from domainpy.infrastructure.eventsourced.eventstore import (
+    EventStoreHistory,
+)
 from domainpy.infrastructure.eventsourced.eventstream import EventStream
+from domainpy.infrastructure.eventsourced.snapshot import (
+    EventCountPolicy,
+    EventTypePolicy,
+    NeverPolicy,
+    ReplayStats,
+    ReplayStatsRegistry,
+    SnapshotPolicy,
+    estimate_size,
+    replay,
+)
+from domainpy.infrastructure.eventsourced.statesnapshot import (
+    AggregateSnapshot,
+    AggregateStateCodec,
+)
+from domainpy.infrastructure.eventsourced.snapshotwriter import (
+    AsyncSnapshotWriter,
+    SnapshotHint,
+    SnapshotWriter,
+)
 from domainpy.utils.bus import Bus, ISubscriber
 
 if typing.TYPE_CHECKING:  # pragma: no cover
-    from domainpy.infrastructure.eventsourced.eventstore import EventStore
+    from domainpy.infrastructure.eventsourced.eventstore import (
+        AsyncEventStore,
+        EventStore,
+    )
 
 
 @dataclasses.dataclass
@@ -18,6 +56,86 @@ class SnapshotConfiguration:
     enabled: bool
     every_n_events: typing.Optional[int] = None
     when_store_event: typing.Optional[typing.Type[DomainEvent]] = None
+    # Older snapshots beyond the newest retain are deleted
+    retain: typing.Optional[int] = None
+    # Replaces every_n_events and when_store_event
+    policy: typing.Optional[SnapshotPolicy] = None
+
+    def get_policy(self) -> SnapshotPolicy:
+        if self.policy is not None:
+            return self.policy
+
+        if self.every_n_events is not None:
+            return EventCountPolicy(self.every_n_events)
+
+        if self.when_store_event is not None:
+            return EventTypePolicy(self.when_store_event)
+
+        return NeverPolicy()
+
+
+def should_take_snapshot(
+    configuration: SnapshotConfiguration,
+    aggregate: AggregateRoot,
+    stats: ReplayStats,
+) -> bool:
+    # Stats include the changes about to be stored
+    if configuration.enabled:
+        policy = configuration.get_policy()
+        return policy.should_take_snapshot(aggregate, stats)
+
+    return False
+
+
+def project_stats(
+    configuration: SnapshotConfiguration,
+    aggregate: AggregateRoot,
+    stats: ReplayStats,
+) -> ReplayStats:
+    size = 0
+    if configuration.get_policy().measures_size:
+        size = sum(estimate_size(e) for e in aggregate.__changes__)
+
+    stats.extend(aggregate.__changes__, size)
+    return stats
+
+
+def take_snapshot(
+    state_codec: typing.Optional[AggregateStateCodec],
+    aggregate: AggregateRoot,
+) -> DomainEvent:
+    if state_codec is not None:
+        return state_codec.take_snapshot(aggregate)
+
+    return aggregate.take_snapshot()
+
+
+def restore_snapshot(
+    state_codec: typing.Optional[AggregateStateCodec],
+    aggregate: AggregateRoot,
+    snapshot: DomainEvent,
+) -> bool:
+    # False when the snapshot does not fit, stream is replayed from start
+    if isinstance(snapshot, AggregateSnapshot):
+        if state_codec is None:
+            return False
+
+        return state_codec.restore(aggregate, snapshot)
+
+    aggregate.__route__(snapshot, is_snapshot=True)
+    return True
+
+
+def register_state_snapshot(
+    event_store: typing.Union[EventStore, AsyncEventStore],
+    state_codec: typing.Optional[AggregateStateCodec],
+) -> None:
+    event_mapper = event_store.event_mapper
+    if (
+        state_codec is not None
+        and event_mapper.get("AggregateSnapshot") is None
+    ):
+        event_mapper.register(AggregateSnapshot)
 
 
 def make_adapter(
@@ -32,8 +150,17 @@ def make_adapter(
             event_store: EventStore,
             *,
             snapshot_configuration: SnapshotConfiguration = None,
+            cache: AggregateCache = None,
+            snapshot_writer: SnapshotWriter = None,
+            state_codec: AggregateStateCodec = None,
+            retention: SeenRetention = None,
         ) -> None:
             self.event_store = event_store
+            self.cache = cache
+            self.snapshot_writer = snapshot_writer
+            self.state_codec = state_codec
+            self.retention = retention
+            self.replay_stats = ReplayStatsRegistry()
 
             if snapshot_configuration is not None:
                 self.snapshot_configuration = snapshot_configuration
@@ -44,16 +171,49 @@ def make_adapter(
 
             self.event_bus = Bus[DomainEvent]()
 
+            register_state_snapshot(event_store, state_codec)
+
         def attach(self, subscriber: ISubscriber) -> None:
             self.event_bus.attach(subscriber)
 
         def save(self, aggregate: TAggregateRoot) -> None:
+            stream_id = aggregate.create_stream_id(aggregate.__identity__)
+
             events = EventStream(aggregate.__changes__)
-            self.event_store.store_events(events)
+            try:
+                self.event_store.store_events(events)
+            except ConcurrencyError:
+                if self.cache is not None:
+                    self.cache.invalidate(stream_id)
+                self.replay_stats.invalidate(stream_id)
+                raise
 
-            if self._should_take_snapshot(aggregate):
-                snapshot = self._take_snapshot(aggregate)
-                self.event_store.store_events(EventStream([snapshot]))
+            stats = project_stats(
+                self.snapshot_configuration,
+                aggregate,
+                self.replay_stats.get(stream_id),
+            )
+            if self._should_take_snapshot(aggregate, stats):
+                if self.snapshot_writer is not None:
+                    # Written from the stored stream, stats reset then
+                    self.snapshot_writer.request(
+                        self,
+                        SnapshotHint(
+                            aggregate_root_type,
+                            aggregate.__identity__,
+                            aggregate.__version__,
+                        ),
+                    )
+                else:
+                    self._store_snapshot(aggregate)
+                    stats = ReplayStats()
+
+            self.replay_stats.put(stream_id, stats)
+
+            if self.cache is not None:
+                cached = copy_aggregate(aggregate)
+                cached.__changes__ = []
+                self.cache.put(stream_id, cached)
 
             for event in events:
                 self.event_bus.publish(event)
@@ -61,66 +221,391 @@ def make_adapter(
         def get(
             self, identity: typing.Union[TIdentity, str]
         ) -> typing.Optional[TAggregateRoot]:
+            aggregate, _ = self._load(identity)
+            return aggregate
+
+        def _load(
+            self, identity: typing.Union[TIdentity, str]
+        ) -> typing.Tuple[typing.Optional[TAggregateRoot], ReplayStats]:
+            # Aggregate with stats of replaying it from its last snapshot
             if isinstance(identity, str):
                 identity = identity_type.from_text(identity)
 
-            aggregate = aggregate_root_type(typing.cast(Identity, identity))
+            stream_id = aggregate_root_type.create_stream_id(identity)
+            started_at = time.perf_counter()
 
-            if self._is_snapshot_enabled():
-                snapshot_stream_id = aggregate.create_snapshot_stream_id(
-                    identity
+            aggregate = self._pop_cached(stream_id)
+            is_cached = aggregate is not None
+
+            stats = ReplayStats()
+            if aggregate is not None:
+                stats = self.replay_stats.get(stream_id)
+                events = self.event_store.get_events(
+                    stream_id,
+                    from_number=aggregate.__version__ + 1,
                 )
-                snapshot = self._get_stored_snapshot(snapshot_stream_id)
-                if snapshot is not None:
-                    aggregate.__route__(snapshot, is_snapshot=True)
+            else:
+                aggregate = self._create(identity, stream_id)
 
-            from_number = None
-            if aggregate.__version__ > 0:
-                from_number = aggregate.__version__ + 1
+                if self._is_snapshot_enabled():
+                    events = self._route_snapshot(aggregate, stream_id)
+                else:
+                    events = self.event_store.get_events(stream_id)
 
-            stream_id = aggregate.create_stream_id(identity)
-            events = self.event_store.get_events(
-                stream_id,
-                from_number=from_number,
-            )
+            try:
+                stats += replay(
+                    aggregate,
+                    events,
+                    started_at=started_at,
+                    measure_size=self._measures_size(),
+                )
+            except VersionError:
+                if not is_cached:
+                    raise
 
-            for event in events:
-                aggregate.__route__(event)
+                # Stream no longer follows cached aggregate, entry is
+                # already dropped
+                return self._load(identity)
 
             if aggregate.__version__ == 0:
-                return None
+                return None, stats
+
+            self.replay_stats.put(stream_id, stats)
+            return self._put_cached(stream_id, aggregate), stats
+
+        def get_many(
+            self, identities: typing.Iterable[typing.Union[TIdentity, str]]
+        ) -> typing.Dict[typing.Any, TAggregateRoot]:
+            # Snapshots of all streams in one read, then events of all
+            # streams in another, missing aggregates are left out
+            aggregates = {}
+            uncached = []
+            cached_identities = {}
+            for identity in identities:
+                typed_identity = identity
+                if isinstance(identity, str):
+                    typed_identity = identity_type.from_text(identity)
+
+                stream_id = aggregate_root_type.create_stream_id(
+                    typed_identity
+                )
+                aggregate = self._pop_cached(stream_id)
+                if aggregate is None:
+                    aggregate = self._create(typed_identity, stream_id)
+                    uncached.append(aggregate)
+                else:
+                    cached_identities[stream_id] = identity
+
+                aggregates[identity] = aggregate
+
+            if self._is_snapshot_enabled() and len(uncached) > 0:
+                # Only the latest snapshot of each stream is read, one
+                # that does not fit leaves the stream to be replayed
+                snapshot_stream_ids = {
+                    a.create_snapshot_stream_id(a.__identity__): a
+                    for a in uncached
+                }
+                snapshots = self.event_store.get_last_events_many(
+                    snapshot_stream_ids
+                )
+                for stream_id, snapshot in snapshots.items():
+                    if snapshot is not None:
+                        restore_snapshot(
+                            self.state_codec,
+                            snapshot_stream_ids[stream_id],
+                            snapshot,
+                        )
+
+            stream_ids = {
+                a.create_stream_id(a.__identity__): a
+                for a in aggregates.values()
+            }
+            from_numbers = {
+                stream_id: a.__version__ + 1
+                for stream_id, a in stream_ids.items()
+                if a.__version__ > 0
+            }
+            streams = self.event_store.get_events_many(
+                stream_ids, from_numbers=from_numbers
+            )
+            # Reads are shared by all streams, only routing is measured
+            reloaded = {}
+            for stream_id, stream in streams.items():
+                aggregate = stream_ids[stream_id]
+                try:
+                    stats = replay(
+                        aggregate,
+                        stream,
+                        started_at=time.perf_counter(),
+                        measure_size=self._measures_size(),
+                    )
+                except VersionError:
+                    if stream_id not in cached_identities:
+                        raise
+
+                    # Stream no longer follows cached aggregate, entry is
+                    # already dropped
+                    reloaded[stream_id] = self.get(
+                        cached_identities[stream_id]
+                    )
+                    continue
+
+                if stream_id in cached_identities:
+                    stats = self.replay_stats.get(stream_id) + stats
+
+                if aggregate.__version__ > 0:
+                    self.replay_stats.put(stream_id, stats)
+
+            found = {}
+            for identity, aggregate in aggregates.items():
+                stream_id = aggregate.create_stream_id(aggregate.__identity__)
+                if stream_id in reloaded:
+                    if reloaded[stream_id] is not None:
+                        found[identity] = reloaded[stream_id]
+                elif aggregate.__version__ > 0:
+                    found[identity] = self._put_cached(stream_id, aggregate)
+
+            return found
 
+        def write_snapshot(self, hint: SnapshotHint) -> None:
+            aggregate, stats = self._load(
+                typing.cast(TIdentity, hint.identity)
+            )
+            if aggregate is None:
+                return
+
+            try:
+                self._store_snapshot(aggregate)
+            except ConcurrencyError:
+                # Latest version was snapshotted by an earlier hint
+                pass
+
+            # Events saved while writing are not in the snapshot
+            self.replay_stats.discount(hint.stream_id, stats)
+
+        def _store_snapshot(self, aggregate: TAggregateRoot) -> None:
+            snapshot = self._take_snapshot(aggregate)
+            self.event_store.store_events(EventStream([snapshot]))
+
+            retain = self.snapshot_configuration.retain
+            if retain is not None:
+                self.event_store.prune_stream(
+                    snapshot.__stream_id__, retain=retain
+                )
+
+        def _create(
+            self, identity: TIdentity, stream_id: str
+        ) -> TAggregateRoot:
+            aggregate = aggregate_root_type(typing.cast(Identity, identity))
+            if self.retention is not None:
+                aggregate.__retention__ = self.retention
+
+            # Selector looks up events that were not retained
+            aggregate.__history__ = EventStoreHistory(
+                self.event_store, stream_id
+            )
             return aggregate
 
+        def _pop_cached(
+            self, stream_id: str
+        ) -> typing.Optional[TAggregateRoot]:
+            if self.cache is None:
+                return None
+
+            return typing.cast(
+                typing.Optional[TAggregateRoot], self.cache.pop(stream_id)
+            )
+
+        def _put_cached(
+            self, stream_id: str, aggregate: TAggregateRoot
+        ) -> TAggregateRoot:
+            # Cached instance never leaves the cache, callers get a copy
+            if self.cache is None:
+                return aggregate
+
+            self.cache.put(stream_id, aggregate)
+            return copy_aggregate(aggregate)
+
         def _is_snapshot_enabled(self):
             return self.snapshot_configuration.enabled
 
-        def _should_take_snapshot(self, aggregate: TAggregateRoot) -> bool:
-            if self.snapshot_configuration.enabled:
-                every_n_events = self.snapshot_configuration.every_n_events
-                if every_n_events is not None:
-                    return len(aggregate.__seen__) >= every_n_events
-
-                when_store_event = self.snapshot_configuration.when_store_event
-                if when_store_event is not None:
-                    return len(aggregate.__changes__) >= 1 and isinstance(
-                        aggregate.__changes__[-1], when_store_event
+        def _measures_size(self) -> bool:
+            return self.snapshot_configuration.get_policy().measures_size
+
+        def _should_take_snapshot(
+            self, aggregate: TAggregateRoot, stats: ReplayStats
+        ) -> bool:
+            return should_take_snapshot(
+                self.snapshot_configuration, aggregate, stats
+            )
+
+        def _route_snapshot(
+            self, aggregate: TAggregateRoot, stream_id: str
+        ) -> EventStream:
+            # Snapshot and newer events in one read
+            store = self.event_store
+            snapshot, events = store.get_events_from_snapshot(
+                stream_id,
+                aggregate.create_snapshot_stream_id(aggregate.__identity__),
+            )
+            if snapshot is not None and not restore_snapshot(
+                self.state_codec, aggregate, snapshot
+            ):
+                return store.get_events(stream_id)
+
+            return events
+
+        def _take_snapshot(self, aggregate: TAggregateRoot) -> DomainEvent:
+            return take_snapshot(self.state_codec, aggregate)
+
+    return EventSourcedRepositoryAdapter
+
+
+def make_async_adapter(
+    aggregate_root_type: typing.Type[TAggregateRoot],
+    identity_type: typing.Type[TIdentity],
+):
+    class AsyncEventSourcedRepositoryAdapter(
+        IAsyncRepository[TAggregateRoot, TIdentity]
+    ):
+        def __init__(
+            self,
+            event_store: AsyncEventStore,
+            *,
+            snapshot_configuration: SnapshotConfiguration = None,
+            snapshot_writer: AsyncSnapshotWriter = None,
+            state_codec: AggregateStateCodec = None,
+            retention: SeenRetention = None,
+        ) -> None:
+            self.event_store = event_store
+            self.snapshot_writer = snapshot_writer
+            self.state_codec = state_codec
+            self.retention = retention
+            self.replay_stats = ReplayStatsRegistry()
+
+            if snapshot_configuration is not None:
+                self.snapshot_configuration = snapshot_configuration
+            else:
+                self.snapshot_configuration = SnapshotConfiguration(
+                    enabled=False
+                )
+
+            self.event_bus = Bus[DomainEvent]()
+
+            register_state_snapshot(event_store, state_codec)
+
+        def attach(self, subscriber: ISubscriber) -> None:
+            self.event_bus.attach(subscriber)
+
+        async def save(self, aggregate: TAggregateRoot) -> None:
+            stream_id = aggregate.create_stream_id(aggregate.__identity__)
+
+            events = EventStream(aggregate.__changes__)
+            try:
+                await self.event_store.store_events(events)
+            except ConcurrencyError:
+                self.replay_stats.invalidate(stream_id)
+                raise
+
+            configuration = self.snapshot_configuration
+            stats = project_stats(
+                configuration, aggregate, self.replay_stats.get(stream_id)
+            )
+            if should_take_snapshot(configuration, aggregate, stats):
+                if self.snapshot_writer is not None:
+                    self.snapshot_writer.request(
+                        self,
+                        SnapshotHint(
+                            aggregate_root_type,
+                            aggregate.__identity__,
+                            aggregate.__version__,
+                        ),
                     )
+                else:
+                    await self._store_snapshot(aggregate)
+                    stats = ReplayStats()
 
-            return False
+            self.replay_stats.put(stream_id, stats)
 
-        def _get_stored_snapshot(
-            self, snapshot_stream_id: str
-        ) -> typing.Optional[DomainEvent]:
-            snapshots = self.event_store.get_events(snapshot_stream_id)
+            for event in events:
+                self.event_bus.publish(event)
 
-            if len(snapshots) == 0:
-                return None
+        async def get(
+            self, identity: typing.Union[TIdentity, str]
+        ) -> typing.Optional[TAggregateRoot]:
+            aggregate, _ = await self._load(identity)
+            return aggregate
 
-            return snapshots[-1]
+        async def _load(
+            self, identity: typing.Union[TIdentity, str]
+        ) -> typing.Tuple[typing.Optional[TAggregateRoot], ReplayStats]:
+            # Aggregate with stats of replaying it from its last snapshot
+            if isinstance(identity, str):
+                identity = identity_type.from_text(identity)
 
-        @classmethod
-        def _take_snapshot(cls, aggregate: TAggregateRoot) -> DomainEvent:
-            return aggregate.take_snapshot()
+            aggregate = aggregate_root_type(typing.cast(Identity, identity))
+            if self.retention is not None:
+                aggregate.__retention__ = self.retention
 
-    return EventSourcedRepositoryAdapter
+            started_at = time.perf_counter()
+
+            stream_id = aggregate.create_stream_id(identity)
+            if self.snapshot_configuration.enabled:
+                events = await self._route_snapshot(aggregate, stream_id)
+            else:
+                events = await self.event_store.get_events(stream_id)
+
+            policy = self.snapshot_configuration.get_policy()
+            stats = replay(
+                aggregate,
+                events,
+                started_at=started_at,
+                measure_size=policy.measures_size,
+            )
+
+            if aggregate.__version__ == 0:
+                return None, stats
+
+            self.replay_stats.put(stream_id, stats)
+            return aggregate, stats
+
+        async def write_snapshot(self, hint: SnapshotHint) -> None:
+            aggregate, stats = await self._load(
+                typing.cast(TIdentity, hint.identity)
+            )
+            if aggregate is None:
+                return
+
+            try:
+                await self._store_snapshot(aggregate)
+            except ConcurrencyError:
+                pass
+
+            self.replay_stats.discount(hint.stream_id, stats)
+
+        async def _store_snapshot(self, aggregate: TAggregateRoot) -> None:
+            snapshot = take_snapshot(self.state_codec, aggregate)
+            await self.event_store.store_events(EventStream([snapshot]))
+
+            retain = self.snapshot_configuration.retain
+            if retain is not None:
+                await self.event_store.prune_stream(
+                    snapshot.__stream_id__, retain=retain
+                )
+
+        async def _route_snapshot(
+            self, aggregate: TAggregateRoot, stream_id: str
+        ) -> EventStream:
+            store = self.event_store
+            snapshot, events = await store.get_events_from_snapshot(
+                stream_id,
+                aggregate.create_snapshot_stream_id(aggregate.__identity__),
+            )
+            if snapshot is not None and not restore_snapshot(
+                self.state_codec, aggregate, snapshot
+            ):
+                return await store.get_events(stream_id)
+
+            return events
+
+    return AsyncEventSourcedRepositoryAdapter
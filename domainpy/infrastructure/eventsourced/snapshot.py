@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import abc
+import time
+import typing
+import threading
+import dataclasses
+import collections
+
+from domainpy.domain.model.aggregate import AggregateRoot
+from domainpy.domain.model.event import DomainEvent
+from domainpy.utils.data import SystemData
+
+
+@dataclasses.dataclass
+class ReplayStats:
+    # Cost of loading a stream from its last snapshot
+    events: int = 0
+    seconds: float = 0.0
+    size: int = 0
+
+    def __add__(self, other: ReplayStats) -> ReplayStats:
+        return ReplayStats(
+            self.events + other.events,
+            self.seconds + other.seconds,
+            self.size + other.size,
+        )
+
+    def __sub__(self, other: ReplayStats) -> ReplayStats:
+        return ReplayStats(
+            max(self.events - other.events, 0),
+            max(self.seconds - other.seconds, 0.0),
+            max(self.size - other.size, 0),
+        )
+
+    def extend(self, events: typing.Sequence[DomainEvent], size: int) -> None:
+        # New events are assumed to replay as fast as measured ones
+        if self.events > 0:
+            self.seconds += self.seconds / self.events * len(events)
+
+        self.events += len(events)
+        self.size += size
+
+
+class ReplayStatsRegistry:
+    # Replay stats by stream id, recorded on get and projected on save,
+    # least recently used are evicted above max_size
+
+    def __init__(self, max_size: int = 1024) -> None:
+        self.max_size = max_size
+
+        self._entries: collections.OrderedDict[
+            str, ReplayStats
+        ] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, stream_id: str) -> ReplayStats:
+        with self._lock:
+            stats = self._entries.get(stream_id)
+
+        if stats is None:
+            return ReplayStats()
+
+        return dataclasses.replace(stats)
+
+    def put(self, stream_id: str, stats: ReplayStats) -> None:
+        with self._lock:
+            self._entries[stream_id] = stats
+            self._entries.move_to_end(stream_id)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discount(self, stream_id: str, covered: ReplayStats) -> None:
+        # Stats a snapshot covers are taken out, those recorded since it
+        # was read are kept
+        with self._lock:
+            stats = self._entries.get(stream_id)
+            if stats is not None:
+                self._entries[stream_id] = stats - covered
+
+    def invalidate(self, stream_id: str) -> None:
+        with self._lock:
+            self._entries.pop(stream_id, None)
+
+
+class SnapshotPolicy(abc.ABC):
+    # Payload sizes are only estimated for policies that read them
+    measures_size: bool = False
+
+    @abc.abstractmethod
+    def should_take_snapshot(
+        self, aggregate: AggregateRoot, stats: ReplayStats
+    ) -> bool:
+        pass  # pragma: no cover
+
+
+class EventCountPolicy(SnapshotPolicy):
+    def __init__(self, every_n_events: int) -> None:
+        self.every_n_events = every_n_events
+
+    def should_take_snapshot(
+        self, aggregate: AggregateRoot, stats: ReplayStats
+    ) -> bool:
+        return stats.events >= self.every_n_events
+
+
+class EventTypePolicy(SnapshotPolicy):
+    def __init__(
+        self,
+        event_type: typing.Union[
+            typing.Type[DomainEvent], typing.Tuple[typing.Type[DomainEvent]]
+        ],
+    ) -> None:
+        self.event_type = event_type
+
+    def should_take_snapshot(
+        self, aggregate: AggregateRoot, stats: ReplayStats
+    ) -> bool:
+        changes = aggregate.__changes__
+        return len(changes) >= 1 and isinstance(changes[-1], self.event_type)
+
+
+class ReplayTimePolicy(SnapshotPolicy):
+    # Snapshot once loading takes longer than writing and reading one
+    def __init__(self, seconds: float) -> None:
+        self.seconds = seconds
+
+    def should_take_snapshot(
+        self, aggregate: AggregateRoot, stats: ReplayStats
+    ) -> bool:
+        return stats.seconds >= self.seconds
+
+
+class ReplaySizePolicy(SnapshotPolicy):
+    measures_size = True
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+
+    def should_take_snapshot(
+        self, aggregate: AggregateRoot, stats: ReplayStats
+    ) -> bool:
+        return stats.size >= self.size
+
+
+class AnyPolicy(SnapshotPolicy):
+    def __init__(self, *policies: SnapshotPolicy) -> None:
+        self.policies = policies
+        self.measures_size = any(p.measures_size for p in policies)
+
+    def should_take_snapshot(
+        self, aggregate: AggregateRoot, stats: ReplayStats
+    ) -> bool:
+        return any(
+            p.should_take_snapshot(aggregate, stats) for p in self.policies
+        )
+
+
+class AllPolicy(SnapshotPolicy):
+    def __init__(self, *policies: SnapshotPolicy) -> None:
+        self.policies = policies
+        self.measures_size = any(p.measures_size for p in policies)
+
+    def should_take_snapshot(
+        self, aggregate: AggregateRoot, stats: ReplayStats
+    ) -> bool:
+        return all(
+            p.should_take_snapshot(aggregate, stats) for p in self.policies
+        )
+
+
+class NeverPolicy(SnapshotPolicy):
+    def should_take_snapshot(
+        self, aggregate: AggregateRoot, stats: ReplayStats
+    ) -> bool:
+        return False
+
+
+def replay(
+    aggregate: AggregateRoot,
+    events: typing.Iterable[DomainEvent],
+    *,
+    started_at: float,
+    measure_size: bool = False,
+) -> ReplayStats:
+    # Routes events, time since started_at includes reading them
+    count = 0
+    size = 0
+    for event in events:
+        aggregate.__route__(event)
+
+        count += 1
+        if measure_size:
+            size += estimate_size(event)
+
+    return ReplayStats(count, time.perf_counter() - started_at, size)
+
+
+def estimate_size(value: typing.Any) -> int:
+    # Rough serialized size, strings and bytes by length, scalars fixed
+    if isinstance(value, (str, bytes)):
+        return len(value)
+
+    if isinstance(value, SystemData):
+        return estimate_size(value.__data__())
+
+    if isinstance(value, dict):
+        return sum(
+            estimate_size(k) + estimate_size(v) for k, v in value.items()
+        )
+
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sum(estimate_size(v) for v in value)
+
+    return 8
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import dataclasses
+import collections
+
+import domainpy.compat_typing as typing
+from domainpy.domain.model.aggregate import AggregateRoot
+from domainpy.domain.model.value_object import Identity
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass(frozen=True)
+class SnapshotHint:
+    aggregate_type: typing.Type[AggregateRoot]
+    identity: Identity
+    version: int
+
+    @property
+    def stream_id(self) -> str:
+        return self.aggregate_type.create_stream_id(self.identity)
+
+
+class ISnapshotRepository(typing.Protocol):
+    def write_snapshot(self, hint: SnapshotHint) -> None:
+        pass  # pragma: no cover
+
+
+class IAsyncSnapshotRepository(typing.Protocol):
+    async def write_snapshot(self, hint: SnapshotHint) -> None:
+        pass  # pragma: no cover
+
+
+def log_error(hint: SnapshotHint, error: Exception) -> None:
+    logger.error("snapshot of %s failed", hint.stream_id, exc_info=error)
+
+
+class _PendingHints:
+    # Hints waiting by stream id, a newer hint replaces the waiting one
+    # and keeps its place in line
+
+    def __init__(self) -> None:
+        self._entries: collections.OrderedDict[
+            str, typing.Tuple[typing.Any, SnapshotHint]
+        ] = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, repository: typing.Any, hint: SnapshotHint) -> None:
+        entry = self._entries.get(hint.stream_id)
+        if entry is None or entry[1].version < hint.version:
+            self._entries[hint.stream_id] = (repository, hint)
+
+    def pop(self) -> typing.Tuple[typing.Any, SnapshotHint]:
+        return self._entries.popitem(last=False)[1]
+
+
+class SnapshotWriter:
+    # Writes snapshots in a background thread, off the save path
+
+    def __init__(
+        self,
+        *,
+        on_error: typing.Callable[[SnapshotHint, Exception], None] = log_error,
+    ) -> None:
+        self.on_error = on_error
+
+        self._pending = _PendingHints()
+        self._writing = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread: typing.Optional[threading.Thread] = None
+
+    def request(
+        self, repository: ISnapshotRepository, hint: SnapshotHint
+    ) -> None:
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("snapshot writer is closed")
+
+            self._pending.add(repository, hint)
+
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="snapshot-writer", daemon=True
+                )
+                self._thread.start()
+
+            self._condition.notify_all()
+
+    def flush(self) -> None:
+        with self._condition:
+            self._condition.wait_for(
+                lambda: len(self._pending) == 0 and self._writing == 0
+            )
+
+    def close(self) -> None:
+        # Pending hints are written before the thread stops
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            thread = self._thread
+
+        if thread is not None:
+            thread.join()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: len(self._pending) > 0 or self._closed
+                )
+                if len(self._pending) == 0:
+                    return
+
+                repository, hint = self._pending.pop()
+                self._writing += 1
+
+            try:
+                repository.write_snapshot(hint)
+            except Exception as error:  # pylint: disable=broad-except
+                self.on_error(hint, error)
+            finally:
+                with self._condition:
+                    self._writing -= 1
+                    self._condition.notify_all()
+
+
+class AsyncSnapshotWriter:
+    # Writes snapshots in a task of the running loop, off the save path
+
+    def __init__(
+        self,
+        *,
+        on_error: typing.Callable[[SnapshotHint, Exception], None] = log_error,
+    ) -> None:
+        self.on_error = on_error
+
+        self._pending = _PendingHints()
+        self._closed = False
+        self._task: typing.Optional[asyncio.Task] = None
+        # Created on first request, bound to the running loop
+        self._idle: typing.Optional[asyncio.Event] = None
+
+    def request(
+        self, repository: IAsyncSnapshotRepository, hint: SnapshotHint
+    ) -> None:
+        if self._closed:
+            raise RuntimeError("snapshot writer is closed")
+
+        if self._idle is None:
+            self._idle = asyncio.Event()
+
+        self._pending.add(repository, hint)
+        self._idle.clear()
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def flush(self) -> None:
+        if self._idle is not None:
+            await self._idle.wait()
+
+    async def close(self) -> None:
+        # Pending hints are written before it returns
+        self._closed = True
+        await self.flush()
+
+    async def _run(self) -> None:
+        # Idle even when cancelled, flush never waits on a dead task
+        try:
+            while len(self._pending) > 0:
+                repository, hint = self._pending.pop()
+                try:
+                    await repository.write_snapshot(hint)
+                except Exception as error:  # pylint: disable=broad-except
+                    self.on_error(hint, error)
+        finally:
+            typing.cast(asyncio.Event, self._idle).set()
@@ -0,0 +1,192 @@
+import zlib
+import inspect
+import contextvars
+
+import domainpy.compat_typing as typing
+
+from domainpy.domain.model.aggregate import AggregateRoot
+from domainpy.domain.model.entity import DomainEntity
+from domainpy.domain.model.event import DomainEvent
+from domainpy.domain.model.value_object import Identity
+from domainpy.infrastructure.transcoder import ICodec, Transcoder
+from domainpy.utils.data import (
+    Field,
+    SystemData,
+    get_fields,
+    get_type_name,
+    is_meta_field_name,
+)
+
+# Aggregate being restored, owner of decoded child entities
+_restoring: "contextvars.ContextVar[AggregateRoot]" = contextvars.ContextVar(
+    "restoring"
+)
+
+
+class AggregateSnapshot(DomainEvent):
+    # State of annotated fields, schema is the state_schema_id it was
+    # taken with
+    __version__: int = 1
+
+    schema: int
+    state: typing.Dict[str, typing.Any]
+
+
+def get_state_fields(cls: typing.Type) -> typing.Tuple[Field, ...]:
+    return tuple(f for f in get_fields(cls) if not is_meta_field_name(f.name))
+
+
+def state_schema_id(cls: typing.Type) -> int:
+    # Fingerprint of state fields, of child entities and of value
+    # objects in them, changes whenever a snapshot would not fit
+    signature = _state_signature(cls, set())
+    return zlib.crc32(signature.encode("utf-8"))
+
+
+def _state_signature(cls: typing.Type, seen: typing.Set[typing.Type]) -> str:
+    seen.add(cls)
+    return ";".join(
+        f"{f.name}:{_type_signature(f.type, seen)}"
+        for f in get_state_fields(cls)
+    )
+
+
+def _type_signature(
+    objtype: typing.Type, seen: typing.Set[typing.Type]
+) -> str:
+    args = typing.get_args(objtype)
+    if len(args) > 0:
+        inner = ",".join(_type_signature(a, seen) for a in args)
+        return f"{get_type_name(typing.get_origin(objtype))}[{inner}]"
+
+    name = get_type_name(objtype)
+    if inspect.isclass(objtype):
+        if issubclass(objtype, DomainEntity) and objtype not in seen:
+            return f"{name}{{{_state_signature(objtype, seen)}}}"
+
+        if issubclass(objtype, SystemData):
+            return f"{name}#{objtype.__schema__.id}"
+
+    return name
+
+
+class AggregateStateCodec:
+    # Snapshots of any aggregate from its annotated fields, restored
+    # without routing events. Child entities are encoded the same way
+
+    def __init__(self, transcoder: Transcoder = None) -> None:
+        if transcoder is None:
+            transcoder = Transcoder()
+
+        # Entity codec is private, shared transcoder keeps its encoding
+        self.transcoder = transcoder.derive(DomainEntityCodec(self))
+
+        self._schema_ids: typing.Dict[typing.Type, int] = {}
+
+    def schema_id(self, cls: typing.Type) -> int:
+        schema_id = self._schema_ids.get(cls)
+        if schema_id is None:
+            schema_id = state_schema_id(cls)
+            self._schema_ids[cls] = schema_id
+
+        return schema_id
+
+    def take_snapshot(self, aggregate: AggregateRoot) -> AggregateSnapshot:
+        trace_id, context = None, None
+        if len(aggregate.__changes__) > 0:
+            last = aggregate.__changes__[-1]
+        else:
+            last = aggregate.__seen__.last()
+
+        if last is not None:
+            trace_id = last.__trace_id__
+            context = last.__context__
+
+        stamp = AggregateSnapshot.stamp(
+            aggregate.create_snapshot_stream_id(aggregate.__identity__),
+            aggregate.__version__,
+            trace_id=trace_id,
+            context=context,
+        )
+        return stamp(
+            schema=self.schema_id(type(aggregate)),
+            state=self.encode_state(aggregate),
+        )
+
+    def restore(
+        self, aggregate: AggregateRoot, snapshot: AggregateSnapshot
+    ) -> bool:
+        # False when the snapshot was taken with other schema
+        if snapshot.schema != self.schema_id(type(aggregate)):
+            return False
+
+        token = _restoring.set(aggregate)
+        try:
+            self.decode_state(aggregate, snapshot.state)
+        finally:
+            _restoring.reset(token)
+
+        aggregate.__version__ = snapshot.__number__
+        return True
+
+    def encode_state(self, obj: typing.Any) -> typing.Dict[str, typing.Any]:
+        # Fields never assigned are left out
+        encode = self.transcoder.encode
+        state = {}
+        for field in get_state_fields(type(obj)):
+            if field.name in obj.__dict__:
+                state[field.name] = encode(
+                    obj.__dict__[field.name], field.type
+                )
+
+        return state
+
+    def decode_state(
+        self, obj: typing.Any, state: typing.Dict[str, typing.Any]
+    ) -> None:
+        decode = self.transcoder.decode
+        for field in get_state_fields(type(obj)):
+            if field.name in state:
+                setattr(obj, field.name, decode(state[field.name], field.type))
+
+
+class DomainEntityCodec(ICodec):
+    def __init__(self, state_codec: AggregateStateCodec) -> None:
+        self.state_codec = state_codec
+
+    def can_handle(self, field_type: typing.Type) -> bool:
+        return (
+            inspect.isclass(field_type)
+            and issubclass(field_type, DomainEntity)
+            and not issubclass(field_type, AggregateRoot)
+        )
+
+    def encode(self, obj: typing.Any, field_type: typing.Type) -> typing.Any:
+        identity_type = self._get_identity_type(field_type)
+        return {
+            "identity": self.state_codec.transcoder.encode(
+                obj.__identity__, identity_type
+            ),
+            "state": self.state_codec.encode_state(obj),
+        }
+
+    def decode(self, data: dict, field_type: typing.Type) -> typing.Any:
+        identity_type = self._get_identity_type(field_type)
+
+        # Entities are not constructed, __init__ may apply events
+        entity = field_type.__new__(field_type)
+        entity.__identity__ = self.state_codec.transcoder.decode(
+            data["identity"], identity_type
+        )
+        entity.__aggregate__ = _restoring.get()
+        self.state_codec.decode_state(entity, data["state"])
+        return entity
+
+    @classmethod
+    def _get_identity_type(cls, field_type: typing.Type) -> typing.Type:
+        # Declared as __identity__ annotation of the entity
+        for field in get_fields(field_type):
+            if field.name == "__identity__":
+                return field.type
+
+        return Identity
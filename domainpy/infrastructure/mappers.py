@@ -1,4 +1,5 @@
 import typing
+import dataclasses
 
 from domainpy.exceptions import DefinitionError
 from domainpy.infrastructure.transcoder import Transcoder
@@ -10,11 +11,44 @@ class MessageTypeNotFoundError(Exception):
     pass
 
 
+Upcaster = typing.Callable[[dict], dict]
+
+
+class UpcasterChain:
+    # Composed upcasters from a record version up to latest known version
+
+    __slots__ = ["version", "upcasters"]
+
+    def __init__(
+        self, version: int, upcasters: typing.Sequence[Upcaster]
+    ) -> None:
+        self.version = version
+        self.upcasters = tuple(upcasters)
+
+    def __call__(self, payload: dict) -> dict:
+        # Single copy, upcasters may mutate the dict in place
+        payload = dict(payload)
+        for upcaster in self.upcasters:
+            payload = upcaster(payload)
+
+        return payload
+
+    def __repr__(self):  # pragma: no cover
+        return f"{self.__class__.__name__}(version={self.version})"
+
+
 class Mapper:
-    def __init__(self, transcoder: Transcoder) -> None:
+    def __init__(self, transcoder: Transcoder, *, lazy: bool = False) -> None:
         self.transcoder = transcoder
+        self.lazy = lazy
 
         self._map: typing.Dict[str, typing.Any] = {}
+        self._upcasters: typing.Dict[
+            typing.Tuple[str, str, int], typing.Tuple[int, Upcaster]
+        ] = {}
+        self._chains: typing.Dict[
+            typing.Tuple[str, str, int], typing.Optional[UpcasterChain]
+        ] = {}
 
     def register(self, cls):
         context = getattr(cls, "__context__", "default")
@@ -46,6 +80,78 @@ class Mapper:
 
         return None
 
+    def get_subclasses(self, cls) -> typing.List[type]:
+        # Registered classes of cls or its subclasses, cls may be a tuple
+        found = {id(c): c for c in self._map.values() if issubclass(c, cls)}
+        return list(found.values())
+
+    def register_upcaster(
+        self,
+        topic: str,
+        from_version: int,
+        to_version: int,
+        upcaster: Upcaster,
+        *,
+        context: str = "default",
+    ) -> Upcaster:
+        if to_version <= from_version:
+            raise DefinitionError(
+                "to_version should be greater than from_version"
+            )
+
+        key = (context, topic, from_version)
+        if key in self._upcasters:
+            raise DefinitionError(
+                f"Upcaster already registered for {topic} "
+                f"version {from_version}"
+            )
+
+        self._upcasters[key] = (to_version, upcaster)
+        self._chains.clear()
+        return upcaster
+
+    def upcast(self, record: InfrastructureRecord) -> InfrastructureRecord:
+        if len(self._upcasters) == 0:
+            return record
+
+        chain = self._get_chain(
+            getattr(record, "context", "default"),
+            record.topic,
+            record.version,
+        )
+        if chain is None:
+            return record
+
+        return dataclasses.replace(
+            record, version=chain.version, payload=chain(record.payload)
+        )
+
+    def _get_chain(
+        self, context: str, topic: str, version: int
+    ) -> typing.Optional[UpcasterChain]:
+        key = (context, topic, version)
+        if key in self._chains:
+            return self._chains[key]
+
+        upcasters = []
+        current = version
+        while True:
+            step = self._upcasters.get((context, topic, current))
+            if step is None:
+                step = self._upcasters.get(("default", topic, current))
+            if step is None:
+                break
+
+            current, upcaster = step
+            upcasters.append(upcaster)
+
+        chain = None
+        if len(upcasters) > 0:
+            chain = UpcasterChain(current, upcasters)
+
+        self._chains[key] = chain
+        return chain
+
     def serialize(
         self, message: InfrastructureMessage
     ) -> InfrastructureRecord:
@@ -56,6 +162,8 @@ class Mapper:
     def deserialize(
         self, record: InfrastructureRecord
     ) -> InfrastructureMessage:
+        record = self.upcast(record)
+
         context = getattr(record, "context", "default")
         topic = record.topic
 
@@ -63,4 +171,67 @@ class Mapper:
         if message_type is None:
             raise MessageTypeNotFoundError(f"unable to find type {topic}")
 
-        return self.transcoder.deserialize(record, message_type)
+        return self.transcoder.deserialize(
+            record, message_type, lazy=self.lazy
+        )
+
+    def serialize_many(
+        self, messages: typing.Iterable[InfrastructureMessage]
+    ) -> typing.List[InfrastructureRecord]:
+        serializers: typing.Dict[type, typing.Callable] = {}
+
+        records = []
+        for message in messages:
+            message_type = type(message)
+
+            serializer = serializers.get(message_type)
+            if serializer is None:
+                serializer = self.transcoder.get_serializer(message_type)
+                serializers[message_type] = serializer
+
+            records.append(serializer(message))
+
+        return records
+
+    def deserialize_many(
+        self,
+        records: typing.Iterable[InfrastructureRecord],
+        *,
+        stream: bool = False,
+    ) -> typing.Union[
+        typing.List[InfrastructureMessage],
+        typing.Generator[InfrastructureMessage, None, None],
+    ]:
+        messages = self._deserialize_many(records)
+        if stream:
+            return messages
+
+        return list(messages)
+
+    def _deserialize_many(
+        self, records: typing.Iterable[InfrastructureRecord]
+    ) -> typing.Generator[InfrastructureMessage, None, None]:
+        # Type is resolved once per (context, topic) group
+        deserializers: typing.Dict[
+            typing.Tuple[str, str], typing.Callable
+        ] = {}
+
+        for record in records:
+            record = self.upcast(record)
+
+            key = (getattr(record, "context", "default"), record.topic)
+
+            deserializer = deserializers.get(key)
+            if deserializer is None:
+                message_type = self.get(key[1], key[0])
+                if message_type is None:
+                    raise MessageTypeNotFoundError(
+                        f"unable to find type {key[1]}"
+                    )
+
+                deserializer = self.transcoder.get_deserializer(
+                    message_type, lazy=self.lazy
+                )
+                deserializers[key] = deserializer
+
+            yield deserializer(record)
@@ -4,11 +4,15 @@ import typing
 import boto3  # type: ignore
 
 from domainpy.infrastructure.publishers.base import Publisher
-from domainpy.infrastructure.transcoder import record_asdict
-from domainpy.utils.dynamodb import client_serialize as serialize
+from domainpy.infrastructure.recordformat import RecordFormat
+from domainpy.utils.dynamodb import (
+    client_serialize as serialize,
+    client_serialize_record as serialize_record,
+)
 
 if typing.TYPE_CHECKING:  # pragma: no cover
     from domainpy.typing.infrastructure import (
+        InfrastructureMessage,
         SequenceOfInfrastructureMessage,
     )
     from domainpy.infrastructure.mappers import Mapper
@@ -20,11 +24,14 @@ class AwsDynamoDBTablePublisher(Publisher):
         table_name: str,
         mapper: Mapper,
         sort_key: typing.Optional[str] = None,
+        *,
+        record_format: typing.Optional[RecordFormat] = None,
         **kwargs
     ) -> None:
         self.table_name = table_name
         self.mapper = mapper
         self.sort_key = sort_key
+        self.record_format = record_format
 
         self.client = boto3.client("dynamodb", **kwargs)
 
@@ -42,7 +49,7 @@ class AwsDynamoDBTablePublisher(Publisher):
                 "TableName": self.table_name,
                 "Item": {
                     "trace_id": serialize(m.__trace_id__),
-                    "body": serialize(record_asdict(self.mapper.serialize(m))),
+                    "body": self._serialize_body(m),
                 },
             }
             for m in messages
@@ -51,6 +58,14 @@ class AwsDynamoDBTablePublisher(Publisher):
         for entry in entries:
             self.client.put_item(**entry)
 
+    def _serialize_body(self, message: InfrastructureMessage) -> dict:
+        record = self.mapper.serialize(message)
+
+        if self.record_format is not None:
+            return {"B": self.record_format.dumps(record)}
+
+        return serialize_record(record)
+
     def _publish_with_partition_key_and_sort_key(
         self, messages: SequenceOfInfrastructureMessage
     ):
@@ -64,7 +79,7 @@ class AwsDynamoDBTablePublisher(Publisher):
                 "Item": {
                     "trace_id": serialize(m.__trace_id__),
                     _sort_key: serialize(getattr(messages, _sort_key)),
-                    "body": serialize(record_asdict(self.mapper.serialize(m))),
+                    "body": self._serialize_body(m),
                 },
             }
             for m in messages
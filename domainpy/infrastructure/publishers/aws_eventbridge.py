@@ -30,7 +30,9 @@ class AwsEventBridgePublisher(Publisher):
         entries = [
             {
                 "Source": self.context,
-                "Detail": json.dumps(record_asdict(self.mapper.serialize(m))),
+                "Detail": json.dumps(
+                    record_asdict(self.mapper.serialize(m), shallow=True)
+                ),
                 "DetailType": m.__class__.__name__,
                 "EventBusName": self.bus_name,
             }
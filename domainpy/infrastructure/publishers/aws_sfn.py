@@ -32,7 +32,9 @@ class AwsStepFunctionSchedulerPublisher(Publisher):
                 "input": json.dumps(
                     {
                         "publish_at": getattr(m, m.__publish_at_field__),
-                        "payload": record_asdict(self.mapper.serialize(m)),
+                        "payload": record_asdict(
+                            self.mapper.serialize(m), shallow=True
+                        ),
                     }
                 ),
             }
@@ -1,12 +1,14 @@
 from __future__ import annotations
 
-import json
 import typing
 import boto3  # type: ignore
 
 from domainpy.exceptions import PublisherError
 from domainpy.infrastructure.publishers.base import Publisher
-from domainpy.infrastructure.transcoder import record_asdict
+from domainpy.infrastructure.recordformat import (
+    JsonRecordFormat,
+    RecordFormat,
+)
 
 if typing.TYPE_CHECKING:  # pragma: no cover
     from domainpy.typing.infrastructure import (
@@ -16,11 +18,23 @@ if typing.TYPE_CHECKING:  # pragma: no cover
 
 
 class AwsSimpleNotificationServicePublisher(Publisher):
-    def __init__(self, topic_arn: str, context: str, mapper: Mapper, **kwargs):
+    def __init__(
+        self,
+        topic_arn: str,
+        context: str,
+        mapper: Mapper,
+        *,
+        record_format: RecordFormat = None,
+        **kwargs,
+    ):
         self.topic_arn = topic_arn
         self.context = context
         self.mapper = mapper
 
+        if record_format is None:
+            record_format = JsonRecordFormat()
+        self.record_format = record_format
+
         self.client = boto3.client("sns", **kwargs)
 
     def _publish(
@@ -45,8 +59,14 @@ class AwsSimpleNotificationServicePublisher(Publisher):
                         "DataType": "String",
                         "StringValue": m.__class__.__name__,
                     },
+                    "content_type": {
+                        "DataType": "String",
+                        "StringValue": self.record_format.content_type,
+                    },
                 },
-                "Message": json.dumps(record_asdict(self.mapper.serialize(m))),
+                "Message": self.record_format.dumps_text(
+                    self.mapper.serialize(m)
+                ),
             }
             for m in messages
         ]
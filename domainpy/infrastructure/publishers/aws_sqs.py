@@ -1,12 +1,14 @@
 from __future__ import annotations
 
-import json
 import typing
 import boto3  # type: ignore
 
 from domainpy.exceptions import PublisherError
 from domainpy.infrastructure.publishers.base import Publisher
-from domainpy.infrastructure.transcoder import record_asdict
+from domainpy.infrastructure.recordformat import (
+    JsonRecordFormat,
+    RecordFormat,
+)
 
 if typing.TYPE_CHECKING:  # pragma: no cover
     from domainpy.typing.infrastructure import (
@@ -16,10 +18,21 @@ if typing.TYPE_CHECKING:  # pragma: no cover
 
 
 class AwsSimpleQueueServicePublisher(Publisher):
-    def __init__(self, queue_url: str, mapper: Mapper, **kwargs):
+    def __init__(
+        self,
+        queue_url: str,
+        mapper: Mapper,
+        *,
+        record_format: RecordFormat = None,
+        **kwargs,
+    ):
         self.queue_url = queue_url
         self.mapper = mapper
 
+        if record_format is None:
+            record_format = JsonRecordFormat()
+        self.record_format = record_format
+
         self.client = boto3.client("sqs", **kwargs)
 
     def _publish(
@@ -29,8 +42,8 @@ class AwsSimpleQueueServicePublisher(Publisher):
         entries = [
             {
                 "QueueUrl": self.queue_url,
-                "MessageBody": json.dumps(
-                    record_asdict(self.mapper.serialize(m))
+                "MessageBody": self.record_format.dumps_text(
+                    self.mapper.serialize(m)
                 ),
             }
             for m in messages
@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import abc
+import json
+import base64
+import dataclasses
+
+import domainpy.compat_typing as typing
+
+from domainpy.infrastructure.mappers import MessageTypeNotFoundError
+from domainpy.infrastructure.records import (
+    CommandRecord,
+    QueryRecord,
+    IntegrationRecord,
+    EventRecord,
+)
+from domainpy.infrastructure.transcoder import record_asdict, record_fromdict
+from domainpy.typing.infrastructure import InfrastructureRecord
+from domainpy.utils.binary import (
+    Buffer,
+    BinaryFormatError,
+    pack_value,
+    unpack_value,
+    read_uint32,
+    read_varint,
+    write_uint32,
+    write_varint,
+)
+
+if typing.TYPE_CHECKING:  # pragma: no cover
+    from domainpy.infrastructure.mappers import Mapper
+    from domainpy.utils.data import Schema
+
+
+class SchemaMismatchError(Exception):
+    pass
+
+
+class RecordFormat(abc.ABC):
+    content_type: str
+
+    @abc.abstractmethod
+    def dumps(self, record: InfrastructureRecord) -> bytes:
+        pass  # pragma: no cover
+
+    @abc.abstractmethod
+    def loads(self, data: Buffer) -> InfrastructureRecord:
+        pass  # pragma: no cover
+
+    def dumps_text(self, record: InfrastructureRecord) -> str:
+        return base64.b64encode(self.dumps(record)).decode("ascii")
+
+    def loads_text(self, text: str) -> InfrastructureRecord:
+        return self.loads(base64.b64decode(text))
+
+
+class JsonRecordFormat(RecordFormat):
+    content_type = "application/json"
+
+    def dumps(self, record: InfrastructureRecord) -> bytes:
+        return self.dumps_text(record).encode("utf-8")
+
+    def loads(self, data: Buffer) -> InfrastructureRecord:
+        return self.loads_text(str(data, "utf-8"))
+
+    def dumps_text(self, record: InfrastructureRecord) -> str:
+        return json.dumps(record_asdict(record, shallow=True))
+
+    def loads_text(self, text: str) -> InfrastructureRecord:
+        return record_fromdict(json.loads(text))
+
+
+_MAGIC = 0xDB
+_FORMAT_VERSION = 1
+
+_RECORD_TYPES: typing.Tuple[type, ...] = (
+    CommandRecord,
+    QueryRecord,
+    IntegrationRecord,
+    EventRecord,
+)
+_RECORD_META_FIELDS = {
+    record_type: tuple(
+        f.name for f in dataclasses.fields(record_type) if f.name != "payload"
+    )
+    for record_type in _RECORD_TYPES
+}
+
+
+class BinaryRecordFormat(RecordFormat):
+    # Layout:
+    #   magic, format version, record kind (1 byte each)
+    #   schema id of message class (uint32)
+    #   record meta attributes, in dataclass order (tagged values)
+    #   payload: count, then (field id, tagged value) pairs
+    # Field ids are the position in the payload fields of the schema the
+    # record was written with, names are never written for top level
+    # payload fields
+    content_type = "application/vnd.domainpy.record"
+
+    def __init__(
+        self,
+        mapper: Mapper,
+        schemas: typing.MutableMapping[int, typing.Sequence[str]] = None,
+    ) -> None:
+        # schemas: payload field names by schema id of every schema
+        # written, records are decoded with the schema they were written
+        # with. Record managers store the schemas of their payloads and
+        # load them back, see payload_schemas and load_schemas
+        if schemas is None:
+            schemas = {}
+
+        self.mapper = mapper
+        self.schemas = schemas
+
+        self._field_ids: typing.Dict[int, typing.Dict[str, int]] = {}
+
+    def register_schema(self, schema: Schema) -> None:
+        if schema.id not in self.schemas:
+            self.schemas[schema.id] = tuple(
+                f.name for f in schema.payload_fields
+            )
+
+    def load_schemas(
+        self, schemas: typing.Mapping[int, typing.Sequence[str]]
+    ) -> None:
+        for schema_id, names in schemas.items():
+            self.schemas.setdefault(schema_id, tuple(names))
+
+    def payload_schemas(
+        self, payloads: typing.Iterable[Buffer]
+    ) -> typing.Dict[int, typing.Sequence[str]]:
+        # Field names of the schemas payloads were written with
+        schemas = {}
+        for payload in payloads:
+            schema_id, _ = read_uint32(memoryview(payload), 0)
+            schemas[schema_id] = self.schemas[schema_id]
+
+        return schemas
+
+    def dumps(self, record: InfrastructureRecord) -> bytes:
+        record_type = type(record)
+        schema = self._get_schema(record)
+
+        buffer = bytearray((_MAGIC, _FORMAT_VERSION))
+        buffer.append(_RECORD_TYPES.index(record_type))
+        write_uint32(buffer, schema.id)
+
+        for name in _RECORD_META_FIELDS[record_type]:
+            pack_value(buffer, getattr(record, name))
+
+        self._pack_payload(buffer, schema, record.payload)
+        return bytes(buffer)
+
+    def loads(self, data: Buffer) -> InfrastructureRecord:
+        view = memoryview(data)
+
+        if view[0] != _MAGIC or view[1] != _FORMAT_VERSION:
+            raise BinaryFormatError("not a binary record")
+
+        record_type = _RECORD_TYPES[view[2]]
+        schema_id, offset = read_uint32(view, 3)
+
+        dct = {}
+        for name in _RECORD_META_FIELDS[record_type]:
+            dct[name], offset = unpack_value(view, offset)
+
+        names = self._get_field_names(
+            schema_id, dct["topic"], dct.get("context", "default")
+        )
+
+        dct["payload"], _ = self._unpack_payload(view, offset, names)
+        return record_type(**dct)
+
+    def dumps_payload(self, record: InfrastructureRecord) -> bytes:
+        schema = self._get_schema(record)
+
+        buffer = bytearray()
+        write_uint32(buffer, schema.id)
+        self._pack_payload(buffer, schema, record.payload)
+        return bytes(buffer)
+
+    def loads_payload(
+        self, data: Buffer, topic: str, context: str = "default"
+    ) -> dict:
+        view = memoryview(data)
+
+        schema_id, offset = read_uint32(view, 0)
+        names = self._get_field_names(schema_id, topic, context)
+
+        payload, _ = self._unpack_payload(view, offset, names)
+        return payload
+
+    def _pack_payload(
+        self, buffer: bytearray, schema: Schema, payload: dict
+    ) -> None:
+        field_ids = self._field_ids.get(schema.id)
+        if field_ids is None:
+            self.register_schema(schema)
+            field_ids = {
+                f.name: i for i, f in enumerate(schema.payload_fields)
+            }
+            self._field_ids[schema.id] = field_ids
+
+        write_varint(buffer, len(payload))
+        for name, value in payload.items():
+            try:
+                write_varint(buffer, field_ids[name])
+            except KeyError as error:
+                raise SchemaMismatchError(
+                    f"field {name} not in schema {schema.id}"
+                ) from error
+
+            pack_value(buffer, value)
+
+    @classmethod
+    def _unpack_payload(
+        cls, view: memoryview, offset: int, names: typing.Sequence[str]
+    ) -> typing.Tuple[dict, int]:
+        count, offset = read_varint(view, offset)
+
+        payload = {}
+        for _ in range(count):
+            field_id, offset = read_varint(view, offset)
+            payload[names[field_id]], offset = unpack_value(view, offset)
+
+        return payload, offset
+
+    def _get_field_names(
+        self, schema_id: int, topic: str, context: str
+    ) -> typing.Sequence[str]:
+        # Schema of the writer, current class schema if never registered
+        names = self.schemas.get(schema_id)
+        if names is not None:
+            return names
+
+        schema = self._get_schema_of(topic, context)
+        if schema.id != schema_id:
+            raise SchemaMismatchError(
+                f"record schema {schema_id} of {topic} is not registered"
+            )
+
+        self.register_schema(schema)
+        return self.schemas[schema_id]
+
+    def _get_schema(self, record: InfrastructureRecord) -> Schema:
+        return self._get_schema_of(
+            record.topic, getattr(record, "context", "default")
+        )
+
+    def _get_schema_of(self, topic: str, context: str) -> Schema:
+        message_type = self.mapper.get(topic, context)
+        if message_type is None:
+            raise MessageTypeNotFoundError(f"unable to find type {topic}")
+
+        return message_type.__schema__
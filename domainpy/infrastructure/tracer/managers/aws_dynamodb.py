@@ -19,10 +19,11 @@ from domainpy.infrastructure.tracer.tracestore import (
 )
 from domainpy.infrastructure.records import EventRecord, IntegrationRecord
 from domainpy.infrastructure.mappers import Mapper
-from domainpy.infrastructure.transcoder import record_asdict, record_fromdict
 from domainpy.utils.dynamodb import (
     client_serialize as serialize,
     client_deserialize as deserialize,
+    client_serialize_record as serialize_record,
+    client_deserialize_record as deserialize_record,
 )
 
 
@@ -81,13 +82,16 @@ class DynamoDBTraceStore(TraceStore):
         if "Item" not in result:
             raise TraceNotFound()
 
-        integrations = deserialize(result["Item"]["integrations"])
+        integrations = result["Item"]["integrations"]["L"]
 
         return typing.cast(
             typing.Generator[IntegrationEvent, None, None],
-            (
-                self.mapper.deserialize(record_fromdict(i))
-                for i in integrations
+            self.mapper.deserialize_many(
+                (
+                    deserialize_record(i, IntegrationRecord)
+                    for i in integrations
+                ),
+                stream=True,
             ),
         )
 
@@ -121,7 +125,7 @@ class DynamoDBTraceStore(TraceStore):
                 "trace_id": serialize(record.trace_id),
                 "topic": serialize(record.topic),
                 "message": serialize(record.message),
-                "request": serialize(record_asdict(record)),
+                "request": serialize_record(record),
                 "resolution": serialize(resolution),
                 "version": serialize(1),
                 "timestamp": serialize(epoch),
@@ -193,9 +197,9 @@ class DynamoDBTraceStore(TraceStore):
                         "timestamp": epoch,
                     }
                 ),
-                ":new_integrations": serialize(
-                    [record_asdict(integration_record)]
-                ),
+                ":new_integrations": {
+                    "L": [serialize_record(integration_record)]
+                },
             },
             # "ConditionExpression": """
             # attribute_exists(trace_id)
@@ -226,9 +230,9 @@ class DynamoDBTraceStore(TraceStore):
                         "timestamp": epoch,
                     }
                 ),
-                ":new_integrations": serialize(
-                    [record_asdict(integration_record)]
-                ),
+                ":new_integrations": {
+                    "L": [serialize_record(integration_record)]
+                },
             },
             # "ConditionExpression": """
             # attribute_exists(trace_id)
@@ -332,7 +336,7 @@ class DynamoDBTraceSegmentStore(TraceSegmentStore):
                 "subject": serialize(subject),
                 "timestamp": serialize(epoch),
                 "timestamp_resolution": serialize(None),
-                "request": serialize(record_asdict(record)),
+                "request": serialize_record(record),
                 "resolution": serialize(TraceResolution.Resolutions.pending),
                 "error": serialize(None),
             },
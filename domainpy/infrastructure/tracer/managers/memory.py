@@ -87,9 +87,9 @@ class MemoryTraceStore(TraceStore):
             raise TraceNotFound()
 
         trace = self.traces[trace_id]
-        return (
-            typing.cast(IntegrationEvent, self.mapper.deserialize(i))
-            for i in trace.integrations
+        return typing.cast(
+            typing.Generator[IntegrationEvent, None, None],
+            self.mapper.deserialize_many(trace.integrations, stream=True),
         )
 
     def start_trace(
@@ -20,7 +20,13 @@ from domainpy.infrastructure.records import (
 )
 from domainpy.typing.infrastructure import InfrastructureMessage
 from domainpy.typing.infrastructure import InfrastructureRecord
-from domainpy.utils.data import get_fields, Field, MISSING
+from domainpy.utils.data import (
+    create_fn,
+    is_meta_field_name,
+    Field,
+    Schema,
+    MISSING,
+)
 
 
 def isgenerictype(objtype) -> bool:
@@ -49,8 +55,14 @@ def record_fromdict(
 def record_asdict(
     record: typing.Union[
         CommandRecord, QueryRecord, IntegrationRecord, EventRecord
-    ]
+    ],
+    *,
+    shallow: bool = False,
 ) -> dict:
+    if shallow:
+        # Payload is shared with the record, do not mutate it
+        return record.__dict__.copy()
+
     return dataclasses.asdict(record)
 
 
@@ -119,6 +131,7 @@ class Transcoder(abc.ABC):
         self.codecs: typing.List[ICodec] = [
             _PrimitiveCodec(self),
             _NoneCodec(),
+            _AnyCodec(),
             _DictCodec(self),
             _SingleTypeInfiteSequenceCodec(self),
             _OptionalCodec(self),
@@ -129,10 +142,25 @@ class Transcoder(abc.ABC):
             _DomainEventCodec(self),
             _ValueObjectCodec(self),
         ]
+        self._builtin_count = len(self.codecs)
+
+        self._plans: typing.Dict[typing.Type, CodecPlan] = {}
 
     def add_codec(self, codec: ICodec) -> None:
         self.codecs.append(codec)
 
+        self._plans.clear()
+        self._get_codec.cache_clear()  # pylint: disable=no-member
+
+    def derive(self, *codecs: ICodec) -> Transcoder:
+        # New transcoder with codecs added to the ones added here, this
+        # one is left untouched
+        derived = Transcoder()
+        for codec in self.codecs[self._builtin_count :] + list(codecs):
+            derived.add_codec(codec)
+
+        return derived
+
     def serialize(
         self, message: InfrastructureMessage
     ) -> InfrastructureRecord:
@@ -144,8 +172,32 @@ class Transcoder(abc.ABC):
         self,
         record: TInfrastructureRecord,
         message_type: typing.Type[TInfrastructureMessage],
+        *,
+        lazy: bool = False,
     ) -> TInfrastructureMessage:
-        return self.decode(record_asdict(record), message_type)
+        return self.get_deserializer(message_type, lazy=lazy)(record)
+
+    def get_serializer(
+        self, message_type: typing.Type[TInfrastructureMessage]
+    ) -> typing.Callable[[TInfrastructureMessage], InfrastructureRecord]:
+        codec = self._get_codec(message_type)
+        return functools.partial(_encode_with, codec, message_type)
+
+    def get_deserializer(
+        self,
+        message_type: typing.Type[TInfrastructureMessage],
+        *,
+        lazy: bool = False,
+    ) -> typing.Callable[[InfrastructureRecord], TInfrastructureMessage]:
+        if isinstance(self._get_codec(message_type), _SystemMessageCodec):
+            plan = self.get_plan(message_type)
+            if lazy and plan.decode_record_lazy is not None:
+                return plan.decode_record_lazy
+
+            if plan.decode_record is not None:
+                return plan.decode_record
+
+        return functools.partial(_decode_asdict, self, message_type)
 
     def encode(self, obj, objtype):
         codec = self._get_codec(objtype)
@@ -155,6 +207,14 @@ class Transcoder(abc.ABC):
         codec = self._get_codec(objtype)
         return codec.decode(data, objtype)
 
+    def get_plan(self, objtype: typing.Type) -> CodecPlan:
+        plan = self._plans.get(objtype)
+        if plan is None:
+            plan = _PlanCompiler(self).compile(objtype)
+            self._plans[objtype] = plan
+
+        return plan
+
     @functools.lru_cache(maxsize=None)
     def _get_codec(self, objtype: typing.Type) -> ICodec:
         try:
@@ -163,6 +223,347 @@ class Transcoder(abc.ABC):
             raise MissingCodecError(f"unknown codec for {objtype}") from error
 
 
+def _encode_with(codec: ICodec, message_type: typing.Type, message):
+    return codec.encode(message, message_type)
+
+
+def _decode_asdict(transcoder: Transcoder, message_type: typing.Type, record):
+    return transcoder.decode(record_asdict(record), message_type)
+
+
+class CodecPlan:
+
+    __slots__ = [
+        "objtype",
+        "encode",
+        "decode",
+        "decode_record",
+        "decode_record_lazy",
+    ]
+
+    def __init__(
+        self,
+        objtype: typing.Type,
+        encode: typing.Callable[[typing.Any], dict],
+        decode: typing.Callable[[dict], typing.Any],
+        decode_record: typing.Optional[
+            typing.Callable[[InfrastructureRecord], typing.Any]
+        ] = None,
+        decode_record_lazy: typing.Optional[
+            typing.Callable[[InfrastructureRecord], typing.Any]
+        ] = None,
+    ) -> None:
+        self.objtype = objtype
+        self.encode = encode
+        self.decode = decode
+        self.decode_record = decode_record
+        self.decode_record_lazy = decode_record_lazy
+
+    def __repr__(self):  # pragma: no cover
+        return f"{self.__class__.__name__}({self.objtype})"
+
+
+class _PlanCompiler:
+    # Builtin codecs are inlined as expressions, nested value objects and
+    # structs call its own plan, custom codecs are called through ICodec
+
+    def __init__(self, transcoder: Transcoder) -> None:
+        self.transcoder = transcoder
+
+        self.cls_locals: typing.Dict[str, typing.Any] = {}
+        self.counter = 0
+
+    def compile(self, objtype: typing.Type) -> CodecPlan:
+        codec = self.transcoder._get_codec(  # pylint: disable=protected-access
+            objtype
+        )
+
+        if isinstance(codec, _ApplicationCommandStructCodec):
+            meta_source, payload_source = None, "data"
+        elif isinstance(codec, _SystemMessageCodec):
+            meta_source, payload_source = "data", "payload"
+        elif isinstance(codec, _ValueObjectCodec):
+            meta_source, payload_source = "value", "data"
+        else:
+            raise MissingCodecError(f"unable to compile plan for {objtype}")
+
+        schema: Schema = objtype.__schema__
+
+        encode = self._compile_encode(
+            schema, include_meta=(meta_source == "value")
+        )
+        decode = self._compile_decode(
+            objtype,
+            schema,
+            meta_source=meta_source,
+            payload_source=payload_source,
+        )
+
+        decode_record = None
+        decode_record_lazy = None
+        if meta_source == "data":
+            decode_record = self._compile_decode(
+                objtype,
+                schema,
+                meta_source=meta_source,
+                payload_source=payload_source,
+                from_record=True,
+            )
+
+            decode_record_lazy = decode_record
+            if any(self._is_deferrable(f) for f in schema.payload_fields):
+                decode_record_lazy = self._compile_decode(
+                    objtype,
+                    schema,
+                    meta_source=meta_source,
+                    payload_source=payload_source,
+                    from_record=True,
+                    lazy=True,
+                )
+
+        return CodecPlan(
+            objtype, encode, decode, decode_record, decode_record_lazy
+        )
+
+    def _compile_encode(self, schema: Schema, *, include_meta: bool):
+        body_lines = []
+        items = []
+        for i, field in enumerate(schema.fields):
+            var = f"_v{i}"
+            body_lines.extend(
+                [
+                    f'{var} = getattr(obj, "{field.name}", MISSING)',
+                    f"if {var} is MISSING:",
+                    " raise MissingFieldValueError("
+                    f'"missing field: {field.name}")',
+                ]
+            )
+
+            if include_meta or field.name not in schema.record_names:
+                expr = self.encode_expr(field.type, var)
+                items.append(f'"{field.name}": {expr}')
+
+        body_lines.append("return {" + ", ".join(items) + "}")
+
+        return self._create_fn("encode", ["obj"], body_lines)
+
+    def _compile_decode(
+        self,
+        objtype,
+        schema: Schema,
+        *,
+        meta_source: typing.Optional[str],
+        payload_source: str,
+        from_record: bool = False,
+        lazy: bool = False,
+    ):
+        # Records are read by attribute, no intermediate dict is built
+        if from_record:
+            get = 'getattr(data, "{}", {})'.format
+        else:
+            get = 'data.get("{}", {})'.format
+
+        body_lines = []
+        items = []
+        decoders = {}
+
+        if payload_source == "payload" and len(schema.payload_fields) > 0:
+            body_lines.extend(
+                [
+                    f'payload = {get("payload", "MISSING")}',
+                    "if payload is MISSING:",
+                    ' raise MissingFieldValueError("missing field: payload")',
+                ]
+            )
+
+        for i, field in enumerate(schema.fields):
+            var = f"_v{i}"
+            is_meta_field = field.name in schema.record_names
+
+            if is_meta_field and meta_source == "data":
+                record_name = schema.record_names[field.name]
+                default = self.bind(field.default, "default")
+                body_lines.append(f"{var} = {get(record_name, default)}")
+            elif is_meta_field and meta_source is None:
+                default = self.bind(field.default, "default")
+                body_lines.append(f"{var} = {default}")
+            else:
+                body_lines.append(
+                    f'{var} = {payload_source}.get("{field.name}", MISSING)'
+                )
+
+            body_lines.extend(
+                [
+                    f"if {var} is MISSING:",
+                    " raise MissingFieldValueError("
+                    f'"missing field: {field.name}")',
+                ]
+            )
+
+            if lazy and not is_meta_field and self._is_deferrable(field):
+                # Presence is checked now, decoded on first access
+                decoders[field.name] = self._create_fn(
+                    "decode",
+                    [var],
+                    [f"return {self.decode_expr(field.type, var)}"],
+                )
+                continue
+
+            expr = self.decode_expr(field.type, var)
+            items.append(f'"{field.name}": {expr}')
+
+        body_lines.append("kwargs = {" + ", ".join(items) + "}")
+
+        if meta_source == "data":
+            body_lines.extend(
+                [
+                    f'_trace_id = {get("trace_id", "MISSING")}',
+                    "if _trace_id is not MISSING:",
+                    ' kwargs["__trace_id__"] = _trace_id',
+                    f'_context = {get("context", "MISSING")}',
+                    "if _context is not MISSING:",
+                    ' kwargs["__context__"] = _context',
+                ]
+            )
+
+        cls = self.bind(objtype, "cls")
+        if lazy:
+            decoders_name = self.bind(decoders, "decoders")
+            body_lines.append(
+                f"return {cls}.__trusted_lazy__("
+                f"kwargs, {payload_source}, {decoders_name})"
+            )
+        else:
+            body_lines.append(f"return {cls}.__decoded__(**kwargs)")
+
+        return self._create_fn("decode", ["data"], body_lines)
+
+    def _is_deferrable(self, field: Field) -> bool:
+        # Fields with default are class attributes, those never reach
+        # __getattr__; primitives are cheaper to decode than to defer
+        if field.default is not MISSING:
+            return False
+
+        codec = self.transcoder._get_codec(  # pylint: disable=protected-access
+            field.type
+        )
+        return type(codec) not in (_PrimitiveCodec, _NoneCodec, _AnyCodec)
+
+    def encode_expr(self, objtype: typing.Type, var: str) -> str:
+        codec = self.transcoder._get_codec(  # pylint: disable=protected-access
+            objtype
+        )
+        codec_type = type(codec)
+        origin_args = typing.get_args(objtype)
+
+        if codec_type is _PrimitiveCodec:
+            return f"{self.bind(objtype, 'type')}({var})"
+
+        if codec_type is _NoneCodec:
+            return "None"
+
+        if codec_type is _AnyCodec:
+            return var
+
+        if codec_type is _OptionalCodec:
+            inner = self.encode_expr(origin_args[0], var)
+            return f"(None if {var} is None else {inner})"
+
+        if codec_type is _SingleTypeInfiteSequenceCodec:
+            item = self.fresh()
+            inner = self.encode_expr(origin_args[0], item)
+            return f"[{inner} for {item} in {var}]"
+
+        if codec_type is _DictCodec and len(origin_args) == 2:
+            key, value = self.fresh(), self.fresh()
+            key_expr = self.encode_expr(origin_args[0], key)
+            value_expr = self.encode_expr(origin_args[1], value)
+            return (
+                f"{{{key_expr}: {value_expr} "
+                f"for {key}, {value} in {var}.items()}}"
+            )
+
+        if codec_type in (_ValueObjectCodec, _ApplicationCommandStructCodec):
+            plan = self.transcoder.get_plan(objtype)
+            return f"{self.bind(plan.encode, 'encode')}({var})"
+
+        codec_name = self.bind(codec, "codec")
+        type_name = self.bind(objtype, "type")
+        return f"{codec_name}.encode({var}, {type_name})"
+
+    def decode_expr(self, objtype: typing.Type, var: str) -> str:
+        codec = self.transcoder._get_codec(  # pylint: disable=protected-access
+            objtype
+        )
+        codec_type = type(codec)
+        origin_args = typing.get_args(objtype)
+
+        if codec_type is _PrimitiveCodec:
+            return f"{self.bind(objtype, 'type')}({var})"
+
+        if codec_type is _NoneCodec:
+            return "None"
+
+        if codec_type is _AnyCodec:
+            return var
+
+        if codec_type is _OptionalCodec:
+            inner = self.decode_expr(origin_args[0], var)
+            return f"(None if {var} is None else {inner})"
+
+        if codec_type is _SingleTypeInfiteSequenceCodec:
+            origin = typing.get_origin(objtype) or objtype
+            item = self.fresh()
+            inner = self.decode_expr(origin_args[0], item)
+            return (
+                f"{self.bind(origin, 'type')}([{inner} for {item} in {var}])"
+            )
+
+        if codec_type is _DictCodec and len(origin_args) == 2:
+            key, value = self.fresh(), self.fresh()
+            key_expr = self.decode_expr(origin_args[0], key)
+            value_expr = self.decode_expr(origin_args[1], value)
+            return (
+                f"{{{key_expr}: {value_expr} "
+                f"for {key}, {value} in {var}.items()}}"
+            )
+
+        if codec_type in (_ValueObjectCodec, _ApplicationCommandStructCodec):
+            plan = self.transcoder.get_plan(objtype)
+            return f"{self.bind(plan.decode, 'decode')}({var})"
+
+        codec_name = self.bind(codec, "codec")
+        type_name = self.bind(objtype, "type")
+        return f"{codec_name}.decode({var}, {type_name})"
+
+    def bind(self, value: typing.Any, prefix: str) -> str:
+        if value is MISSING:
+            return "MISSING"
+
+        name = f"_{prefix}_{self.counter}"
+        self.counter += 1
+
+        self.cls_locals[name] = value
+        return name
+
+    def fresh(self) -> str:
+        name = f"_x{self.counter}"
+        self.counter += 1
+        return name
+
+    def _create_fn(self, fnname, args, body_lines):
+        return create_fn(
+            fnname,
+            args,
+            body_lines,
+            cls_globals={
+                "MISSING": MISSING,
+                "MissingFieldValueError": MissingFieldValueError,
+            },
+            cls_locals=dict(self.cls_locals),
+        )
+
+
 class ICodec(abc.ABC):
     @abc.abstractmethod
     def can_handle(self, field_type: typing.Type) -> bool:  # pragma: no cover
@@ -206,6 +607,18 @@ class _NoneCodec(ICodec):
         return None
 
 
+class _AnyCodec(ICodec):
+    # Data is passed as is, it should be already serializable
+    def can_handle(self, field_type: typing.Type) -> bool:
+        return field_type is typing.Any
+
+    def encode(self, obj: typing.Any, field_type: typing.Type) -> typing.Any:
+        return obj
+
+    def decode(self, data: dict, field_type: typing.Type) -> typing.Any:
+        return data
+
+
 class _SingleTypeInfiteSequenceCodec(ICodec):
     def __init__(self, transcoder: Transcoder) -> None:
         self.trancoder = transcoder
@@ -214,8 +627,11 @@ class _SingleTypeInfiteSequenceCodec(ICodec):
         origin = typing.get_origin(field_type) or field_type
         origin_args = typing.get_args(field_type)
 
+        if origin is list:  # typing.List[some_type]
+            return len(origin_args) == 1
+
         return (
-            origin in (list, tuple)
+            origin is tuple
             and len(origin_args) == 2
             and origin_args[1] == Ellipsis
         )
@@ -297,57 +713,16 @@ class _SystemMessageCodec(ICodec):
         self.trancoder = transcoder
 
     def _encode(self, obj: typing.Any, field_type: typing.Type) -> dict:
-        fields = get_fields(field_type)
-
-        dct: dict[str, typing.Any] = {"payload": {}}
-        for field in fields:
-            field_value = getattr(obj, field.name, MISSING)
-            if field_value == MISSING:
-                raise MissingFieldValueError(f"missing field: {field.name}")
-
-            encoded_value = self.trancoder.encode(field_value, field.type)
-            if self._is_meta_field(field):
-                dct[field.name] = encoded_value
-            else:
-                dct["payload"][field.name] = encoded_value
-
-        return dct
+        plan = self.trancoder.get_plan(field_type)
+        return {"payload": plan.encode(obj)}
 
     def _decode(self, data: dict, field_type: typing.Type) -> typing.Any:
-        fields = get_fields(field_type)
-
-        dct = {}
-        for field in fields:
-            if self._is_meta_field(field):
-                field_data = data.get(
-                    self._get_record_field_name(field), MISSING
-                )
-
-                if field_data is MISSING:
-                    field_data = field.default
-
-            else:
-                payload = data.get("payload", MISSING)
-                if payload is MISSING:
-                    raise MissingFieldValueError("missing field: payload")
-                field_data = payload.get(field.name, MISSING)
-
-            if field_data is MISSING:
-                raise MissingFieldValueError(f"missing field: {field.name}")
-
-            dct[field.name] = self.trancoder.decode(field_data, field.type)
-
-        if "trace_id" in data:
-            dct["__trace_id__"] = data["trace_id"]
-
-        if "context" in data:
-            dct["__context__"] = data["context"]
-
-        return field_type(**dct)
+        plan = self.trancoder.get_plan(field_type)
+        return plan.decode(data)
 
     @classmethod
     def _is_meta_field(cls, field: Field) -> bool:
-        return field.name.startswith("__") and field.name.endswith("__")
+        return is_meta_field_name(field.name)
 
     @classmethod
     def _get_record_field_name(cls, field: Field) -> str:
@@ -393,7 +768,7 @@ class _ApplicationCommandStructCodec(_SystemMessageCodec):
         return self._encode(obj, field_type)["payload"]
 
     def decode(self, data: dict, field_type: typing.Type) -> typing.Any:
-        return self._decode(dict(payload=data), field_type)
+        return self._decode(data, field_type)
 
 
 class _IntegrationEventCodec(_SystemMessageCodec):
@@ -470,32 +845,10 @@ class _ValueObjectCodec(ICodec):
         return issubclass(field_type, ValueObject)
 
     def encode(self, obj: typing.Any, field_type: typing.Type) -> typing.Any:
-        fields = get_fields(field_type)
-
-        dct = {}
-        for field in fields:
-            field_value = getattr(obj, field.name, MISSING)
-
-            if field_value == MISSING:
-                raise MissingFieldValueError(f"missing field: {field.name}")
-
-            dct[field.name] = self.transcoder.encode(field_value, field.type)
-
-        return dct
+        return self.transcoder.get_plan(field_type).encode(obj)
 
     def decode(self, data: dict, field_type: typing.Type) -> typing.Any:
-        fields = get_fields(field_type)
-
-        dct = {}
-        for field in fields:
-            field_data = data.get(field.name, MISSING)
-
-            if field_data == MISSING:
-                raise MissingFieldValueError(f"missing field: {field.name}")
-
-            dct[field.name] = self.transcoder.decode(field_data, field.type)
-
-        return field_type(**dct)
+        return self.transcoder.get_plan(field_type).decode(data)
 
 
 class _ApplicationQueryCodec(_SystemMessageCodec):
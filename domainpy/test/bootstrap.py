@@ -344,7 +344,7 @@ class DomainEventsTestExpression:
         return any(
             True
             for e in events
-            if all(e.__dict__.get(k) == v for k, v in kwargs.items())
+            if all(getattr(e, k, None) == v for k, v in kwargs.items())
         )
 
     def has_not_event_with(
@@ -594,7 +594,7 @@ class IntegrationEventsTestExpression:
         return any(
             True
             for i in integrations
-            if all(i.__dict__.get(k) == v for k, v in kwargs.items())
+            if all(getattr(i, k, None) == v for k, v in kwargs.items())
         )
 
     def has_not_integration_with(
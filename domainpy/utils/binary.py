@@ -0,0 +1,156 @@
+import struct
+import typing
+
+NONE = 0
+FALSE = 1
+TRUE = 2
+INT = 3
+BIGINT = 4
+FLOAT = 5
+STR = 6
+BYTES = 7
+LIST = 8
+MAP = 9
+
+_INT64_MIN = -(2 ** 63)
+_INT64_MAX = 2 ** 63 - 1
+
+_float = struct.Struct("<d")
+_uint32 = struct.Struct("<I")
+
+Buffer = typing.Union[bytes, bytearray, memoryview]
+
+
+class BinaryFormatError(Exception):
+    pass
+
+
+def write_varint(buffer: bytearray, value: int) -> None:
+    while value > 0x7F:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def read_varint(view: Buffer, offset: int) -> typing.Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        byte = view[offset]
+        offset += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, offset
+        shift += 7
+
+
+def write_uint32(buffer: bytearray, value: int) -> None:
+    buffer += _uint32.pack(value)
+
+
+def read_uint32(view: Buffer, offset: int) -> typing.Tuple[int, int]:
+    return _uint32.unpack_from(view, offset)[0], offset + 4
+
+
+def write_str(buffer: bytearray, value: str) -> None:
+    encoded = value.encode("utf-8")
+    write_varint(buffer, len(encoded))
+    buffer += encoded
+
+
+def read_str(view: Buffer, offset: int) -> typing.Tuple[str, int]:
+    length, offset = read_varint(view, offset)
+    end = offset + length
+    return str(view[offset:end], "utf-8"), end
+
+
+def pack_value(buffer: bytearray, value: typing.Any) -> None:
+    # bool before int, bool is subclass of int
+    if value is None:
+        buffer.append(NONE)
+    elif value is True:
+        buffer.append(TRUE)
+    elif value is False:
+        buffer.append(FALSE)
+    elif isinstance(value, str):
+        buffer.append(STR)
+        write_str(buffer, value)
+    elif isinstance(value, int):
+        if _INT64_MIN <= value <= _INT64_MAX:
+            buffer.append(INT)
+            # Zigzag, small negatives stay small
+            write_varint(buffer, (value << 1) ^ (value >> 63))
+        else:
+            buffer.append(BIGINT)
+            write_str(buffer, str(value))
+    elif isinstance(value, float):
+        buffer.append(FLOAT)
+        buffer += _float.pack(value)
+    elif isinstance(value, (list, tuple)):
+        buffer.append(LIST)
+        write_varint(buffer, len(value))
+        for item in value:
+            pack_value(buffer, item)
+    elif isinstance(value, dict):
+        buffer.append(MAP)
+        write_varint(buffer, len(value))
+        for key, item in value.items():
+            write_str(buffer, str(key))
+            pack_value(buffer, item)
+    elif isinstance(value, (bytes, bytearray)):
+        buffer.append(BYTES)
+        write_varint(buffer, len(value))
+        buffer += value
+    else:
+        raise BinaryFormatError(f"unsupported type {type(value)}")
+
+
+def unpack_value(view: Buffer, offset: int) -> typing.Tuple[typing.Any, int]:
+    tag = view[offset]
+    offset += 1
+
+    if tag == STR:
+        return read_str(view, offset)
+
+    if tag == INT:
+        value, offset = read_varint(view, offset)
+        return (value >> 1) ^ -(value & 1), offset
+
+    if tag == NONE:
+        return None, offset
+
+    if tag == TRUE:
+        return True, offset
+
+    if tag == FALSE:
+        return False, offset
+
+    if tag == FLOAT:
+        return _float.unpack_from(view, offset)[0], offset + 8
+
+    if tag == LIST:
+        length, offset = read_varint(view, offset)
+        items = []
+        for _ in range(length):
+            item, offset = unpack_value(view, offset)
+            items.append(item)
+        return items, offset
+
+    if tag == MAP:
+        length, offset = read_varint(view, offset)
+        dct = {}
+        for _ in range(length):
+            key, offset = read_str(view, offset)
+            dct[key], offset = unpack_value(view, offset)
+        return dct, offset
+
+    if tag == BIGINT:
+        text, offset = read_str(view, offset)
+        return int(text), offset
+
+    if tag == BYTES:
+        length, offset = read_varint(view, offset)
+        end = offset + length
+        return bytes(view[offset:end]), end
+
+    raise BinaryFormatError(f"unknown tag {tag} at {offset - 1}")
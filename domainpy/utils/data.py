@@ -1,6 +1,12 @@
 import sys
+import zlib
+import enum
+import types
+import random
 import inspect
+import operator
 import collections
+import dataclasses
 import typeguard
 import domainpy.compat_typing as typing
 
@@ -99,15 +105,348 @@ def get_fields(cls):
                 ):
                     continue
 
-                field = Field(
-                    a_name, a_type, getattr(current_cls, a_name, MISSING)
-                )
+                default = getattr(current_cls, a_name, MISSING)
+                if isinstance(default, types.MemberDescriptorType):
+                    # Slot of compact class, no default
+                    default = MISSING
+
+                field = Field(a_name, a_type, default)
                 fields[field.name] = field
 
     return fields.values()
 
 
-def create_init_fn(cls, fields: typing.List[Field]):
+def is_meta_field_name(name: str) -> bool:
+    return name.startswith("__") and name.endswith("__")
+
+
+def get_type_name(objtype: typing.Any) -> str:
+    if isinstance(objtype, type):
+        return objtype.__qualname__
+
+    return repr(objtype)
+
+
+@dataclasses.dataclass(frozen=True)
+class Schema:  # pylint: disable=too-many-instance-attributes
+    id: int  # pylint: disable=invalid-name
+    fields: typing.Tuple[Field, ...]
+    meta_fields: typing.Tuple[Field, ...]
+    payload_fields: typing.Tuple[Field, ...]
+    required_fields: typing.Tuple[Field, ...]
+    required: typing.FrozenSet[str]
+    defaults: typing.Mapping[str, typing.Any]
+    record_names: typing.Mapping[str, str]
+
+    @classmethod
+    def from_fields(cls, fields: typing.Iterable[Field]) -> "Schema":
+        fields = tuple(fields)
+
+        meta_fields = tuple(f for f in fields if is_meta_field_name(f.name))
+        payload_fields = tuple(
+            f for f in fields if not is_meta_field_name(f.name)
+        )
+        required_fields = tuple(f for f in fields if f.default is MISSING)
+
+        # Stable fingerprint of field names and types
+        signature = ";".join(
+            f"{f.name}:{get_type_name(f.type)}" for f in fields
+        )
+
+        return cls(
+            id=zlib.crc32(signature.encode("utf-8")),
+            fields=fields,
+            meta_fields=meta_fields,
+            payload_fields=payload_fields,
+            required_fields=required_fields,
+            required=frozenset(f.name for f in required_fields),
+            defaults=types.MappingProxyType(
+                {f.name: f.default for f in fields if f.default is not MISSING}
+            ),
+            # Remove dunder
+            # Ex. __stream_id__ to stream_id
+            record_names=types.MappingProxyType(
+                {f.name: f.name[2:-2] for f in meta_fields}
+            ),
+        )
+
+
+class ValidationLevel(enum.Enum):
+    STRICT = "strict"
+    SAMPLED = "sampled"
+    OFF = "off"
+
+
+class Validation:
+
+    __slots__ = ["level", "sample_rate"]
+
+    def __init__(
+        self,
+        level: ValidationLevel = ValidationLevel.STRICT,
+        sample_rate: float = 1.0,
+    ) -> None:
+        self.configure(level, sample_rate)
+
+    def configure(
+        self, level: ValidationLevel, sample_rate: float = 1.0
+    ) -> None:
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate should be between 0.0 and 1.0")
+
+        self.level = level
+        self.sample_rate = sample_rate
+
+    def should_validate(self) -> bool:
+        if self.level is ValidationLevel.STRICT:
+            return True
+
+        if self.level is ValidationLevel.OFF:
+            return False
+
+        return random.random() < self.sample_rate
+
+    def __repr__(self):  # pragma: no cover
+        return (
+            f"{self.__class__.__name__}("
+            f"level={self.level}, sample_rate={self.sample_rate}"
+            ")"
+        )
+
+
+class LazyFields:
+    # Holds raw values of fields not decoded yet, each field is decoded on
+    # first access and stored in instance __dict__
+
+    __slots__ = ["data", "decoders", "pending"]
+
+    def __init__(
+        self,
+        data: typing.Mapping[str, typing.Any],
+        decoders: typing.Mapping[
+            str, typing.Callable[[typing.Any], typing.Any]
+        ],
+    ) -> None:
+        self.data = data
+        self.decoders = decoders
+        self.pending = set(decoders)
+
+    def resolve(self, obj: typing.Any, name: str) -> typing.Any:
+        if name not in self.pending:
+            raise AttributeError(
+                f"'{obj.__class__.__name__}' object has no attribute '{name}'"
+            )
+
+        value = self.decoders[name](self.data[name])
+
+        obj.__dict__[name] = value
+        self.pending.discard(name)
+        if len(self.pending) == 0:
+            obj.__dict__.pop("__pending__", None)
+
+        return value
+
+    def resolve_all(self, obj: typing.Any) -> None:
+        for name in tuple(self.pending):
+            self.resolve(obj, name)
+
+    def __repr__(self):  # pragma: no cover
+        return f"{self.__class__.__name__}(pending={self.pending})"
+
+
+class CompactField:
+    # Slot backed attribute of compact class that also has a class level
+    # value, the class level value is the default of unset slot
+
+    __slots__ = ["name", "slot", "owner", "default"]
+
+    def __init__(
+        self,
+        name: str,
+        slot: types.MemberDescriptorType,
+        *,
+        owner: typing.Optional[type] = None,
+        default: typing.Any = MISSING,
+    ) -> None:
+        self.name = name
+        self.slot = slot
+        self.owner = owner
+        self.default = default
+
+    def __get__(self, obj, objtype=None):
+        if obj is not None:
+            try:
+                return self.slot.__get__(obj, objtype)
+            except AttributeError:
+                pass
+
+        if self.owner is not None:
+            return getattr(self.owner, self.name)
+
+        if self.default is MISSING:
+            raise AttributeError(self.name)
+
+        return self.default
+
+    def __set__(self, obj, value):
+        self.slot.__set__(obj, value)
+
+    def __repr__(self):  # pragma: no cover
+        return f"{self.__class__.__name__}(name={self.name})"
+
+
+def get_compact_names(bases, dct) -> typing.List[str]:
+    # Declared fields plus class level meta of mixins, as __trace_id__,
+    # those are overriden per instance
+    names: typing.Dict[str, None] = {}
+
+    classes = []
+    for base in bases:
+        classes.extend(c for c in inspect.getmro(base)[::-1])
+
+    for current_cls in classes:
+        annotations = current_cls.__dict__.get("__annotations__", {})
+        for a_name, a_type in annotations.items():
+            is_class_var = typing.get_origin(a_type) is typing.get_origin(
+                typing.ClassVar[typing.Any]
+            )
+
+            if not is_class_var:
+                if isinstance(current_cls, MetaSystemData):
+                    names[a_name] = None
+            elif not isinstance(current_cls, MetaSystemData):
+                if is_meta_field_name(a_name):
+                    names[a_name] = None
+
+    for a_name, a_type in dct.get("__annotations__", {}).items():
+        if typing.get_origin(a_type) is not typing.get_origin(
+            typing.ClassVar[typing.Any]
+        ):
+            names[a_name] = None
+
+    names.pop("__topic__", None)
+    return list(names)
+
+
+def prepare_compact(bases, dct) -> typing.Dict[str, typing.Any]:
+    base_slots: typing.Dict[str, typing.Any] = {}
+    for base in bases[::-1]:
+        base_slots.update(getattr(base, "__compact_slots__", {}))
+
+    new_names = [
+        n for n in get_compact_names(bases, dct) if n not in base_slots
+    ]
+
+    # Class level values can not live together with slot of same name
+    defaults = {n: dct.pop(n) for n in new_names if n in dct}
+    owners = {}
+    for name in new_names:
+        if name in defaults:
+            continue
+
+        owner = next((b for b in bases if hasattr(b, name)), None)
+        if owner is not None:
+            owners[name] = owner
+
+    slot_names = {
+        n: f"_compact_{n}" if n in defaults or n in owners else n
+        for n in new_names
+    }
+    dct["__slots__"] = tuple(slot_names.values())
+
+    return {
+        "base_slots": base_slots,
+        "slot_names": slot_names,
+        "defaults": defaults,
+        "owners": owners,
+    }
+
+
+def apply_compact(cls, compact) -> None:
+    slots = dict(compact["base_slots"])
+    for name, slot_name in compact["slot_names"].items():
+        slot = cls.__dict__[slot_name]
+        slots[name] = slot
+
+        if slot_name != name:
+            setattr(
+                cls,
+                name,
+                CompactField(
+                    name,
+                    slot,
+                    owner=compact["owners"].get(name),
+                    default=compact["defaults"].get(name, MISSING),
+                ),
+            )
+
+    cls.__compact_slots__ = types.MappingProxyType(slots)
+
+
+def _compact_from_state(cls, state):
+    return cls.__trusted__(**state)
+
+
+def _compact_reduce(obj):
+    # Default pickle restores slots by setattr, that is not allowed
+    state = get_compact_state(obj)
+    state.update(obj.__dict__)
+    return (_compact_from_state, (obj.__class__, state))
+
+
+def get_compact_state(obj) -> typing.Dict[str, typing.Any]:
+    state = {}
+    for name, slot in obj.__compact_slots__.items():
+        try:
+            state[name] = slot.__get__(obj)
+        except AttributeError:
+            pass
+
+    return state
+
+
+def create_compact_trusted_init_fn(cls, schema: Schema):
+    fnname = "__init__"
+
+    cls_globals = sys.modules[cls.__module__].__dict__
+    cls_locals = {}
+
+    slots = cls.__compact_slots__
+    init_fields = schema.required_fields
+
+    args: typing.List[str] = []
+    body_lines: typing.List[str] = []
+    for f in init_fields:
+        cls_locals[f"_type_{f.name}"] = f.type
+        cls_locals[f"_set_{f.name}"] = slots[f.name].__set__
+
+        args.append(f"{f.name}:_type_{f.name}")
+        body_lines.append(f"_set_{f.name}(self, {f.name})")
+
+    # Undeclared kwargs still go to __dict__, as not compact classes
+    cls_locals["_slots"] = slots
+    body_lines.extend(
+        [
+            "for name, value in kwargs.items():",
+            " slot = _slots.get(name)",
+            " if slot is None:",
+            "  self.__dict__[name] = value",
+            " else:",
+            "  slot.__set__(self, value)",
+        ]
+    )
+
+    return create_fn(
+        fnname,
+        ["self"] + args + ["**kwargs"],
+        body_lines,
+        cls_globals=cls_globals,
+        cls_locals=cls_locals,
+        return_type=None,
+    )
+
+
+def create_trusted_init_fn(cls, schema: Schema):
     fnname = "__init__"
 
     cls_globals = sys.modules[cls.__module__].__dict__
@@ -115,30 +454,60 @@ def create_init_fn(cls, fields: typing.List[Field]):
 
     # If have default, will be ommitted in __init__
     # still can pass the arg as kwarg
-    init_fields = [f for f in fields if f.default is MISSING]
+    init_fields = schema.required_fields
 
     args: typing.List[str] = []
-    body_lines: typing.List[str] = []
+    items: typing.List[str] = []
 
     if len(init_fields) > 0:
         cls_locals = {f"_type_{f.name}": f.type for f in init_fields}
 
         args.extend(f"{f.name}:_type_{f.name}" for f in init_fields)
+        items.extend(f'"{f.name}": {f.name}' for f in init_fields)
 
-        # Assignment for immutable self
-        body_lines.extend(
-            f'self.__dict__.update({{ "{f.name}": {f.name} }})'
-            for f in init_fields
-        )
+    # Assignment for immutable self
+    body_lines = ["self.__dict__.update({" + ", ".join(items) + "}, **kwargs)"]
 
     return create_fn(
         fnname,
         ["self"] + args + ["**kwargs"],
-        body_lines + ["self.__dict__.update(kwargs)"],
+        body_lines,
+        cls_globals=cls_globals,
+        cls_locals=cls_locals,
+        return_type=None,
+    )
+
+
+def create_init_fn(cls, schema: Schema, trusted_init):
+    fnname = "__init__"
+
+    cls_globals = sys.modules[cls.__module__].__dict__
+    cls_locals = {
+        "_trusted_init": trusted_init,
+        "_checked_init": typeguard.typechecked(trusted_init),
+    }
+
+    init_fields = schema.required_fields
+
+    args = [f"{f.name}:_type_{f.name}" for f in init_fields]
+    params = [f.name for f in init_fields]
+    cls_locals.update({f"_type_{f.name}": f.type for f in init_fields})
+
+    call_args = ", ".join(["self"] + params + ["**kwargs"])
+    body_lines = [
+        "if self.__validation__.should_validate():",
+        f" _checked_init({call_args})",
+        "else:",
+        f" _trusted_init({call_args})",
+    ]
+
+    return create_fn(
+        fnname,
+        ["self"] + args + ["**kwargs"],
+        body_lines,
         cls_globals=cls_globals,
         cls_locals=cls_locals,
         return_type=None,
-        decorators=["@typeguard.typechecked"],
     )
 
 
@@ -177,6 +546,10 @@ def create_eq_fn(cls):
     body_lines = [
         "if not isinstance(o, self.__class__):",
         " return False",
+        'if "__pending__" in self.__dict__:',
+        " self.__materialize__()",
+        'if "__pending__" in o.__dict__:',
+        " o.__materialize__()",
         "return self.__dict__ == o.__dict__",
     ]
 
@@ -185,15 +558,66 @@ def create_eq_fn(cls):
     )
 
 
+def create_compact_eq_fn(cls):
+    fnname = "__eq__"
+
+    cls_globals = sys.modules[cls.__module__].__dict__
+    cls_locals = {}
+
+    args = ["self", "o"]
+    body_lines = [
+        "if not isinstance(o, self.__class__):",
+        " return False",
+    ]
+
+    if len(cls.__compact_slots__) > 0:
+        cls_locals["_get_values"] = operator.attrgetter(*cls.__compact_slots__)
+        body_lines.append("return _get_values(self) == _get_values(o)")
+    else:
+        body_lines.append("return True")
+
+    return create_fn(
+        fnname,
+        args,
+        body_lines,
+        cls_globals=cls_globals,
+        cls_locals=cls_locals,
+        return_type=bool,
+    )
+
+
 class MetaSystemData(type):
-    def __new__(cls, name, bases, dct):
+    def __new__(cls, name, bases, dct, compact=None):
+        if compact is None:
+            compact = any(getattr(b, "__compact__", False) for b in bases)
+
+        if compact:
+            # Declared fields are stored in __slots__, no __dict__ is
+            # materialized per instance
+            compact_spec = prepare_compact(bases, dct)
+
         new_cls = super().__new__(cls, name, bases, dct)
+        new_cls.__compact__ = compact
 
-        fields = get_fields(new_cls)
+        if compact:
+            apply_compact(new_cls, compact_spec)
+            new_cls.__reduce__ = _compact_reduce
+
+        schema = Schema.from_fields(get_fields(new_cls))
+        new_cls.__schema__ = schema
 
         # Constructable
         if "__init__" not in new_cls.__dict__:
-            setattr(new_cls, "__init__", create_init_fn(new_cls, fields))
+            if compact:
+                trusted_init = create_compact_trusted_init_fn(new_cls, schema)
+            else:
+                trusted_init = create_trusted_init_fn(new_cls, schema)
+            setattr(new_cls, "__trusted_init__", trusted_init)
+            setattr(
+                new_cls,
+                "__init__",
+                create_init_fn(new_cls, schema, trusted_init),
+            )
 
         # Immutable
         if "__setattr__" not in new_cls.__dict__:
@@ -204,21 +628,130 @@ class MetaSystemData(type):
 
         # Equality based on data
         if "__eq__" not in new_cls.__dict__:
-            setattr(new_cls, "__eq__", create_eq_fn(new_cls))
+            if compact:
+                setattr(new_cls, "__eq__", create_compact_eq_fn(new_cls))
+            else:
+                setattr(new_cls, "__eq__", create_eq_fn(new_cls))
 
         new_cls.__topic__ = new_cls.__name__
 
         return new_cls
 
+    def __init__(cls, name, bases, dct, compact=None):
+        # pylint: disable=unused-argument
+        super().__init__(name, bases, dct)
+
 
 Class = typing.TypeVar("Class")
 
 
 class SystemData(metaclass=MetaSystemData):
     __topic__: str
+    __schema__: typing.ClassVar[Schema]
+    __validation__: typing.ClassVar[Validation] = Validation()
+    __compact__: typing.ClassVar[bool] = False
+
+    @classmethod
+    def __trusted__(cls, **kwargs):
+        # Skip type checking, only for already validated data
+        trusted_init = cls.__dict__.get("__trusted_init__")
+        if trusted_init is None:
+            return cls(**kwargs)
+
+        obj = cls.__new__(cls)
+        trusted_init(obj, **kwargs)
+        return obj
+
+    @classmethod
+    def __checks_decoded__(cls) -> bool:
+        # Decoded data is trusted, unless the class keeps its own policy
+        # as commands do to check edge input
+        validation = cls.__validation__
+        if validation is SystemData.__validation__:
+            return False
+
+        return validation.should_validate()
+
+    @classmethod
+    def __decoded__(cls, **kwargs):
+        if cls.__checks_decoded__():
+            return cls(**kwargs)
+
+        return cls.__trusted__(**kwargs)
+
+    @classmethod
+    def __trusted_lazy__(
+        cls,
+        kwargs: typing.Dict[str, typing.Any],
+        data: typing.Mapping[str, typing.Any],
+        decoders: typing.Mapping[
+            str, typing.Callable[[typing.Any], typing.Any]
+        ],
+    ):
+        # Fields in decoders are decoded from data on first access,
+        # only for already validated data
+        checked = cls.__checks_decoded__()
+        if (
+            len(decoders) == 0
+            or checked
+            or cls.__compact__
+            or "__trusted_init__" not in cls.__dict__
+        ):
+            kwargs.update(
+                (name, decoder(data[name]))
+                for name, decoder in decoders.items()
+            )
+            if checked:
+                return cls(**kwargs)
+
+            return cls.__trusted__(**kwargs)
+
+        obj = cls.__new__(cls)
+        obj.__dict__.update(kwargs)
+        obj.__dict__["__pending__"] = LazyFields(data, decoders)
+        return obj
+
+    def __getattr__(self, name: str) -> typing.Any:
+        # Only reached when attribute is not found in instance or class
+        pending = None
+        if not self.__compact__:
+            pending = self.__dict__.get("__pending__")
+
+        if pending is None:
+            raise AttributeError(
+                f"'{self.__class__.__name__}' object has no attribute '{name}'"
+            )
+
+        return pending.resolve(self, name)
+
+    def __materialize__(self) -> None:
+        if self.__compact__:
+            return
+
+        pending = self.__dict__.get("__pending__")
+        if pending is not None:
+            pending.resolve_all(self)
+
+    def __getstate__(self) -> typing.Dict[str, typing.Any]:
+        # Decoders of pending fields are closures, not picklable
+        self.__materialize__()
+        return self.__dict__
+
+    def __data__(self) -> typing.Dict[str, typing.Any]:
+        if self.__compact__:
+            return get_compact_state(self)
+
+        self.__materialize__()
+        return self.__dict__
+
+    @classmethod
+    def set_default_validation(
+        cls, level: ValidationLevel, sample_rate: float = 1.0
+    ) -> None:
+        SystemData.__validation__.configure(level, sample_rate)
 
     def __str__(self) -> str:
-        return f"{self.__class__.__name__}({self.__dict__})"
+        return f"{self.__class__.__name__}({self.__data__()})"
 
     def __repr__(self) -> str:
-        return f"{self.__class__.__name__}({self.__dict__})"
+        return f"{self.__class__.__name__}({self.__data__()})"
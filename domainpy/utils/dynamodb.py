@@ -1,12 +1,14 @@
+import math
 import decimal
+import functools
+import dataclasses
+import collections.abc
 
-from boto3.dynamodb.types import (  # type: ignore
-    TypeDeserializer,
-    TypeSerializer,
-)
+from boto3.dynamodb.types import Binary  # type: ignore
 
-type_serializer = TypeSerializer()
-type_deserializer = TypeDeserializer()
+import domainpy.compat_typing as typing
+
+from domainpy.utils.data import create_fn
 
 
 def serialize(obj):
@@ -37,9 +39,202 @@ def deserialize(obj):
     return obj
 
 
-def client_serialize(obj):
-    return type_serializer.serialize(serialize(obj))
+def client_serialize(obj: typing.Any) -> dict:
+    # Single pass from python value to attribute value,
+    # exact builtin types first
+    cls = obj.__class__
+
+    if cls is str:
+        return {"S": obj}
+
+    if cls is bool:
+        return {"BOOL": obj}
+
+    if cls is int:
+        return {"N": str(obj)}
+
+    if obj is None:
+        return {"NULL": True}
+
+    if cls is float:
+        return {"N": _serialize_float(obj)}
+
+    if cls is dict:
+        return {"M": {k: client_serialize(v) for k, v in obj.items()}}
+
+    if cls is list or cls is tuple:
+        return {"L": [client_serialize(v) for v in obj]}
+
+    return _serialize_other(obj)
+
+
+def client_deserialize(attribute: dict) -> typing.Any:
+    ((kind, value),) = attribute.items()
+
+    if kind == "S":
+        return value
+
+    if kind == "N":
+        return _deserialize_number(value)
+
+    if kind == "M":
+        return {k: client_deserialize(v) for k, v in value.items()}
+
+    if kind == "L":
+        return [client_deserialize(v) for v in value]
+
+    if kind == "BOOL":
+        return value
+
+    if kind == "NULL":
+        return None
+
+    if kind == "B":
+        return bytes(value)
+
+    if kind == "SS":
+        return set(value)
+
+    if kind == "NS":
+        return {_deserialize_number(v) for v in value}
+
+    if kind == "BS":
+        return {bytes(v) for v in value}
+
+    raise TypeError(f"dynamodb type {kind} is not supported")
+
+
+def _serialize_float(obj: float) -> str:
+    if not math.isfinite(obj):
+        raise TypeError("Infinity and NaN not supported")
+
+    return repr(obj)
+
+
+def _serialize_other(obj: typing.Any) -> dict:
+    # Subclasses and less frequent types
+    if isinstance(obj, bool):
+        return {"BOOL": bool(obj)}
+
+    if isinstance(obj, str):
+        return {"S": str(obj)}
+
+    if isinstance(obj, int):
+        return {"N": str(int(obj))}
+
+    if isinstance(obj, float):
+        return {"N": _serialize_float(float(obj))}
+
+    if isinstance(obj, decimal.Decimal):
+        if not obj.is_finite():
+            raise TypeError("Infinity and NaN not supported")
+        return {"N": str(obj)}
+
+    if isinstance(obj, (bytes, bytearray)):
+        return {"B": bytes(obj)}
+
+    if isinstance(obj, Binary):
+        return {"B": bytes(obj.value)}
+
+    if isinstance(obj, collections.abc.Mapping):
+        return {"M": {k: client_serialize(v) for k, v in obj.items()}}
+
+    if isinstance(obj, collections.abc.Set):
+        return _serialize_set(obj)
+
+    if isinstance(obj, (list, tuple)):
+        return {"L": [client_serialize(v) for v in obj]}
+
+    raise TypeError(f"unsupported type {type(obj)} for value {obj}")
+
+
+def _serialize_set(obj: typing.AbstractSet) -> dict:
+    if len(obj) == 0:
+        raise TypeError("empty set is not supported")
+
+    attributes = [client_serialize(v) for v in obj]
+    kinds = {k for a in attributes for k in a}
+    if len(kinds) != 1 or next(iter(kinds)) not in ("S", "N", "B"):
+        raise TypeError("set should contain only str, numbers or bytes")
+
+    kind = next(iter(kinds))
+    return {kind + "S": [a[kind] for a in attributes]}
+
+
+def _deserialize_number(value: str) -> typing.Union[int, float]:
+    try:
+        return int(value)
+    except ValueError:
+        pass
+
+    # Integral as DynamoDB stores it, float loses digits of large numbers
+    number = decimal.Decimal(value)
+    if number == number.to_integral_value():
+        return int(number)
+
+    return float(number)
+
+
+class RecordPlan:
+    # Precomputed attribute by attribute marshalling of record dataclass
+
+    __slots__ = ["record_type", "names", "marshal", "unmarshal"]
+
+    def __init__(
+        self,
+        record_type: typing.Type,
+        names: typing.Tuple[str, ...],
+        marshal: typing.Callable[[typing.Any], dict],
+        unmarshal: typing.Callable[[dict], typing.Any],
+    ) -> None:
+        self.record_type = record_type
+        self.names = names
+        self.marshal = marshal
+        self.unmarshal = unmarshal
+
+    def __repr__(self):  # pragma: no cover
+        return f"{self.__class__.__name__}({self.record_type})"
+
+
+@functools.lru_cache(maxsize=None)
+def get_record_plan(record_type: typing.Type) -> RecordPlan:
+    names = tuple(f.name for f in dataclasses.fields(record_type))
+
+    cls_globals = {
+        "_serialize": client_serialize,
+        "_deserialize": client_deserialize,
+        "_record_type": record_type,
+    }
+
+    marshal = create_fn(
+        "marshal",
+        ["record"],
+        [
+            "return {"
+            + ", ".join(f'"{n}": _serialize(record.{n})' for n in names)
+            + "}"
+        ],
+        cls_globals=cls_globals,
+    )
+    unmarshal = create_fn(
+        "unmarshal",
+        ["item"],
+        [
+            "return _record_type("
+            + ", ".join(f'{n}=_deserialize(item["{n}"])' for n in names)
+            + ")"
+        ],
+        cls_globals=cls_globals,
+    )
+
+    return RecordPlan(record_type, names, marshal, unmarshal)
+
+
+def client_serialize_record(record: typing.Any) -> dict:
+    return {"M": get_record_plan(type(record)).marshal(record)}
 
 
-def client_deserialize(obj):
-    return type_deserializer.deserialize(deserialize(obj))
+def client_deserialize_record(
+    attribute: dict, record_type: typing.Type
+) -> typing.Any:
+    return get_record_plan(record_type).unmarshal(attribute["M"])
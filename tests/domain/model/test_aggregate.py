@@ -6,6 +6,7 @@ from unittest import mock
 from domainpy.exceptions import DefinitionError, VersionError
 from domainpy.domain.model.aggregate import AggregateRoot, mutator, Selector
 from domainpy.domain.model.event import DomainEvent
+from domainpy.domain.model.history import IEventHistory, KeepLast, KeepNone
 from domainpy.domain.model.value_object import Identity
 
 
@@ -172,4 +173,118 @@ def test_mutator_do_nothing_if_not_handle(event):
     def mutate():
         pass
 
-    mutate(None, event)
\ No newline at end of file
+    mutate(None, event)
+
+
+def test_selector_looks_up_history_when_not_retained(identity):
+    class StandardEvent(DomainEvent):
+        pass
+
+    class History(IEventHistory):
+        def __init__(self, events):
+            self.events = events
+            self.calls = 0
+
+        def get_events(self, *, trace_id=None, event_type=None, from_number=None):
+            self.calls += 1
+            return [
+                e for e in self.events
+                if (trace_id is None or e.__trace_id__ == trace_id)
+                and (event_type is None or isinstance(e, event_type))
+                and (from_number is None or e.__number__ >= from_number)
+            ]
+
+    class Aggregate(AggregateRoot):
+        __retention__ = KeepLast(1)
+
+        def mutate(self, event):
+            pass
+
+    agg = Aggregate(identity=identity)
+    stream_id = agg.create_stream_id(identity)
+    events = [
+        StandardEvent(
+            __stream_id__=stream_id,
+            __number__=number,
+            __timestamp__=0.0,
+            __trace_id__=trace_id,
+            __version__=1
+        )
+        for number, trace_id in ((1, 'a'), (2, 'b'))
+    ]
+    for event in events:
+        agg.__route__(event)
+
+    agg.__history__ = History(events)
+
+    assert agg.__seen__ == events[1:]
+    assert agg.__selector__.filter_trace('a') == (events[0],)
+    assert agg.__selector__.filter_event_type(StandardEvent) == tuple(events)
+    assert agg.__history__.calls == 2
+
+def test_selector_covers_events_routed_after_snapshot(identity):
+    class Aggregate(AggregateRoot):
+        def mutate(self, event):
+            pass
+
+    agg = Aggregate(identity=identity)
+    agg.__history__ = mock.Mock()
+    stream_id = agg.create_stream_id(identity)
+
+    agg.__route__(
+        DomainEvent(__stream_id__=stream_id, __number__=5, __timestamp__=0.0, __version__=1),
+        is_snapshot=True
+    )
+    event = DomainEvent(
+        __stream_id__=stream_id, __number__=6, __timestamp__=0.0, __trace_id__='a', __version__=1
+    )
+    agg.__route__(event)
+
+    assert agg.__covers__(trace_id='a')
+    assert agg.__selector__.filter_trace('a') == (event,)
+    agg.__history__.get_events.assert_not_called()
+
+def test_selector_covers_all_routed_events(identity, event):
+    class Aggregate(AggregateRoot):
+        __retention__ = KeepNone()
+
+        def mutate(self, event):
+            pass
+
+    agg = Aggregate(identity=identity)
+    agg.__history__ = mock.Mock()
+
+    assert agg.__selector__.filter_trace('a') == ()
+    agg.__history__.get_events.assert_not_called()
+    assert agg.__covers__(trace_id='a')
+
+    agg.__route__(event)
+    assert not agg.__covers__(trace_id='a')
+
+def test_selector_queries_seen_indexes(identity):
+    class StandardEvent(DomainEvent):
+        pass
+
+    class CompensationEvent(StandardEvent):
+        pass
+
+    class Aggregate(AggregateRoot):
+        def mutate(self, event):
+            pass
+
+    agg = Aggregate(identity=identity)
+    for event_type, trace_id in ((StandardEvent, 'a'), (StandardEvent, 'b'), (CompensationEvent, 'a')):
+        agg.__apply__(agg.__stamp__(event_type)(__trace_id__=trace_id, __version__=1))
+    events = agg.__changes__
+
+    selector = agg.__selector__
+    assert selector == events
+    assert selector.filter_trace('a') == (events[0], events[2])
+    assert selector.filter_event_type(StandardEvent) == tuple(events)
+    assert selector.filter_event_type(CompensationEvent) == (events[2],)
+    assert selector.get_events_for_compensation(
+        'a', empty_if_has_event=CompensationEvent, return_event=StandardEvent
+    ) == ()
+    assert selector.get_events_for_compensation(
+        'b', empty_if_has_event=CompensationEvent, return_event=StandardEvent
+    ) == (events[1],)
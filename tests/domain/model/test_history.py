@@ -0,0 +1,98 @@
+from domainpy.domain.model.event import DomainEvent
+from domainpy.domain.model.history import (
+    KeepAll,
+    KeepEventTypes,
+    KeepLast,
+    KeepNone,
+    KeepTraceWindow,
+    SeenEvents,
+)
+
+
+class StandardEvent(DomainEvent):
+    pass
+
+
+class OtherEvent(DomainEvent):
+    pass
+
+
+def make_event(number, trace_id='tid', event_type=StandardEvent):
+    return event_type(
+        __stream_id__='sid',
+        __number__=number,
+        __timestamp__=0.0,
+        __trace_id__=trace_id,
+        __version__=1
+    )
+
+
+def retain_all(retention, events):
+    seen = SeenEvents()
+    for event in events:
+        retention.retain(seen, event)
+    return seen
+
+
+def test_keep_all():
+    events = [make_event(1), make_event(2)]
+
+    assert retain_all(KeepAll(), events) == events
+    assert KeepAll().covers(SeenEvents(), trace_id='tid')
+
+def test_keep_none():
+    assert retain_all(KeepNone(), [make_event(1)]) == []
+    assert not KeepNone().covers(SeenEvents(), trace_id='tid')
+
+def test_keep_last():
+    events = [make_event(n) for n in range(1, 5)]
+
+    assert retain_all(KeepLast(2), events) == events[2:]
+
+def test_keep_event_types():
+    events = [make_event(1), make_event(2, event_type=OtherEvent)]
+    retention = KeepEventTypes(OtherEvent)
+
+    assert retain_all(retention, events) == events[1:]
+    assert retention.covers(SeenEvents(), event_type=OtherEvent)
+    assert not retention.covers(SeenEvents(), event_type=(OtherEvent, StandardEvent))
+    assert not retention.covers(SeenEvents(), trace_id='tid')
+
+def test_keep_trace_window():
+    events = [make_event(1, 'a'), make_event(2, 'b'), make_event(3, 'a'), make_event(4, 'c')]
+    retention = KeepTraceWindow(2)
+
+    seen = retain_all(retention, events)
+
+    assert seen == events[1:2] + events[3:]
+    assert retention.covers(seen, trace_id='b')
+    assert not retention.covers(seen, trace_id='a')
+
+def test_seen_events_indexes():
+    events = [
+        make_event(1, 'a'),
+        make_event(2, 'b', OtherEvent),
+        make_event(3, 'a', OtherEvent),
+    ]
+    seen = SeenEvents(events)
+
+    assert seen.get_trace('a') == [events[0], events[2]]
+    assert seen.get_types(OtherEvent) == events[1:]
+    assert seen.get_types(DomainEvent) == events
+    assert seen.get_types((StandardEvent, OtherEvent)) == events
+
+    assert seen[1] is events[1]
+    assert seen[-1] is events[2]
+    assert seen[1:] == events[1:]
+
+    seen.remove(events[2])
+
+    assert seen.get_trace('a') == events[:1]
+    assert seen.get_types(OtherEvent) == events[1:2]
+    assert seen.last() is events[1]
+
+    seen.remove_trace('a')
+
+    assert list(seen.traces) == ['b']
+    assert seen.first() is events[1]
+    assert seen.get_trace('a') == []
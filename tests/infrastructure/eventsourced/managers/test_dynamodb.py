@@ -1,13 +1,19 @@
 import pytest
 import uuid
+import asyncio
 import datetime
 import boto3
 import moto
 import dataclasses
+from unittest import mock
 
 from domainpy import exceptions as excs
-from domainpy.infrastructure.eventsourced.managers.dynamodb import DynamoDBEventRecordManager
+from domainpy.infrastructure.eventsourced.managers.dynamodb import DynamoDBEventRecordManager, AsyncDynamoDBEventRecordManager, UnprocessedItemsError
+from domainpy.domain.model.event import DomainEvent
+from domainpy.infrastructure.mappers import Mapper
 from domainpy.infrastructure.records import EventRecord
+from domainpy.infrastructure.recordformat import BinaryRecordFormat
+from domainpy.infrastructure.transcoder import Transcoder
 from domainpy.utils.dynamodb import client_serialize as serialize, client_deserialize as deserialize
 
 
@@ -143,3 +149,530 @@ def test_get_records_filtering_number(dynamodb, table_name, region_name, stream_
 
     events = rm.get_records(stream_id, from_number=0, to_number=0)
     assert len(list(events)) == 1
+
+def test_binary_payload_roundtrip(dynamodb, table_name, region_name, stream_id):
+    class Event(DomainEvent):
+        some_property: str
+
+    mapper = Mapper(transcoder=Transcoder())
+    mapper.register(Event)
+
+    event_record = mapper.serialize(
+        Event(
+            __stream_id__=stream_id,
+            __number__=1,
+            __version__=1,
+            __timestamp__=0.0,
+            __trace_id__='tid',
+            __context__='some_context',
+            some_property='x'
+        )
+    )
+
+    rm = DynamoDBEventRecordManager(
+        table_name, record_format=BinaryRecordFormat(mapper), region_name=region_name
+    )
+    with rm.session() as session:
+        session.append(event_record)
+        session.commit()
+
+    items = dynamodb.query(
+        TableName=table_name,
+        KeyConditionExpression='stream_id = :stream_id',
+        ExpressionAttributeValues={ ':stream_id': { 'S': stream_id } }
+    )['Items']
+    assert 'B' in items[0]['payload']
+
+    events = list(rm.get_records(stream_id))
+    assert events[0].payload == event_record.payload
+
+def test_binary_payload_readable_after_schema_change(dynamodb, table_name, region_name, stream_id):
+    class Event(DomainEvent):
+        some_property: str
+
+    mapper = Mapper(transcoder=Transcoder())
+    mapper.register(Event)
+
+    event_record = mapper.serialize(
+        Event(
+            __stream_id__=stream_id,
+            __number__=1,
+            __version__=1,
+            __timestamp__=0.0,
+            __trace_id__='tid',
+            __context__='some_context',
+            some_property='x'
+        )
+    )
+
+    rm = DynamoDBEventRecordManager(
+        table_name, record_format=BinaryRecordFormat(mapper), region_name=region_name
+    )
+    with rm.session() as session:
+        session.append(event_record)
+        session.commit()
+
+    # Restarted with a field added to the class
+    class Event(DomainEvent):
+        some_property: str
+        other_property: str = 'y'
+
+    mapper = Mapper(transcoder=Transcoder())
+    mapper.register(Event)
+
+    rm = DynamoDBEventRecordManager(
+        table_name, record_format=BinaryRecordFormat(mapper), region_name=region_name
+    )
+    assert list(rm.get_records(stream_id)) == [event_record]
+
+def test_replace_commit(dynamodb, table_name, region_name, stream_id, event_record):
+    put_event_record(dynamodb, table_name, event_record)
+
+    rm = DynamoDBEventRecordManager(table_name, region_name=region_name)
+
+    with rm.session() as session:
+        session.replace(dataclasses.replace(event_record, version=2))
+        session.commit()
+
+    records = list(rm.get_records(stream_id))
+    assert len(records) == 1
+    assert records[0].version == 2
+
+def test_replace_fail_if_not_exists(dynamodb, table_name, region_name, event_record):
+    rm = DynamoDBEventRecordManager(table_name, region_name=region_name)
+
+    with pytest.raises(excs.ConcurrencyError):
+        with rm.session() as session:
+            session.replace(event_record)
+            session.commit()
+
+def test_get_records_paginated(dynamodb, table_name, region_name, stream_id, event_record):
+    for number in range(5):
+        put_event_record(dynamodb, table_name, dataclasses.replace(event_record, number=number))
+
+    rm = DynamoDBEventRecordManager(table_name, page_size=2, region_name=region_name)
+    query = mock.Mock(wraps=rm.client.query)
+    rm.client.query = query
+
+    events = rm.get_records(stream_id)
+    query.assert_not_called()
+
+    assert [e.number for e in events] == [0, 1, 2, 3, 4]
+    assert query.call_count == 3
+
+def test_get_records_number_range_in_key_condition(dynamodb, table_name, region_name, stream_id, event_record):
+    for number in range(5):
+        put_event_record(dynamodb, table_name, dataclasses.replace(event_record, number=number))
+
+    rm = DynamoDBEventRecordManager(table_name, region_name=region_name)
+    query = mock.Mock(wraps=rm.client.query)
+    rm.client.query = query
+
+    assert [e.number for e in rm.get_records(stream_id, from_number=3)] == [3, 4]
+    assert [e.number for e in rm.get_records(stream_id, to_number=1)] == [0, 1]
+    assert [e.number for e in rm.get_records(stream_id, from_number=1, to_number=2)] == [1, 2]
+
+    for call in query.call_args_list:
+        assert 'FilterExpression' not in call.kwargs
+        assert '#number' in call.kwargs['KeyConditionExpression']
+
+def test_get_items_with_projection(dynamodb, table_name, region_name, stream_id, event_record):
+    put_event_record(dynamodb, table_name, event_record)
+
+    rm = DynamoDBEventRecordManager(table_name, region_name=region_name)
+
+    items = list(rm.get_items(stream_id, attributes=['number', 'topic']))
+    assert items == [{ 'number': { 'N': '0' }, 'topic': { 'S': event_record.topic } }]
+
+@pytest.fixture
+def log_table_name(dynamodb):
+    log_table_name = 'event_store_log_table_name'
+    dynamodb.create_table(
+        TableName=log_table_name,
+        KeySchema=[
+            { 'AttributeName': 'shard', 'KeyType': 'HASH' },
+            { 'AttributeName': 'position', 'KeyType': 'RANGE' }
+        ],
+        AttributeDefinitions=[
+            { 'AttributeName': 'shard', 'AttributeType': 'N' },
+            { 'AttributeName': 'position', 'AttributeType': 'N' }
+        ],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    return log_table_name
+
+def test_get_all_records(dynamodb, table_name, log_table_name, region_name, event_record):
+    rm = DynamoDBEventRecordManager(
+        table_name, log_table_name=log_table_name, log_shard_size=3, region_name=region_name
+    )
+    for n in range(5):
+        with rm.session() as session:
+            session.append(dataclasses.replace(event_record, stream_id=f'stream-{n % 2}', number=n))
+            session.commit()
+
+    # Failed commit takes no position
+    with pytest.raises(excs.ConcurrencyError):
+        with rm.session() as session:
+            session.append(dataclasses.replace(event_record, stream_id='stream-0', number=0))
+            session.commit()
+
+    with rm.session() as session:
+        session.append(dataclasses.replace(event_record, stream_id='stream-1', number=5))
+        session.commit()
+
+    batches = list(rm.get_all_records(batch_size=2))
+    assert [r.number for b in batches for r in b.records] == [0, 1, 2, 3, 4, 5]
+    assert batches[-1].checkpoint == 6
+
+    checkpoint = batches[1].checkpoint
+    assert [r.number for b in rm.get_all_records(from_position=checkpoint) for r in b.records] == [4, 5]
+
+def test_get_all_records_positions_follow_commit_order(dynamodb, table_name, log_table_name, region_name, event_record):
+    rm = DynamoDBEventRecordManager(table_name, log_table_name=log_table_name, region_name=region_name)
+    get_last_position = rm.get_last_position
+
+    def interleave():
+        # Other writer commits after this one read the counter
+        last_position = get_last_position()
+        if rm.get_last_position.call_count == 1:
+            with rm.session() as other:
+                other.append(dataclasses.replace(event_record, stream_id='stream-b'))
+                other.commit()
+        return last_position
+
+    with rm.session() as session:
+        session.append(dataclasses.replace(event_record, stream_id='stream-a'))
+        with mock.patch.object(rm, 'get_last_position', side_effect=interleave):
+            session.commit()
+
+    batches = list(rm.get_all_records())
+    assert [r.stream_id for b in batches for r in b.records] == ['stream-b', 'stream-a']
+    assert batches[-1].checkpoint == 2
+
+def test_contended_log_counter_gives_up(dynamodb, table_name, log_table_name, region_name, event_record):
+    rm = DynamoDBEventRecordManager(
+        table_name, log_table_name=log_table_name, max_attempts=3, backoff_ms=0, region_name=region_name
+    )
+    with rm.session() as session:
+        session.append(dataclasses.replace(event_record, stream_id='stream-a'))
+        session.commit()
+
+    # Counter always moved by other commit
+    with mock.patch.object(rm, 'get_last_position', return_value=0) as get_last_position:
+        with pytest.raises(excs.ConcurrencyError):
+            with rm.session() as session:
+                session.append(dataclasses.replace(event_record, stream_id='stream-b'))
+                session.commit()
+
+    assert get_last_position.call_count == 3
+    assert [r.stream_id for b in rm.get_all_records() for r in b.records] == ['stream-a']
+
+def test_commit_above_transaction_limit_raises(dynamodb, table_name, log_table_name, region_name, event_record):
+    rm = DynamoDBEventRecordManager(table_name, log_table_name=log_table_name, region_name=region_name)
+
+    with pytest.raises(ValueError):
+        with rm.session() as session:
+            for n in range(50):
+                session.append(dataclasses.replace(event_record, number=n))
+            session.commit()
+
+    assert rm.get_last_record(event_record.stream_id) is None
+
+def test_get_all_records_stops_at_gap(dynamodb, table_name, log_table_name, region_name, event_record):
+    rm = DynamoDBEventRecordManager(table_name, log_table_name=log_table_name, region_name=region_name)
+    for n in range(3):
+        with rm.session() as session:
+            session.append(dataclasses.replace(event_record, number=n))
+            session.commit()
+
+    # Position 2 not yet visible to readers
+    dynamodb.delete_item(
+        TableName=log_table_name, Key={ 'shard': { 'N': '0' }, 'position': { 'N': '2' } }
+    )
+
+    batches = list(rm.get_all_records())
+    assert [r.number for b in batches for r in b.records] == [0]
+    assert batches[-1].checkpoint == 1
+
+def test_get_all_records_requires_log_table(dynamodb, table_name, region_name):
+    rm = DynamoDBEventRecordManager(table_name, region_name=region_name)
+
+    with pytest.raises(NotImplementedError):
+        list(rm.get_all_records())
+
+class AsyncClient:
+    # Awaitable facade of a boto3 client, as aiobotocore clients are
+    def __init__(self, client):
+        self.client = client
+        self.exceptions = client.exceptions
+
+    async def query(self, **kwargs):
+        return self.client.query(**kwargs)
+
+    async def transact_write_items(self, **kwargs):
+        return self.client.transact_write_items(**kwargs)
+
+    async def batch_write_item(self, **kwargs):
+        return self.client.batch_write_item(**kwargs)
+
+    async def put_item(self, **kwargs):
+        return self.client.put_item(**kwargs)
+
+def test_async_append_and_get_records(dynamodb, table_name, stream_id, event_record):
+    rm = AsyncDynamoDBEventRecordManager(table_name, AsyncClient(dynamodb), page_size=2)
+
+    async def append(record):
+        async with rm.session() as session:
+            session.append(record)
+            await session.commit()
+
+    async def scenario():
+        await asyncio.gather(*(
+            append(dataclasses.replace(event_record, number=n)) for n in range(5)
+        ))
+
+        with pytest.raises(excs.ConcurrencyError):
+            await append(event_record)
+
+        return [r.number async for r in rm.get_records(stream_id, from_number=1)]
+
+    assert asyncio.run(scenario()) == [1, 2, 3, 4]
+
+def test_async_get_last_record_and_delete_records(dynamodb, table_name, stream_id, event_record):
+    for n in range(4):
+        put_event_record(dynamodb, table_name, dataclasses.replace(event_record, number=n))
+
+    rm = AsyncDynamoDBEventRecordManager(table_name, AsyncClient(dynamodb))
+
+    async def scenario():
+        last_record = await rm.get_last_record(stream_id)
+        await rm.delete_records(stream_id, to_number=1)
+        return last_record, [r.number async for r in rm.get_records(stream_id)]
+
+    last_record, numbers = asyncio.run(scenario())
+    assert last_record.number == 3
+    assert numbers == [2, 3]
+
+def test_get_trace_records_filters_in_query(dynamodb, table_name, region_name, stream_id, event_record):
+    for n in range(4):
+        put_event_record(dynamodb, table_name, dataclasses.replace(event_record, number=n, trace_id=f'trace-{n % 2}'))
+
+    rm = DynamoDBEventRecordManager(table_name, region_name=region_name)
+    query = mock.Mock(wraps=rm.client.query)
+    rm.client.query = query
+
+    assert [r.number for r in rm.get_trace_records(stream_id, 'trace-1')] == [1, 3]
+    assert [r.number for r in rm.get_trace_records(stream_id, 'trace-0', from_number=1)] == [2]
+    assert 'trace_id = :trace_id' in query.call_args.kwargs['FilterExpression']
+
+def test_get_last_records_many(dynamodb, table_name, region_name, event_record):
+    for n in range(4):
+        put_event_record(dynamodb, table_name, dataclasses.replace(event_record, stream_id=f'stream-{n % 2}', number=n))
+
+    rm = DynamoDBEventRecordManager(table_name, region_name=region_name)
+    records = rm.get_last_records_many(['stream-0', 'stream-1', 'unknown'])
+
+    assert { k: v and v.number for k, v in records.items() } == {
+        'stream-0': 2, 'stream-1': 3, 'unknown': None
+    }
+
+def test_get_records_many(dynamodb, table_name, region_name, event_record):
+    for n in range(6):
+        put_event_record(dynamodb, table_name, dataclasses.replace(event_record, stream_id=f'stream-{n % 3}', number=n))
+
+    rm = DynamoDBEventRecordManager(table_name, region_name=region_name, max_workers=2)
+    records = rm.get_records_many(['stream-0', 'stream-1', 'unknown'], from_numbers={ 'stream-1': 2 })
+
+    assert { k: [r.number for r in v] for k, v in records.items() } == {
+        'stream-0': [0, 3], 'stream-1': [4], 'unknown': []
+    }
+
+def test_get_last_record_reads_backwards(dynamodb, table_name, region_name, stream_id, event_record):
+    for n in range(4):
+        put_event_record(dynamodb, table_name, dataclasses.replace(event_record, number=n, topic=f'topic-{n % 2}'))
+
+    rm = DynamoDBEventRecordManager(table_name, region_name=region_name)
+    query = mock.Mock(wraps=rm.client.query)
+    rm.client.query = query
+
+    assert rm.get_last_record(stream_id).number == 3
+    assert query.call_args.kwargs['ScanIndexForward'] is False
+    assert query.call_args.kwargs['Limit'] == 1
+
+    assert rm.get_last_record(stream_id, topic='topic-0').number == 2
+    assert rm.get_last_record('unknown') is None
+
+def test_delete_records(dynamodb, table_name, log_table_name, region_name, stream_id, event_record):
+    rm = DynamoDBEventRecordManager(table_name, log_table_name=log_table_name, region_name=region_name)
+    with rm.session() as session:
+        for n in range(4):
+            session.append(dataclasses.replace(event_record, number=n))
+        session.commit()
+
+    rm.delete_records(stream_id, to_number=1)
+
+    assert [r.number for r in rm.get_records(stream_id)] == [2, 3]
+    assert [r.number for b in rm.get_all_records() for r in b.records] == [2, 3]
+
+def test_colocated_snapshots(dynamodb, table_name, log_table_name, region_name, stream_id, event_record):
+    snapshot_stream_id = f'{stream_id}:Snapshot'
+    rm = DynamoDBEventRecordManager(
+        table_name, log_table_name=log_table_name, snapshot_suffix=':Snapshot', region_name=region_name
+    )
+
+    with rm.session() as session:
+        for n in range(1, 6):
+            session.append(dataclasses.replace(event_record, number=n))
+        for n in (2, 3):
+            session.append(dataclasses.replace(event_record, stream_id=snapshot_stream_id, number=n))
+        session.commit()
+
+    # Snapshots live in the partition of the stream
+    items = dynamodb.query(
+        TableName=table_name,
+        KeyConditionExpression='stream_id = :stream_id',
+        ExpressionAttributeValues={ ':stream_id': { 'S': stream_id } }
+    )['Items']
+    assert len(items) == 7
+
+    assert [r.number for r in rm.get_records(stream_id)] == [1, 2, 3, 4, 5]
+    assert [(r.stream_id, r.number) for r in rm.get_records(snapshot_stream_id)] == [
+        (snapshot_stream_id, 2), (snapshot_stream_id, 3)
+    ]
+    assert rm.get_last_record(snapshot_stream_id).number == 3
+    assert rm.get_last_record(stream_id).number == 5
+
+    query = mock.Mock(wraps=rm.client.query)
+    rm.client.query = query
+
+    snapshot, records = rm.get_records_from_snapshot(stream_id, snapshot_stream_id)
+    assert snapshot == dataclasses.replace(event_record, stream_id=snapshot_stream_id, number=3)
+    assert [r.number for r in records] == [4, 5]
+    assert query.call_count == 1
+
+    rm.delete_records(snapshot_stream_id, to_number=2)
+    assert [r.number for r in rm.get_records(snapshot_stream_id)] == [3]
+    assert [r.number for r in rm.get_records(stream_id)] == [1, 2, 3, 4, 5]
+    assert [r.stream_id for b in rm.get_all_records() for r in b.records].count(snapshot_stream_id) == 1
+
+def test_colocated_get_last_record_in_one_round_trip(dynamodb, table_name, region_name, stream_id, event_record):
+    snapshot_stream_id = f'{stream_id}:Snapshot'
+    rm = DynamoDBEventRecordManager(table_name, snapshot_suffix=':Snapshot', region_name=region_name)
+
+    with rm.session() as session:
+        session.append(dataclasses.replace(event_record, stream_id=snapshot_stream_id, number=1))
+        for n in range(1, 6):
+            session.append(dataclasses.replace(event_record, number=n))
+        session.append(dataclasses.replace(event_record, stream_id=snapshot_stream_id, number=5))
+        session.commit()
+
+    rm.delete_records(snapshot_stream_id, to_number=4)
+
+    query = mock.Mock(wraps=rm.client.query)
+    rm.client.query = query
+
+    assert rm.get_last_record(stream_id).number == 5
+    assert rm.get_last_record(snapshot_stream_id) is not None
+    assert query.call_count == 2
+
+    rm.delete_records(snapshot_stream_id, to_number=5)
+    with rm.session() as session:
+        session.append(dataclasses.replace(event_record, stream_id=snapshot_stream_id, number=1))
+        session.commit()
+
+    query.reset_mock()
+    assert rm.get_last_record(snapshot_stream_id).number == 1
+    assert query.call_count == 1
+
+def test_snapshot_item_requires_snapshot_suffix(dynamodb, table_name, region_name, stream_id, event_record):
+    colocated = DynamoDBEventRecordManager(table_name, snapshot_suffix=':Snapshot', region_name=region_name)
+    with colocated.session() as session:
+        session.append(dataclasses.replace(event_record, stream_id=f'{stream_id}:Snapshot', number=1))
+        session.commit()
+
+    rm = DynamoDBEventRecordManager(table_name, region_name=region_name)
+    with pytest.raises(TypeError):
+        list(rm.get_records(stream_id))
+
+def test_async_binary_payload_readable_after_restart(dynamodb, table_name, stream_id):
+    class Event(DomainEvent):
+        some_property: str
+
+    mapper = Mapper(transcoder=Transcoder())
+    mapper.register(Event)
+
+    event_record = mapper.serialize(
+        Event(
+            __stream_id__=stream_id,
+            __number__=1,
+            __version__=1,
+            __timestamp__=0.0,
+            __trace_id__='tid',
+            __context__='some_context',
+            some_property='x'
+        )
+    )
+
+    async def scenario():
+        rm = AsyncDynamoDBEventRecordManager(
+            table_name, AsyncClient(dynamodb), record_format=BinaryRecordFormat(mapper)
+        )
+        async with rm.session() as session:
+            session.append(event_record)
+            await session.commit()
+
+        # Restarted with a field added to the class
+        class Event(DomainEvent):
+            some_property: str
+            other_property: str = 'y'
+
+        changed = Mapper(transcoder=Transcoder())
+        changed.register(Event)
+
+        rm = AsyncDynamoDBEventRecordManager(
+            table_name, AsyncClient(dynamodb), record_format=BinaryRecordFormat(changed)
+        )
+        return await rm.get_last_record(stream_id)
+
+    assert asyncio.run(scenario()) == event_record
+
+def test_delete_records_retries_unprocessed_items(dynamodb, table_name, region_name, stream_id, event_record):
+    rm = DynamoDBEventRecordManager(table_name, max_attempts=3, backoff_ms=0, region_name=region_name)
+    with rm.session() as session:
+        for n in range(3):
+            session.append(dataclasses.replace(event_record, number=n))
+        session.commit()
+
+    # Throttled once, then processed
+    batch_write_item = rm.client.batch_write_item
+    responses = [lambda RequestItems: { 'UnprocessedItems': RequestItems }, batch_write_item]
+    rm.client.batch_write_item = mock.Mock(side_effect=lambda **kwargs: responses.pop(0)(**kwargs))
+
+    rm.delete_records(stream_id, to_number=1)
+    assert rm.client.batch_write_item.call_count == 2
+    assert [r.number for r in rm.get_records(stream_id)] == [2]
+
+    # Always throttled
+    rm.client.batch_write_item = mock.Mock(side_effect=lambda RequestItems: { 'UnprocessedItems': RequestItems })
+    with pytest.raises(UnprocessedItemsError):
+        rm.delete_records(stream_id, to_number=2)
+
+    assert rm.client.batch_write_item.call_count == 3
+
+def test_async_delete_records_gives_up_when_throttled(dynamodb, table_name, stream_id, event_record):
+    put_event_record(dynamodb, table_name, event_record)
+
+    calls = []
+
+    async def batch_write_item(RequestItems):
+        calls.append(RequestItems)
+        return { 'UnprocessedItems': RequestItems }
+
+    client = AsyncClient(dynamodb)
+    client.batch_write_item = batch_write_item
+    rm = AsyncDynamoDBEventRecordManager(table_name, client, max_attempts=2, backoff_ms=0)
+
+    with pytest.raises(UnprocessedItemsError):
+        asyncio.run(rm.delete_records(stream_id, to_number=0))
+
+    assert len(calls) == 2
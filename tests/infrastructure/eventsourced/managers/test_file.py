@@ -0,0 +1,337 @@
+import os
+import time
+import pytest
+import uuid
+import threading
+import dataclasses
+from unittest import mock
+
+from domainpy import exceptions as excs
+from domainpy.domain.model.event import DomainEvent
+from domainpy.infrastructure.eventsourced.managers.file import FileEventRecordManager
+from domainpy.infrastructure.mappers import Mapper
+from domainpy.infrastructure.records import EventRecord
+from domainpy.infrastructure.recordformat import BinaryRecordFormat
+from domainpy.infrastructure.transcoder import Transcoder
+
+
+@pytest.fixture
+def directory(tmp_path):
+    return str(tmp_path / 'event_store')
+
+@pytest.fixture
+def stream_id():
+    return str(uuid.uuid4())
+
+@pytest.fixture
+def event_record(stream_id):
+    return EventRecord(
+        stream_id=stream_id,
+        number=0,
+        topic='some-topic',
+        version=1,
+        timestamp=0.0,
+        trace_id=str(uuid.uuid4()),
+        message='event',
+        context='some-context',
+        payload={ 'some_property': { 'some_other_property': 'x' } }
+    )
+
+def append(rm, *records):
+    with rm.session() as session:
+        for record in records:
+            session.append(record)
+        session.commit()
+
+def segment_files(directory):
+    return sorted(f for f in os.listdir(directory) if f.endswith('.segment'))
+
+def test_append_commit(directory, stream_id, event_record):
+    rm = FileEventRecordManager(directory)
+    append(rm, event_record)
+
+    assert list(rm.get_records(stream_id)) == [event_record]
+
+def test_append_rollback(directory, stream_id, event_record):
+    rm = FileEventRecordManager(directory)
+
+    with rm.session() as session:
+        session.append(event_record)
+
+    assert len(list(rm.get_records(stream_id))) == 0
+
+def test_append_fail_on_concurrency(directory, stream_id, event_record):
+    rm = FileEventRecordManager(directory)
+    append(rm, event_record)
+
+    with pytest.raises(excs.ConcurrencyError):
+        append(rm, dataclasses.replace(event_record, number=1), event_record)
+
+    assert len(list(rm.get_records(stream_id))) == 1
+
+def test_get_records(directory, stream_id, event_record):
+    rm = FileEventRecordManager(directory)
+    append(rm, *(
+        dataclasses.replace(
+            event_record,
+            number=number,
+            topic=f'topic-{number % 2}',
+            timestamp=float(number)
+        )
+        for number in range(5)
+    ))
+
+    assert [r.number for r in rm.get_records(stream_id)] == [0, 1, 2, 3, 4]
+    assert [r.number for r in rm.get_records(stream_id, topic='topic-0')] == [0, 2, 4]
+    assert [r.number for r in rm.get_records(stream_id, from_number=1, to_number=3)] == [1, 2, 3]
+    assert [r.number for r in rm.get_records(stream_id, from_timestamp=1.0, to_timestamp=2.0)] == [1, 2]
+    assert len(list(rm.get_records('unknown'))) == 0
+
+def test_segments_roll_and_reload(directory, stream_id, event_record):
+    rm = FileEventRecordManager(directory, segment_size=512, group_commit=0)
+    records = [dataclasses.replace(event_record, number=n) for n in range(20)]
+    for record in records:
+        append(rm, record)
+    rm.close()
+
+    assert len(segment_files(directory)) > 1
+
+    rm = FileEventRecordManager(directory, segment_size=512)
+    assert list(rm.get_records(stream_id)) == records
+    assert rm.position == 20
+
+def test_recover_torn_tail(directory, stream_id, event_record):
+    rm = FileEventRecordManager(directory)
+    append(rm, event_record)
+    append(rm, dataclasses.replace(event_record, number=1))
+    rm.close()
+
+    path = os.path.join(directory, segment_files(directory)[-1])
+    size = os.path.getsize(path)
+    with open(path, 'r+b') as file:
+        file.truncate(size - 3)
+
+    rm = FileEventRecordManager(directory)
+    assert list(rm.get_records(stream_id)) == [event_record]
+
+    append(rm, dataclasses.replace(event_record, number=1))
+    assert [r.number for r in rm.get_records(stream_id)] == [0, 1]
+
+def test_recover_drops_torn_commit_whole(directory, stream_id, event_record):
+    rm = FileEventRecordManager(directory)
+    append(rm, event_record)
+    path = os.path.join(directory, segment_files(directory)[-1])
+    committed = os.path.getsize(path)
+
+    append(rm, *(dataclasses.replace(event_record, number=n) for n in (1, 2, 3)))
+    rm.close()
+
+    # Leading frames of the commit are intact, its marker is not
+    size = os.path.getsize(path)
+    with open(path, 'r+b') as file:
+        file.truncate(size - 1)
+
+    rm = FileEventRecordManager(directory)
+    assert list(rm.get_records(stream_id)) == [event_record]
+    assert os.path.getsize(path) == committed
+
+def test_commit_never_spans_segments(directory, stream_id, event_record):
+    rm = FileEventRecordManager(directory, segment_size=512, group_commit=False)
+    append(rm, event_record)
+
+    records = [dataclasses.replace(event_record, number=n) for n in range(1, 10)]
+    append(rm, *records)
+
+    assert len(segment_files(directory)) == 2
+    assert {e.segment for e in rm.streams[stream_id].records.values() if e.number > 0} == {2}
+    rm.close()
+
+    rm = FileEventRecordManager(directory, segment_size=512)
+    assert list(rm.get_records(stream_id)) == [event_record] + records
+
+def test_group_commit_returns_once_synced(directory, event_record):
+    rm = FileEventRecordManager(directory)
+    fsync = os.fsync
+    write = rm._write
+    synced = []
+    unsynced = []
+    local = threading.local()
+
+    def slow_fsync(fd):
+        time.sleep(0.05)
+        fsync(fd)
+        synced.append(fd)
+
+    def tracked_write(bodies):
+        local.commit = write(bodies)
+        return local.commit
+
+    def commit(n):
+        append(rm, dataclasses.replace(event_record, stream_id=f'stream-{n}'))
+        if rm._synced < local.commit:
+            unsynced.append(local.commit)
+
+    with mock.patch('os.fsync', side_effect=slow_fsync), \
+            mock.patch.object(rm, '_write', side_effect=tracked_write):
+        threads = [threading.Thread(target=commit, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert unsynced == []
+    assert rm._synced == rm._written == 8
+    # Commits waiting at once shared fsyncs
+    assert len(synced) < 8
+
+def test_replace_commit(directory, stream_id, event_record):
+    rm = FileEventRecordManager(directory)
+    append(rm, event_record)
+
+    with rm.session() as session:
+        session.replace(dataclasses.replace(event_record, version=2))
+        session.commit()
+
+    assert [r.version for r in rm.get_records(stream_id)] == [2]
+
+    rm.close()
+    rm = FileEventRecordManager(directory)
+    assert [r.version for r in rm.get_records(stream_id)] == [2]
+
+def test_replace_fail_if_not_exists(directory, event_record):
+    rm = FileEventRecordManager(directory)
+
+    with pytest.raises(excs.ConcurrencyError):
+        with rm.session() as session:
+            session.replace(event_record)
+            session.commit()
+
+def test_delete_stream_and_compact(directory, stream_id, event_record):
+    rm = FileEventRecordManager(directory, segment_size=512)
+    other_record = dataclasses.replace(event_record, stream_id='other')
+    for number in range(10):
+        append(rm, dataclasses.replace(event_record, number=number))
+    append(rm, other_record)
+
+    rm.delete_stream(stream_id)
+    assert len(list(rm.get_records(stream_id))) == 0
+
+    before = sum(os.path.getsize(os.path.join(directory, f)) for f in segment_files(directory))
+    rm.compact()
+    after = sum(os.path.getsize(os.path.join(directory, f)) for f in segment_files(directory))
+    assert after < before
+
+    assert list(rm.get_records('other')) == [other_record]
+    rm.close()
+
+    rm = FileEventRecordManager(directory, segment_size=512)
+    assert len(list(rm.get_records(stream_id))) == 0
+    assert list(rm.get_records('other')) == [other_record]
+
+def test_binary_payload_roundtrip(directory, stream_id):
+    class Event(DomainEvent):
+        some_property: str
+
+    mapper = Mapper(transcoder=Transcoder())
+    mapper.register(Event)
+
+    event_record = mapper.serialize(
+        Event(
+            __stream_id__=stream_id,
+            __number__=1,
+            __version__=1,
+            __timestamp__=0.0,
+            __trace_id__='tid',
+            __context__='some_context',
+            some_property='x'
+        )
+    )
+
+    rm = FileEventRecordManager(directory, record_format=BinaryRecordFormat(mapper))
+    append(rm, event_record)
+
+    assert list(rm.get_records(stream_id)) == [event_record]
+
+def test_binary_payload_readable_after_schema_change(directory, stream_id):
+    class Event(DomainEvent):
+        some_property: str
+
+    mapper = Mapper(transcoder=Transcoder())
+    mapper.register(Event)
+
+    event_record = mapper.serialize(
+        Event(
+            __stream_id__=stream_id,
+            __number__=1,
+            __version__=1,
+            __timestamp__=0.0,
+            __trace_id__='tid',
+            __context__='some_context',
+            some_property='x'
+        )
+    )
+
+    rm = FileEventRecordManager(directory, record_format=BinaryRecordFormat(mapper))
+    with rm.session() as session:
+        session.append(event_record)
+        session.commit()
+    rm.close()
+
+    # Restarted with a field added to the class
+    class Event(DomainEvent):
+        some_property: str
+        other_property: str = 'y'
+
+    mapper = Mapper(transcoder=Transcoder())
+    mapper.register(Event)
+
+    rm = FileEventRecordManager(directory, record_format=BinaryRecordFormat(mapper))
+    assert list(rm.get_records(stream_id)) == [event_record]
+
+def test_get_all_records(directory, event_record):
+    rm = FileEventRecordManager(directory, segment_size=512)
+    for n in range(5):
+        append(rm, dataclasses.replace(event_record, stream_id=f'stream-{n % 2}', number=n))
+
+    batches = list(rm.get_all_records(batch_size=2))
+    assert [[r.number for r in b.records] for b in batches] == [[0, 1], [2, 3], [4]]
+
+    checkpoint = batches[0].checkpoint
+    rm.delete_stream('stream-1')
+    rm.compact()
+    rm.close()
+
+    rm = FileEventRecordManager(directory, segment_size=512)
+    assert [r.number for b in rm.get_all_records(from_position=checkpoint) for r in b.records] == [2, 4]
+
+def test_get_all_records_moves_replaced(directory, stream_id, event_record):
+    rm = FileEventRecordManager(directory)
+    append(rm, event_record, dataclasses.replace(event_record, number=1))
+
+    with rm.session() as session:
+        session.replace(dataclasses.replace(event_record, version=2))
+        session.commit()
+
+    records = [r for b in rm.get_all_records() for r in b.records]
+    assert [(r.number, r.version) for r in records] == [(1, 1), (0, 2)]
+
+def test_get_last_record_and_delete_records(directory, stream_id, event_record):
+    rm = FileEventRecordManager(directory, segment_size=512)
+    append(rm, *(
+        dataclasses.replace(event_record, number=n, topic=f'topic-{n % 2}')
+        for n in range(4)
+    ))
+
+    assert rm.get_last_record(stream_id).number == 3
+    assert rm.get_last_record(stream_id, topic='topic-0').number == 2
+    assert rm.get_last_record('unknown') is None
+
+    rm.delete_records(stream_id, to_number=1)
+    assert [r.number for r in rm.get_records(stream_id)] == [2, 3]
+
+    rm.compact()
+    rm.close()
+
+    rm = FileEventRecordManager(directory, segment_size=512)
+    assert [r.number for r in rm.get_records(stream_id)] == [2, 3]
+    assert [r.number for b in rm.get_all_records() for r in b.records] == [2, 3]
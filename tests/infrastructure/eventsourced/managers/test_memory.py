@@ -1,10 +1,11 @@
 import pytest
 import uuid
+import asyncio
 import datetime
 import dataclasses
 
 from domainpy import exceptions as excs
-from domainpy.infrastructure.eventsourced.managers.memory import MemoryEventRecordManager
+from domainpy.infrastructure.eventsourced.managers.memory import MemoryEventRecordManager, AsyncMemoryEventRecordManager
 from domainpy.infrastructure.records import EventRecord
 
 
@@ -83,3 +84,138 @@ def test_get_records_filtering_number(stream_id, event_record):
 
     events = rm.get_records(stream_id, from_number=0, to_number=0)
     assert len(list(events)) == 1
+
+def test_replace_commit(event_record):
+    rm = MemoryEventRecordManager()
+    rm.heap.append(event_record)
+
+    with rm.session() as session:
+        session.replace(dataclasses.replace(event_record, version=2))
+        session.commit()
+
+    assert len(rm.heap) == 1
+    assert rm.heap[0].version == 2
+
+def test_replace_fail_if_not_exists(event_record):
+    rm = MemoryEventRecordManager()
+
+    with pytest.raises(excs.ConcurrencyError):
+        with rm.session() as session:
+            session.replace(event_record)
+            session.commit()
+
+def test_append_fail_on_duplicate_in_session(event_record):
+    rm = MemoryEventRecordManager()
+
+    with pytest.raises(excs.ConcurrencyError):
+        with rm.session() as session:
+            session.append(event_record)
+            session.append(event_record)
+            session.commit()
+
+    assert len(rm.heap) == 0
+
+def test_get_records_uses_indexes(stream_id, event_record):
+    records = [
+        dataclasses.replace(
+            event_record,
+            number=n,
+            topic=f'topic-{n % 2}',
+            timestamp=float(n)
+        )
+        for n in (3, 0, 2, 1, 4)
+    ]
+
+    rm = MemoryEventRecordManager()
+    with rm.session() as session:
+        for record in records:
+            session.append(record)
+        session.commit()
+
+    rm.heap.append(dataclasses.replace(event_record, stream_id='other'))
+
+    assert [r.number for r in rm.get_records(stream_id)] == [0, 1, 2, 3, 4]
+    assert [r.number for r in rm.get_records(stream_id, topic='topic-0')] == [0, 2, 4]
+    assert [r.number for r in rm.get_records(stream_id, from_number=1, to_number=3)] == [1, 2, 3]
+    assert [r.number for r in rm.get_records(stream_id, from_timestamp=1.0, to_timestamp=2.0)] == [1, 2]
+    assert [r.number for r in rm.get_records(stream_id, topic='topic-1', from_timestamp=2.0)] == [3]
+    assert len(list(rm.get_records('other'))) == 1
+    assert len(list(rm.get_records('unknown'))) == 0
+    assert [r.number for r in rm.heap] == [3, 0, 2, 1, 4, 0]
+
+def test_replace_updates_indexes(stream_id, event_record):
+    rm = MemoryEventRecordManager()
+    rm.heap.append(event_record)
+
+    with rm.session() as session:
+        session.replace(dataclasses.replace(event_record, topic='other-topic'))
+        session.commit()
+
+    assert len(list(rm.get_records(stream_id, topic=event_record.topic))) == 0
+    assert len(list(rm.get_records(stream_id, topic='other-topic'))) == 1
+
+def test_get_all_records(event_record):
+    rm = MemoryEventRecordManager()
+    with rm.session() as session:
+        for n in range(5):
+            session.append(dataclasses.replace(event_record, stream_id=f'stream-{n % 2}', number=n))
+        session.commit()
+
+    batches = list(rm.get_all_records(batch_size=2))
+    assert [[r.number for r in b.records] for b in batches] == [[0, 1], [2, 3], [4]]
+    assert [b.checkpoint for b in batches] == [2, 4, 5]
+
+    assert [r.number for b in rm.get_all_records(from_position=3) for r in b.records] == [3, 4]
+    assert len(list(rm.get_all_records(from_position=5))) == 0
+
+def test_async_append_commit_and_rollback(stream_id, event_record):
+    rm = AsyncMemoryEventRecordManager()
+
+    async def scenario():
+        async with rm.session() as session:
+            session.append(event_record)
+            await session.commit()
+
+        async with rm.session() as session:
+            session.append(dataclasses.replace(event_record, number=1))
+
+        with pytest.raises(excs.ConcurrencyError):
+            async with rm.session() as session:
+                session.append(event_record)
+                await session.commit()
+
+        return [r async for r in rm.get_records(stream_id)]
+
+    assert asyncio.run(scenario()) == [event_record]
+    assert rm.heap == [event_record]
+
+def test_get_last_record_and_delete_records(stream_id, event_record):
+    rm = MemoryEventRecordManager()
+    with rm.session() as session:
+        for n in range(4):
+            session.append(dataclasses.replace(event_record, number=n, topic=f'topic-{n % 2}'))
+        session.append(dataclasses.replace(event_record, stream_id='other'))
+        session.commit()
+
+    assert rm.get_last_record(stream_id).number == 3
+    assert rm.get_last_record(stream_id, topic='topic-0').number == 2
+    assert rm.get_last_record('unknown') is None
+
+    rm.delete_records(stream_id, to_number=1)
+
+    assert [r.number for r in rm.get_records(stream_id)] == [2, 3]
+    assert [r.number for b in rm.get_all_records() for r in b.records] == [2, 3, 0]
+    assert not rm.exists(stream_id, 0)
+
+def test_get_records_from_snapshot(stream_id, event_record):
+    rm = MemoryEventRecordManager()
+    snapshot_stream_id = f'{stream_id}:Snapshot'
+    with rm.session() as session:
+        for n in range(1, 5):
+            session.append(dataclasses.replace(event_record, number=n))
+        session.append(dataclasses.replace(event_record, stream_id=snapshot_stream_id, number=2))
+        session.commit()
+
+    snapshot, records = rm.get_records_from_snapshot(stream_id, snapshot_stream_id)
+    assert snapshot.number == 2
+    assert [r.number for r in records] == [3, 4]
@@ -0,0 +1,260 @@
+import pytest
+import uuid
+import dataclasses
+import datetime
+
+from domainpy import exceptions as excs
+from domainpy.domain.model.event import DomainEvent
+from domainpy.infrastructure.eventsourced.managers.sqlite import SQLiteEventRecordManager
+from domainpy.infrastructure.mappers import Mapper
+from domainpy.infrastructure.records import EventRecord
+from domainpy.infrastructure.recordformat import BinaryRecordFormat
+from domainpy.infrastructure.transcoder import Transcoder
+
+
+@pytest.fixture
+def database(tmp_path):
+    return str(tmp_path / 'event_store.db')
+
+@pytest.fixture
+def stream_id():
+    return str(uuid.uuid4())
+
+@pytest.fixture
+def event_record(stream_id):
+    return EventRecord(
+        stream_id=stream_id,
+        number=0,
+        topic='some-topic',
+        version=1,
+        timestamp=0.0,
+        trace_id=str(uuid.uuid4()),
+        message='event',
+        context='some-context',
+        payload={ 'some_property': { 'some_other_property': 'x' } }
+    )
+
+def test_append_commit(database, stream_id, event_record):
+    rm = SQLiteEventRecordManager(database)
+
+    with rm.session() as session:
+        session.append(event_record)
+        session.commit()
+
+    assert list(rm.get_records(stream_id)) == [event_record]
+
+def test_append_rollback(database, stream_id, event_record):
+    rm = SQLiteEventRecordManager(database)
+
+    with rm.session() as session:
+        session.append(event_record)
+
+    assert len(list(rm.get_records(stream_id))) == 0
+
+def test_append_fail_on_concurrency(database, stream_id, event_record):
+    rm = SQLiteEventRecordManager(database)
+
+    with rm.session() as session:
+        session.append(event_record)
+        session.commit()
+
+    with pytest.raises(excs.ConcurrencyError):
+        with rm.session() as session:
+            session.append(dataclasses.replace(event_record, number=1))
+            session.append(event_record)
+            session.commit()
+
+    assert len(list(rm.get_records(stream_id))) == 1
+
+def test_get_records(database, stream_id, event_record):
+    rm = SQLiteEventRecordManager(database)
+
+    with rm.session() as session:
+        for number in range(5):
+            session.append(
+                dataclasses.replace(
+                    event_record,
+                    number=number,
+                    topic=f'topic-{number % 2}',
+                    timestamp=float(number)
+                )
+            )
+        session.commit()
+
+    assert [r.number for r in rm.get_records(stream_id)] == [0, 1, 2, 3, 4]
+    assert [r.number for r in rm.get_records(stream_id, topic='topic-0')] == [0, 2, 4]
+    assert [r.number for r in rm.get_records(stream_id, from_number=1, to_number=3)] == [1, 2, 3]
+    assert [r.number for r in rm.get_records(stream_id, from_timestamp=1.0, to_timestamp=2.0)] == [1, 2]
+    assert [r.number for r in rm.get_records(
+        stream_id,
+        from_timestamp=datetime.datetime.fromtimestamp(1.0, tz=datetime.timezone.utc),
+        to_timestamp=datetime.datetime.fromtimestamp(2.0, tz=datetime.timezone.utc)
+    )] == [1, 2]
+    assert len(list(rm.get_records('unknown'))) == 0
+
+def test_records_are_durable(database, stream_id, event_record):
+    rm = SQLiteEventRecordManager(database)
+    with rm.session() as session:
+        session.append(event_record)
+        session.commit()
+    rm.close()
+
+    rm = SQLiteEventRecordManager(database)
+    assert list(rm.get_records(stream_id)) == [event_record]
+
+def test_replace_commit(database, stream_id, event_record):
+    rm = SQLiteEventRecordManager(database)
+    with rm.session() as session:
+        session.append(event_record)
+        session.commit()
+
+    with rm.session() as session:
+        session.replace(dataclasses.replace(event_record, version=2))
+        session.commit()
+
+    assert [r.version for r in rm.get_records(stream_id)] == [2]
+
+def test_replace_fail_if_not_exists(database, event_record):
+    rm = SQLiteEventRecordManager(database)
+
+    with pytest.raises(excs.ConcurrencyError):
+        with rm.session() as session:
+            session.replace(event_record)
+            session.commit()
+
+def test_binary_payload_roundtrip(database, stream_id):
+    class Event(DomainEvent):
+        some_property: str
+
+    mapper = Mapper(transcoder=Transcoder())
+    mapper.register(Event)
+
+    event_record = mapper.serialize(
+        Event(
+            __stream_id__=stream_id,
+            __number__=1,
+            __version__=1,
+            __timestamp__=0.0,
+            __trace_id__='tid',
+            __context__='some_context',
+            some_property='x'
+        )
+    )
+
+    rm = SQLiteEventRecordManager(database, record_format=BinaryRecordFormat(mapper))
+    with rm.session() as session:
+        session.append(event_record)
+        session.commit()
+
+    assert list(rm.get_records(stream_id)) == [event_record]
+
+def test_binary_payload_readable_after_schema_change(database, stream_id):
+    class Event(DomainEvent):
+        some_property: str
+
+    mapper = Mapper(transcoder=Transcoder())
+    mapper.register(Event)
+
+    event_record = mapper.serialize(
+        Event(
+            __stream_id__=stream_id,
+            __number__=1,
+            __version__=1,
+            __timestamp__=0.0,
+            __trace_id__='tid',
+            __context__='some_context',
+            some_property='x'
+        )
+    )
+
+    rm = SQLiteEventRecordManager(database, record_format=BinaryRecordFormat(mapper))
+    with rm.session() as session:
+        session.append(event_record)
+        session.commit()
+    rm.close()
+
+    # Restarted with a field added to the class
+    class Event(DomainEvent):
+        some_property: str
+        other_property: str = 'y'
+
+    mapper = Mapper(transcoder=Transcoder())
+    mapper.register(Event)
+
+    rm = SQLiteEventRecordManager(database, record_format=BinaryRecordFormat(mapper))
+    assert list(rm.get_records(stream_id)) == [event_record]
+
+def test_get_all_records(database, event_record):
+    rm = SQLiteEventRecordManager(database)
+    with rm.session() as session:
+        for n in range(5):
+            session.append(dataclasses.replace(event_record, stream_id=f'stream-{n % 2}', number=n))
+        session.commit()
+
+    batches = list(rm.get_all_records(batch_size=2))
+    assert [[r.number for r in b.records] for b in batches] == [[0, 1], [2, 3], [4]]
+
+    checkpoint = batches[0].checkpoint
+    assert [r.number for b in rm.get_all_records(from_position=checkpoint) for r in b.records] == [2, 3, 4]
+    assert len(list(rm.get_all_records(from_position=batches[-1].checkpoint))) == 0
+
+def test_get_records_many(database, event_record):
+    rm = SQLiteEventRecordManager(database)
+    with rm.session() as session:
+        for n in range(6):
+            session.append(dataclasses.replace(event_record, stream_id=f'stream-{n % 3}', number=n))
+        session.commit()
+
+    records = rm.get_records_many(['stream-0', 'stream-1', 'unknown'], from_numbers={ 'stream-1': 2 })
+
+    assert { k: [r.number for r in v] for k, v in records.items() } == {
+        'stream-0': [0, 3], 'stream-1': [4], 'unknown': []
+    }
+
+def test_get_last_record_and_delete_records(database, stream_id, event_record):
+    rm = SQLiteEventRecordManager(database)
+    with rm.session() as session:
+        for n in range(4):
+            session.append(dataclasses.replace(event_record, number=n, topic=f'topic-{n % 2}'))
+        session.commit()
+
+    assert rm.get_last_record(stream_id).number == 3
+    assert rm.get_last_record(stream_id, topic='topic-0').number == 2
+    assert rm.get_last_record('unknown') is None
+
+    rm.delete_records(stream_id, to_number=1)
+    assert [r.number for r in rm.get_records(stream_id)] == [2, 3]
+
+def test_get_records_from_snapshot(database, stream_id, event_record):
+    rm = SQLiteEventRecordManager(database)
+    snapshot_stream_id = f'{stream_id}:Snapshot'
+
+    assert rm.get_records_from_snapshot(stream_id, snapshot_stream_id) == (None, [])
+
+    with rm.session() as session:
+        for n in range(1, 5):
+            session.append(dataclasses.replace(event_record, number=n))
+        session.commit()
+
+    snapshot, records = rm.get_records_from_snapshot(stream_id, snapshot_stream_id)
+    assert snapshot is None
+    assert [r.number for r in records] == [1, 2, 3, 4]
+
+    with rm.session() as session:
+        for n in (1, 2):
+            session.append(dataclasses.replace(event_record, stream_id=snapshot_stream_id, number=n))
+        session.commit()
+
+    snapshot, records = rm.get_records_from_snapshot(stream_id, snapshot_stream_id)
+    assert (snapshot.stream_id, snapshot.number) == (snapshot_stream_id, 2)
+    assert [r.number for r in records] == [3, 4]
+
+def test_get_trace_records(database, stream_id, event_record):
+    rm = SQLiteEventRecordManager(database)
+    with rm.session() as session:
+        for n in range(4):
+            session.append(dataclasses.replace(event_record, number=n, trace_id=f'trace-{n % 2}'))
+        session.commit()
+
+    assert [r.number for r in rm.get_trace_records(stream_id, 'trace-1')] == [1, 3]
+    assert [r.number for r in rm.get_trace_records(stream_id, 'trace-0', from_number=1)] == [2]
@@ -0,0 +1,75 @@
+from domainpy.domain.model.aggregate import AggregateRoot
+from domainpy.domain.model.event import DomainEvent
+from domainpy.domain.model.value_object import Identity
+from domainpy.infrastructure.eventsourced.cache import AggregateCache, copy_aggregate
+
+
+class Aggregate(AggregateRoot):
+    def mutate(self, event):
+        self.state = getattr(self, 'state', []) + [event.__number__]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_pop_takes_entry_out():
+    cache = AggregateCache()
+    aggregate = Aggregate(Identity.create())
+
+    cache.put('sid', aggregate)
+
+    assert cache.pop('sid') is aggregate
+    assert cache.pop('sid') is None
+
+def test_evict_least_recently_used():
+    cache = AggregateCache(max_size=2)
+    for stream_id in ('a', 'b', 'c'):
+        cache.put(stream_id, Aggregate(Identity.create()))
+
+    assert len(cache) == 2
+    assert cache.pop('a') is None
+    assert cache.pop('c') is not None
+
+def test_expire_after_ttl():
+    clock = Clock()
+    cache = AggregateCache(ttl=10, clock=clock)
+    cache.put('sid', Aggregate(Identity.create()))
+
+    clock.now = 10.0
+    assert cache.pop('sid') is None
+
+def test_invalidate():
+    cache = AggregateCache()
+    cache.put('sid', Aggregate(Identity.create()))
+
+    cache.invalidate('sid')
+    assert len(cache) == 0
+
+def test_copy_aggregate_shares_events():
+    aggregate = Aggregate(Identity.create())
+    aggregate.__apply__(
+        aggregate.__stamp__(DomainEvent)(
+            __trace_id__='tid',
+            __context__='ctx',
+            __version__=1
+        )
+    )
+
+    copied = copy_aggregate(aggregate)
+    copied.state.append(2)
+
+    assert copied.__seen__[0] is aggregate.__seen__[0]
+    assert copied.__changes__[0] is aggregate.__changes__[0]
+    assert aggregate.state == [1]
+
+    copied.__changes__.clear()
+    copied.__seen__.remove(copied.__seen__[0])
+    assert len(aggregate.__changes__) == 1
+    assert len(aggregate.__seen__) == 1
+    assert copied.__retention__ is aggregate.__retention__
+    assert copied.__aggregate__ is copied
@@ -1,12 +1,13 @@
 from datetime import datetime
 from domainpy.domain.model.event import DomainEvent
 import uuid
+import asyncio
 import pytest
 from unittest import mock
 
 from domainpy.infrastructure.records import EventRecord
-from domainpy.infrastructure.eventsourced.eventstore import EventStore
-from domainpy.infrastructure.eventsourced.managers.memory import MemoryEventRecordManager
+from domainpy.infrastructure.eventsourced.eventstore import EventStore, AsyncEventStore
+from domainpy.infrastructure.eventsourced.managers.memory import MemoryEventRecordManager, AsyncMemoryEventRecordManager
 from domainpy.infrastructure.mappers import Mapper
 from domainpy.infrastructure.transcoder import Transcoder
 from domainpy.utils.bus import Bus
@@ -70,4 +71,84 @@ def test_get_events(event_mapper, record_manager, bus, event):
     events = es.get_events(stream_id=event.__stream_id__)
 
     assert len(events) == 1
-    assert events[0] == event
\ No newline at end of file
+    assert events[0] == event
+
+
+def test_upcast_stream(event_mapper, record_manager, event):
+    with record_manager.session() as session:
+        session.append(event_mapper.serialize(event))
+        session.commit()
+
+    event_mapper.register_upcaster('DomainEvent', 1, 2, lambda p: p)
+
+    es = EventStore(
+        event_mapper=event_mapper,
+        record_manager=record_manager
+    )
+    assert es.upcast_stream(event.__stream_id__, batch_size=1) == 1
+    assert es.upcast_stream(event.__stream_id__) == 0
+
+    records = list(record_manager.get_records(event.__stream_id__))
+    assert len(records) == 1
+    assert records[0].version == 2
+
+def test_async_store_and_get_events(event_mapper, record_manager, bus, bus_subscriber, event):
+    es = AsyncEventStore(
+        event_mapper=event_mapper,
+        record_manager=AsyncMemoryEventRecordManager(record_manager),
+        bus=bus
+    )
+
+    async def scenario():
+        await es.store_events([event])
+        return await es.get_events(stream_id=event.__stream_id__)
+
+    events = asyncio.run(scenario())
+
+    assert len(list(record_manager.get_records(event.__stream_id__))) == 1
+    assert len(bus_subscriber) == 1
+    assert list(events) == [event]
+
+def test_get_events_many(event_mapper, record_manager, event):
+    other_event = DomainEvent(
+        __stream_id__ = 'other-sid',
+        __number__ = 1,
+        __timestamp__ = 0.0,
+        __trace_id__ = 'tid',
+        __context__ = 'ctx',
+        __version__=1
+    )
+    with record_manager.session() as session:
+        session.append(event_mapper.serialize(event))
+        session.append(event_mapper.serialize(other_event))
+        session.commit()
+
+    es = EventStore(event_mapper=event_mapper, record_manager=record_manager)
+    streams = es.get_events_many(['sid', 'other-sid', 'unknown'], from_numbers={ 'other-sid': 2 })
+
+    assert list(streams['sid']) == [event]
+    assert len(streams['other-sid']) == 0
+    assert len(streams['unknown']) == 0
+
+def test_get_last_event_and_prune_stream(event_mapper, record_manager):
+    events = [
+        DomainEvent(
+            __stream_id__ = 'sid',
+            __number__ = number,
+            __timestamp__ = 0.0,
+            __trace_id__ = 'tid',
+            __context__ = 'ctx',
+            __version__=1
+        )
+        for number in range(1, 5)
+    ]
+
+    es = EventStore(event_mapper=event_mapper, record_manager=record_manager)
+    es.store_events(events)
+
+    assert es.get_last_event('sid') == events[-1]
+    assert es.get_last_event('unknown') is None
+
+    assert es.prune_stream('sid', retain=2) == 2
+    assert es.prune_stream('sid', retain=2) == 0
+    assert list(es.get_events('sid')) == events[2:]
@@ -1,14 +1,21 @@
 
 import pytest
+import typing
+import asyncio
 import datetime
 from unittest import mock
 
 from domainpy.domain.model.aggregate import AggregateRoot
 from domainpy.domain.model.event import DomainEvent
+from domainpy.domain.model.history import KeepNone
 from domainpy.domain.model.value_object import Identity
-from domainpy.infrastructure.eventsourced.eventstore import EventStore
-from domainpy.infrastructure.eventsourced.managers.memory import MemoryEventRecordManager
-from domainpy.infrastructure.eventsourced.repository import make_adapter, SnapshotConfiguration
+from domainpy import exceptions as excs
+from domainpy.infrastructure.eventsourced.cache import AggregateCache
+from domainpy.infrastructure.eventsourced.eventstore import EventStore, AsyncEventStore
+from domainpy.infrastructure.eventsourced.managers.memory import MemoryEventRecordManager, AsyncMemoryEventRecordManager
+from domainpy.infrastructure.eventsourced.repository import make_adapter, make_async_adapter, SnapshotConfiguration
+from domainpy.infrastructure.eventsourced.snapshotwriter import SnapshotWriter, AsyncSnapshotWriter
+from domainpy.infrastructure.eventsourced.statesnapshot import AggregateStateCodec
 from domainpy.infrastructure.mappers import Mapper
 from domainpy.infrastructure.transcoder import Transcoder
 from domainpy.infrastructure.records import EventRecord
@@ -296,3 +303,742 @@ def test_get_with_snapshot_only_newer_events(event_mapper, record_manager, event
 
     aggregate = rep.get(identity)
     assert len(aggregate.proof_of_work.mock_calls) == 1
+
+def test_async_save_and_get_concurrently(event_mapper, record_manager):
+    event_mapper.register(DomainEvent)
+
+    class Aggregate(AggregateRoot):
+        def proof_of_work(self):
+            self.__apply__(
+                self.__stamp__(DomainEvent)(
+                    __trace_id__ = 'tid',
+                    __context__ = 'ctx',
+                    __version__=1
+                )
+            )
+
+        def mutate(self, event):
+            pass
+
+    event_store = AsyncEventStore(event_mapper, AsyncMemoryEventRecordManager(record_manager))
+    rep = make_async_adapter(Aggregate, Identity)(event_store)
+
+    aggregates = [Aggregate(Identity.create()) for _ in range(3)]
+    for aggregate in aggregates:
+        aggregate.proof_of_work()
+
+    async def scenario():
+        await asyncio.gather(*(rep.save(a) for a in aggregates))
+        return await asyncio.gather(*(rep.get(a.__identity__) for a in aggregates))
+
+    loaded = asyncio.run(scenario())
+
+    assert [a.__version__ for a in loaded] == [1, 1, 1]
+    assert [a.__identity__ for a in loaded] == [a.__identity__ for a in aggregates]
+    assert asyncio.run(rep.get(Identity.create())) is None
+
+def test_get_many(event_mapper, record_manager, event_store):
+    event_mapper.register(DomainEvent)
+
+    class Aggregate(AggregateRoot):
+        def mutate(self, event):
+            pass
+
+    identities = [Identity.create() for _ in range(3)]
+
+    with record_manager.session() as session:
+        for identity in identities[:2]:
+            for number in (1, 2):
+                session.append(
+                    EventRecord(
+                        stream_id=Aggregate.create_stream_id(identity),
+                        number=number,
+                        topic=DomainEvent.__name__,
+                        version=1,
+                        timestamp=0.0,
+                        trace_id='tid',
+                        message='domain_event',
+                        context='ctx',
+                        payload={ }
+                    )
+                )
+        session.append(
+            EventRecord(
+                stream_id=Aggregate.create_snapshot_stream_id(identities[0]),
+                number=2,
+                topic=DomainEvent.__name__,
+                version=1,
+                timestamp=0.0,
+                trace_id='tid',
+                message='domain_event',
+                context='ctx',
+                payload={ }
+            )
+        )
+        session.commit()
+
+    EventSourcedRpository = make_adapter(Aggregate, Identity)
+    rep = EventSourcedRpository(
+        event_store,
+        snapshot_configuration=SnapshotConfiguration(enabled=True)
+    )
+    event_store.get_events_many = mock.Mock(wraps=event_store.get_events_many)
+
+    aggregates = rep.get_many(identities)
+
+    assert list(aggregates) == identities[:2]
+    assert [a.__version__ for a in aggregates.values()] == [2, 2]
+    # Latest snapshots in one read, events in another
+    assert event_store.get_events_many.call_count == 1
+
+def test_get_with_cache_reads_only_new_events(event_mapper, record_manager, event_store):
+    event_mapper.register(DomainEvent)
+
+    class Aggregate(AggregateRoot):
+        def proof_of_work(self):
+            self.__apply__(
+                self.__stamp__(DomainEvent)(
+                    __trace_id__ = 'tid',
+                    __context__ = 'ctx',
+                    __version__=1
+                )
+            )
+
+        def mutate(self, event):
+            pass
+
+    identity = Identity.create()
+    stream_id = Aggregate.create_stream_id(identity)
+
+    cache = AggregateCache()
+    rep = make_adapter(Aggregate, Identity)(event_store, cache=cache)
+
+    aggregate = Aggregate(identity)
+    aggregate.proof_of_work()
+    rep.save(aggregate)
+
+    event_store.get_events = mock.Mock(wraps=event_store.get_events)
+
+    first = rep.get(identity)
+    first.proof_of_work()
+    rep.save(first)
+
+    second = rep.get(identity)
+
+    assert second.__version__ == 2
+    assert second is not first
+    assert len(second.__changes__) == 0
+    event_store.get_events.assert_has_calls([
+        mock.call(stream_id, from_number=2),
+        mock.call(stream_id, from_number=3),
+    ])
+
+def test_get_with_cache_catches_up_external_events(event_mapper, record_manager, event_store):
+    event_mapper.register(DomainEvent)
+
+    class Aggregate(AggregateRoot):
+        def mutate(self, event):
+            pass
+
+    identity = Identity.create()
+    rep = make_adapter(Aggregate, Identity)(event_store, cache=AggregateCache())
+
+    def append(number):
+        with record_manager.session() as session:
+            session.append(
+                EventRecord(
+                    stream_id=Aggregate.create_stream_id(identity),
+                    number=number,
+                    topic=DomainEvent.__name__,
+                    version=1,
+                    timestamp=0.0,
+                    trace_id='tid',
+                    message='domain_event',
+                    context='ctx',
+                    payload={ }
+                )
+            )
+            session.commit()
+
+    append(1)
+    assert rep.get(identity).__version__ == 1
+
+    append(2)
+    assert rep.get(identity).__version__ == 2
+    assert [a.__version__ for a in rep.get_many([identity]).values()] == [2]
+
+    # A cached aggregate the stream no longer follows is reloaded
+    append(3)
+    append(4)
+    get_events_many = event_store.get_events_many
+    event_store.get_events_many = lambda stream_ids, from_numbers: get_events_many(
+        stream_ids,
+        from_numbers={ s: n + 1 for s, n in from_numbers.items() }
+    )
+    assert [a.__version__ for a in rep.get_many([identity]).values()] == [4]
+
+def test_save_with_cache_invalidates_on_concurrency_error(event_mapper, record_manager, event_store):
+    event_mapper.register(DomainEvent)
+
+    class Aggregate(AggregateRoot):
+        def proof_of_work(self):
+            self.__apply__(
+                self.__stamp__(DomainEvent)(
+                    __trace_id__ = 'tid',
+                    __context__ = 'ctx',
+                    __version__=1
+                )
+            )
+
+        def mutate(self, event):
+            pass
+
+    identity = Identity.create()
+    cache = AggregateCache()
+    rep = make_adapter(Aggregate, Identity)(event_store, cache=cache)
+
+    aggregate = Aggregate(identity)
+    aggregate.proof_of_work()
+    rep.save(aggregate)
+
+    stale = Aggregate(identity)
+    stale.proof_of_work()
+    with pytest.raises(excs.ConcurrencyError):
+        rep.save(stale)
+
+    assert len(cache) == 0
+    assert rep.get(identity).__version__ == 1
+
+def test_save_snapshot_with_retention(event_mapper, record_manager, event_store):
+    event_mapper.register(DomainEvent)
+
+    class Aggregate(AggregateRoot):
+        def proof_of_work(self):
+            self.__apply__(
+                self.__stamp__(DomainEvent)(
+                    __trace_id__ = 'tid',
+                    __context__ = 'ctx',
+                    __version__=1
+                )
+            )
+
+        def mutate(self, event):
+            pass
+
+        def take_snapshot(self) -> DomainEvent:
+            return DomainEvent(
+                __stream_id__=self.create_snapshot_stream_id(self.__identity__),
+                __number__=self.__version__,
+                __timestamp__=0.0,
+                __trace_id__='tid',
+                __context__='ctx',
+                __version__=1
+            )
+
+    identity = Identity.create()
+    rep = make_adapter(Aggregate, Identity)(
+        event_store,
+        snapshot_configuration=SnapshotConfiguration(
+            enabled=True,
+            every_n_events=1,
+            retain=2
+        )
+    )
+
+    for _ in range(4):
+        aggregate = rep.get(identity) or Aggregate(identity)
+        aggregate.proof_of_work()
+        rep.save(aggregate)
+
+    snapshots = record_manager.get_records(Aggregate.create_snapshot_stream_id(identity))
+    assert [r.number for r in snapshots] == [3, 4]
+    assert rep.get(identity).__version__ == 4
+
+def test_get_with_snapshot_reads_once(event_mapper, record_manager, event_store):
+    event_mapper.register(DomainEvent)
+
+    identity = Identity.create()
+
+    class Aggregate(AggregateRoot):
+        def mutate(self, event):
+            pass
+
+    with record_manager.session() as session:
+        for stream_id, number in (
+            (Aggregate.create_stream_id(identity), 1),
+            (Aggregate.create_stream_id(identity), 2),
+            (Aggregate.create_snapshot_stream_id(identity), 1),
+        ):
+            session.append(
+                EventRecord(
+                    stream_id=stream_id,
+                    number=number,
+                    topic=DomainEvent.__name__,
+                    version=1,
+                    timestamp=0.0,
+                    trace_id='tid',
+                    message='domain_event',
+                    context='ctx',
+                    payload={ }
+                )
+            )
+        session.commit()
+
+    rep = make_adapter(Aggregate, Identity)(
+        event_store,
+        snapshot_configuration=SnapshotConfiguration(enabled=True)
+    )
+    event_store.get_events = mock.Mock(wraps=event_store.get_events)
+    record_manager.get_records_from_snapshot = mock.Mock(wraps=record_manager.get_records_from_snapshot)
+
+    aggregate = rep.get(identity)
+
+    assert aggregate.__version__ == 2
+    assert len(aggregate.__seen__) == 2
+    assert record_manager.get_records_from_snapshot.call_count == 1
+    event_store.get_events.assert_not_called()
+
+def test_snapshot_counts_events_since_last_snapshot(event_mapper, record_manager, event_store):
+    event_mapper.register(DomainEvent)
+
+    class Aggregate(AggregateRoot):
+        def proof_of_work(self):
+            self.__apply__(
+                self.__stamp__(DomainEvent)(
+                    __trace_id__ = 'tid',
+                    __context__ = 'ctx',
+                    __version__=1
+                )
+            )
+
+        def mutate(self, event):
+            pass
+
+        def take_snapshot(self) -> DomainEvent:
+            return DomainEvent(
+                __stream_id__=self.create_snapshot_stream_id(self.__identity__),
+                __number__=self.__version__,
+                __timestamp__=0.0,
+                __trace_id__='tid',
+                __context__='ctx',
+                __version__=1
+            )
+
+    identity = Identity.create()
+    rep = make_adapter(Aggregate, Identity)(
+        event_store,
+        snapshot_configuration=SnapshotConfiguration(
+            enabled=True,
+            every_n_events=3
+        )
+    )
+
+    for _ in range(7):
+        aggregate = rep.get(identity) or Aggregate(identity)
+        aggregate.proof_of_work()
+        rep.save(aggregate)
+
+    snapshots = record_manager.get_records(Aggregate.create_snapshot_stream_id(identity))
+    assert [r.number for r in snapshots] == [3, 6]
+    assert rep.replay_stats.get(Aggregate.create_stream_id(identity)).events == 1
+
+def test_snapshot_with_policy(event_mapper, record_manager, event_store):
+    event_mapper.register(DomainEvent)
+
+    class Aggregate(AggregateRoot):
+        def proof_of_work(self):
+            self.__apply__(
+                self.__stamp__(DomainEvent)(
+                    __trace_id__ = 'tid',
+                    __context__ = 'ctx',
+                    __version__=1
+                )
+            )
+
+        def mutate(self, event):
+            pass
+
+        def take_snapshot(self) -> DomainEvent:
+            return DomainEvent(
+                __stream_id__=self.create_snapshot_stream_id(self.__identity__),
+                __number__=self.__version__,
+                __timestamp__=0.0,
+                __trace_id__='tid',
+                __context__='ctx',
+                __version__=1
+            )
+
+    identity = Identity.create()
+    policy = mock.Mock(measures_size=True)
+    policy.should_take_snapshot.side_effect = lambda aggregate, stats: stats.events >= 2
+    rep = make_adapter(Aggregate, Identity)(
+        event_store,
+        snapshot_configuration=SnapshotConfiguration(enabled=True, policy=policy)
+    )
+
+    aggregate = Aggregate(identity)
+    aggregate.proof_of_work()
+    rep.save(aggregate)
+
+    aggregate = rep.get(identity)
+    aggregate.proof_of_work()
+    rep.save(aggregate)
+
+    _, stats = policy.should_take_snapshot.call_args.args
+    assert stats.events == 2
+    assert stats.size > 0
+    snapshots = record_manager.get_records(Aggregate.create_snapshot_stream_id(identity))
+    assert [r.number for r in snapshots] == [2]
+
+def test_save_snapshot_with_writer(event_mapper, record_manager, event_store):
+    event_mapper.register(DomainEvent)
+
+    class Aggregate(AggregateRoot):
+        def proof_of_work(self):
+            self.__apply__(
+                self.__stamp__(DomainEvent)(
+                    __trace_id__ = 'tid',
+                    __context__ = 'ctx',
+                    __version__=1
+                )
+            )
+
+        def mutate(self, event):
+            pass
+
+        def take_snapshot(self) -> DomainEvent:
+            return DomainEvent(
+                __stream_id__=self.create_snapshot_stream_id(self.__identity__),
+                __number__=self.__version__,
+                __timestamp__=0.0,
+                __trace_id__='tid',
+                __context__='ctx',
+                __version__=1
+            )
+
+    identity = Identity.create()
+    writer = SnapshotWriter()
+    writer.request = mock.Mock(wraps=writer.request)
+    rep = make_adapter(Aggregate, Identity)(
+        event_store,
+        snapshot_configuration=SnapshotConfiguration(enabled=True, every_n_events=2),
+        snapshot_writer=writer
+    )
+
+    aggregate = Aggregate(identity)
+    aggregate.proof_of_work()
+    aggregate.proof_of_work()
+    with mock.patch.object(Aggregate, 'take_snapshot', wraps=aggregate.take_snapshot) as take_snapshot:
+        rep.save(aggregate)
+        take_snapshot.assert_not_called()
+
+    writer.close()
+
+    assert writer.request.call_count == 1
+    snapshots = record_manager.get_records(Aggregate.create_snapshot_stream_id(identity))
+    assert [r.number for r in snapshots] == [2]
+    assert rep.replay_stats.get(Aggregate.create_stream_id(identity)).events == 0
+
+    # Events saved while the snapshot is written stay counted
+    store_snapshot = rep._store_snapshot
+
+    def save_meanwhile(snapshotted):
+        later = rep.get(identity)
+        later.proof_of_work()
+        rep.save(later)
+        store_snapshot(snapshotted)
+
+    rep.snapshot_writer = mock.Mock()
+    aggregate = rep.get(identity)
+    aggregate.proof_of_work()
+    aggregate.proof_of_work()
+    rep.save(aggregate)
+
+    rep._store_snapshot = save_meanwhile
+    rep.write_snapshot(*rep.snapshot_writer.request.call_args[0][1:])
+
+    assert rep.replay_stats.get(Aggregate.create_stream_id(identity)).events == 1
+
+def test_async_save_snapshot_with_writer(event_mapper):
+    event_mapper.register(DomainEvent)
+
+    class Aggregate(AggregateRoot):
+        def proof_of_work(self):
+            self.__apply__(
+                self.__stamp__(DomainEvent)(
+                    __trace_id__ = 'tid',
+                    __context__ = 'ctx',
+                    __version__=1
+                )
+            )
+
+        def mutate(self, event):
+            pass
+
+        def take_snapshot(self) -> DomainEvent:
+            return DomainEvent(
+                __stream_id__=self.create_snapshot_stream_id(self.__identity__),
+                __number__=self.__version__,
+                __timestamp__=0.0,
+                __trace_id__='tid',
+                __context__='ctx',
+                __version__=1
+            )
+
+    record_manager = AsyncMemoryEventRecordManager()
+    identity = Identity.create()
+
+    async def run():
+        writer = AsyncSnapshotWriter()
+        rep = make_async_adapter(Aggregate, Identity)(
+            AsyncEventStore(event_mapper, record_manager),
+            snapshot_configuration=SnapshotConfiguration(enabled=True, every_n_events=1),
+            snapshot_writer=writer
+        )
+
+        aggregate = Aggregate(identity)
+        aggregate.proof_of_work()
+        await rep.save(aggregate)
+        await writer.close()
+
+    asyncio.run(run())
+
+    snapshots = record_manager.record_manager.get_records(Aggregate.create_snapshot_stream_id(identity))
+    assert [r.number for r in snapshots] == [1]
+
+def test_async_get_reads_latest_snapshot_and_prunes(event_mapper):
+    event_mapper.register(DomainEvent)
+
+    class Aggregate(AggregateRoot):
+        def proof_of_work(self):
+            self.__apply__(
+                self.__stamp__(DomainEvent)(
+                    __trace_id__ = 'tid',
+                    __context__ = 'ctx',
+                    __version__=1
+                )
+            )
+
+        def mutate(self, event):
+            pass
+
+        def take_snapshot(self) -> DomainEvent:
+            return DomainEvent(
+                __stream_id__=self.create_snapshot_stream_id(self.__identity__),
+                __number__=self.__version__,
+                __timestamp__=0.0,
+                __trace_id__='tid',
+                __context__='ctx',
+                __version__=1
+            )
+
+    record_manager = AsyncMemoryEventRecordManager()
+    rep = make_async_adapter(Aggregate, Identity)(
+        AsyncEventStore(event_mapper, record_manager),
+        snapshot_configuration=SnapshotConfiguration(enabled=True, every_n_events=1, retain=1)
+    )
+    identity = Identity.create()
+    snapshot_stream_id = Aggregate.create_snapshot_stream_id(identity)
+
+    async def run():
+        aggregate = Aggregate(identity)
+        for _ in range(3):
+            aggregate.proof_of_work()
+            await rep.save(aggregate)
+            aggregate.__changes__ = []
+
+        record_manager.get_records = mock.Mock(wraps=record_manager.get_records)
+        return await rep.get(identity)
+
+    aggregate = asyncio.run(run())
+
+    assert aggregate.__version__ == 3
+    assert [r.number for r in record_manager.record_manager.get_records(snapshot_stream_id)] == [3]
+    assert all(c.args[0] != snapshot_stream_id for c in record_manager.get_records.call_args_list)
+
+def test_state_snapshot(event_mapper, record_manager, event_store):
+    class Added(DomainEvent):
+        amount: int
+
+    event_mapper.register(Added)
+
+    mutated = []
+
+    class Aggregate(AggregateRoot):
+        total: int = 0
+        amounts: typing.List[int]
+
+        def add(self, amount):
+            self.__apply__(
+                self.__stamp__(Added)(amount=amount, __trace_id__='tid', __context__='ctx', __version__=1)
+            )
+
+        def mutate(self, event):
+            mutated.append(event)
+            self.total += event.amount
+            self.amounts = getattr(self, 'amounts', []) + [event.amount]
+
+    identity = Identity.create()
+    rep = make_adapter(Aggregate, Identity)(
+        event_store,
+        snapshot_configuration=SnapshotConfiguration(enabled=True, every_n_events=2),
+        state_codec=AggregateStateCodec()
+    )
+
+    aggregate = Aggregate(identity)
+    aggregate.add(1)
+    aggregate.add(2)
+    rep.save(aggregate)
+
+    aggregate = rep.get(identity)
+    aggregate.add(3)
+    rep.save(aggregate)
+
+    snapshots = list(record_manager.get_records(Aggregate.create_snapshot_stream_id(identity)))
+    assert [r.number for r in snapshots] == [2]
+    assert snapshots[0].topic == 'AggregateSnapshot'
+
+    mutated.clear()
+    aggregate = rep.get(identity)
+
+    assert len(mutated) == 1
+    assert aggregate.__version__ == 3
+    assert aggregate.total == 6
+    assert aggregate.amounts == [1, 2, 3]
+
+def test_state_snapshot_of_other_schema_is_ignored(event_mapper, record_manager, event_store):
+    class Added(DomainEvent):
+        amount: int
+
+    event_mapper.register(Added)
+
+    class Aggregate(AggregateRoot):
+        total: int = 0
+
+        def add(self, amount):
+            self.__apply__(
+                self.__stamp__(Added)(amount=amount, __trace_id__='tid', __context__='ctx', __version__=1)
+            )
+
+        def mutate(self, event):
+            self.total += event.amount
+
+    identity = Identity.create()
+    codec = AggregateStateCodec()
+    rep = make_adapter(Aggregate, Identity)(
+        event_store,
+        snapshot_configuration=SnapshotConfiguration(enabled=True, every_n_events=1),
+        state_codec=codec
+    )
+
+    aggregate = Aggregate(identity)
+    aggregate.add(1)
+    aggregate.add(2)
+    rep.save(aggregate)
+
+    with mock.patch.object(codec, 'schema_id', return_value=0):
+        aggregate = rep.get(identity)
+        many = rep.get_many([identity])
+
+    assert aggregate.__version__ == 2
+    assert aggregate.total == 3
+    assert many[identity].total == 3
+
+def test_get_with_retention_looks_up_event_store(event_mapper, record_manager, event_store):
+    class StandardEvent(DomainEvent):
+        pass
+
+    class CompensationEvent(DomainEvent):
+        pass
+
+    event_mapper.register(StandardEvent)
+    event_mapper.register(CompensationEvent)
+
+    class Aggregate(AggregateRoot):
+        def proof_of_work(self, event_type, trace_id):
+            self.__apply__(
+                self.__stamp__(event_type)(__trace_id__=trace_id, __context__='ctx', __version__=1)
+            )
+
+        def mutate(self, event):
+            pass
+
+    identity = Identity.create()
+    rep = make_adapter(Aggregate, Identity)(event_store, retention=KeepNone())
+
+    aggregate = Aggregate(identity)
+    aggregate.proof_of_work(StandardEvent, 'a')
+    aggregate.proof_of_work(StandardEvent, 'b')
+    aggregate.proof_of_work(CompensationEvent, 'b')
+    rep.save(aggregate)
+
+    aggregate = rep.get(identity)
+    assert aggregate.__seen__ == []
+
+    selector = aggregate.__selector__
+    assert [e.__number__ for e in selector.filter_event_type(StandardEvent)] == [1, 2]
+    assert [e.__number__ for e in selector.filter_trace('b')] == [2, 3]
+    assert len(selector.get_events_for_compensation('a', CompensationEvent, StandardEvent)) == 1
+    assert len(selector.get_events_for_compensation('b', CompensationEvent, StandardEvent)) == 0
+
+    aggregate.proof_of_work(CompensationEvent, 'a')
+    assert len(aggregate.__selector__.get_events_for_compensation('a', CompensationEvent, StandardEvent)) == 0
+
+def test_get_from_snapshot_queries_events_routed_since(event_mapper, record_manager, event_store):
+    class StandardEvent(DomainEvent):
+        pass
+
+    event_mapper.register(DomainEvent)
+    event_mapper.register(StandardEvent)
+
+    class Aggregate(AggregateRoot):
+        def proof_of_work(self, trace_id):
+            self.__apply__(
+                self.__stamp__(StandardEvent)(__trace_id__=trace_id, __context__='ctx', __version__=1)
+            )
+
+        def mutate(self, event):
+            pass
+
+        def take_snapshot(self) -> DomainEvent:
+            return DomainEvent(
+                __stream_id__=self.create_snapshot_stream_id(self.__identity__),
+                __number__=self.__version__,
+                __timestamp__=0.0,
+                __trace_id__='tid',
+                __context__='ctx',
+                __version__=1
+            )
+
+    identity = Identity.create()
+    configuration = SnapshotConfiguration(enabled=True, every_n_events=2)
+
+    aggregate = Aggregate(identity)
+    aggregate.proof_of_work('a')
+    aggregate.proof_of_work('b')
+    make_adapter(Aggregate, Identity)(event_store, snapshot_configuration=configuration).save(aggregate)
+
+    aggregate = Aggregate(identity)
+    aggregate.__version__ = 2
+    aggregate.proof_of_work('a')
+    make_adapter(Aggregate, Identity)(event_store).save(aggregate)
+
+    record_manager.get_trace_records = mock.Mock(wraps=record_manager.get_trace_records)
+
+    # Whole routed range retained, nothing is read
+    rep = make_adapter(Aggregate, Identity)(event_store, snapshot_configuration=configuration)
+    aggregate = rep.get(identity)
+    with mock.patch.object(record_manager, 'get_records') as get_records:
+        assert [e.__number__ for e in aggregate.__selector__.filter_trace('a')] == [3]
+    get_records.assert_not_called()
+    record_manager.get_trace_records.assert_not_called()
+
+    # Dropped events are read by trace since the snapshot
+    rep = make_adapter(Aggregate, Identity)(
+        event_store, snapshot_configuration=configuration, retention=KeepNone()
+    )
+    aggregate = rep.get(identity)
+    assert [e.__number__ for e in aggregate.__selector__.filter_trace('a')] == [3]
+    record_manager.get_trace_records.assert_called_once_with(
+        Aggregate.create_stream_id(identity), 'a', from_number=3
+    )
@@ -0,0 +1,125 @@
+import time
+
+from domainpy.domain.model.aggregate import AggregateRoot
+from domainpy.domain.model.event import DomainEvent
+from domainpy.domain.model.value_object import Identity
+from domainpy.infrastructure.eventsourced.snapshot import (
+    AllPolicy,
+    AnyPolicy,
+    EventCountPolicy,
+    EventTypePolicy,
+    ReplaySizePolicy,
+    ReplayStats,
+    ReplayStatsRegistry,
+    ReplayTimePolicy,
+    estimate_size,
+    replay,
+)
+
+
+class Aggregate(AggregateRoot):
+    def mutate(self, event):
+        pass
+
+
+def make_event(aggregate, number):
+    return DomainEvent(
+        __stream_id__=aggregate.create_stream_id(aggregate.__identity__),
+        __number__=number,
+        __timestamp__=0.0,
+        __trace_id__='tid',
+        __context__='ctx',
+        __version__=1
+    )
+
+
+def test_replay_records_stats():
+    aggregate = Aggregate(Identity.create())
+    events = [make_event(aggregate, n) for n in (1, 2, 3)]
+
+    stats = replay(aggregate, events, started_at=time.perf_counter(), measure_size=True)
+
+    assert aggregate.__version__ == 3
+    assert stats.events == 3
+    assert stats.seconds >= 0
+    assert stats.size == sum(estimate_size(e) for e in events) > 0
+
+def test_replay_skips_size_unless_measured():
+    aggregate = Aggregate(Identity.create())
+
+    stats = replay(aggregate, [make_event(aggregate, 1)], started_at=time.perf_counter())
+
+    assert stats.size == 0
+
+def test_extend_projects_seconds():
+    stats = ReplayStats(events=2, seconds=1.0, size=10)
+    stats.extend([object(), object()], 5)
+
+    assert stats == ReplayStats(events=4, seconds=2.0, size=15)
+
+def test_estimate_size():
+    assert estimate_size('abc') == 3
+    assert estimate_size({'a': [1, 2]}) == 17
+
+def test_registry_evicts_least_recently_used():
+    registry = ReplayStatsRegistry(max_size=2)
+    for stream_id in ('a', 'b', 'c'):
+        registry.put(stream_id, ReplayStats(events=1))
+
+    assert len(registry) == 2
+    assert registry.get('a') == ReplayStats()
+    assert registry.get('c') == ReplayStats(events=1)
+
+def test_registry_get_returns_copy():
+    registry = ReplayStatsRegistry()
+    registry.put('a', ReplayStats(events=1))
+
+    registry.get('a').events += 1
+
+    assert registry.get('a').events == 1
+
+def test_registry_discount_keeps_newer_stats():
+    registry = ReplayStatsRegistry()
+    registry.put('a', ReplayStats(events=3, seconds=3.0, size=30))
+
+    registry.discount('a', ReplayStats(events=2, seconds=2.0, size=20))
+    assert registry.get('a') == ReplayStats(events=1, seconds=1.0, size=10)
+
+    registry.discount('a', ReplayStats(events=2, seconds=2.0, size=20))
+    assert registry.get('a') == ReplayStats()
+
+    registry.discount('b', ReplayStats(events=1))
+    assert len(registry) == 1
+
+def test_policies():
+    aggregate = Aggregate(Identity.create())
+    stats = ReplayStats(events=10, seconds=0.5, size=100)
+
+    assert EventCountPolicy(10).should_take_snapshot(aggregate, stats)
+    assert not EventCountPolicy(11).should_take_snapshot(aggregate, stats)
+    assert ReplayTimePolicy(0.5).should_take_snapshot(aggregate, stats)
+    assert not ReplayTimePolicy(1).should_take_snapshot(aggregate, stats)
+    assert ReplaySizePolicy(100).should_take_snapshot(aggregate, stats)
+    assert not ReplaySizePolicy(101).should_take_snapshot(aggregate, stats)
+
+def test_event_type_policy():
+    class Stored(DomainEvent):
+        pass
+
+    aggregate = Aggregate(Identity.create())
+    policy = EventTypePolicy(Stored)
+    assert not policy.should_take_snapshot(aggregate, ReplayStats())
+
+    aggregate.__apply__(aggregate.__stamp__(Stored)(__trace_id__='tid', __context__='ctx', __version__=1))
+    assert policy.should_take_snapshot(aggregate, ReplayStats())
+
+def test_composite_policies():
+    aggregate = Aggregate(Identity.create())
+    stats = ReplayStats(events=10, seconds=0.5, size=100)
+
+    assert AnyPolicy(EventCountPolicy(100), ReplayTimePolicy(0.1)).should_take_snapshot(aggregate, stats)
+    assert not AllPolicy(EventCountPolicy(100), ReplayTimePolicy(0.1)).should_take_snapshot(aggregate, stats)
+    assert AllPolicy(EventCountPolicy(10), ReplaySizePolicy(50)).should_take_snapshot(aggregate, stats)
+
+    assert AnyPolicy(EventCountPolicy(1), ReplaySizePolicy(1)).measures_size
+    assert not AllPolicy(EventCountPolicy(1)).measures_size
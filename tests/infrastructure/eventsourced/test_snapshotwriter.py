@@ -0,0 +1,119 @@
+import pytest
+import asyncio
+import threading
+from unittest import mock
+
+from domainpy.domain.model.aggregate import AggregateRoot
+from domainpy.domain.model.value_object import Identity
+from domainpy.infrastructure.eventsourced.snapshotwriter import (
+    AsyncSnapshotWriter,
+    SnapshotHint,
+    SnapshotWriter,
+)
+
+
+class Aggregate(AggregateRoot):
+    def mutate(self, event):
+        pass
+
+
+class BlockingRepository:
+    def __init__(self):
+        self.written = []
+        self.release = threading.Event()
+
+    def write_snapshot(self, hint):
+        self.release.wait()
+        self.written.append(hint)
+
+
+def test_write_in_background():
+    identity = Identity.create()
+    repository = mock.Mock()
+    writer = SnapshotWriter()
+
+    writer.request(repository, SnapshotHint(Aggregate, identity, 1))
+    writer.flush()
+
+    repository.write_snapshot.assert_called_once_with(SnapshotHint(Aggregate, identity, 1))
+    writer.close()
+
+def test_coalesce_hints_of_same_stream():
+    identity = Identity.create()
+    other_identity = Identity.create()
+    repository = BlockingRepository()
+    writer = SnapshotWriter()
+
+    writer.request(repository, SnapshotHint(Aggregate, other_identity, 1))
+    for version in (1, 3, 2):
+        writer.request(repository, SnapshotHint(Aggregate, identity, version))
+
+    repository.release.set()
+    writer.close()
+
+    written = [(h.identity, h.version) for h in repository.written]
+    assert written == [(other_identity, 1), (identity, 3)]
+
+def test_report_errors():
+    identity = Identity.create()
+    repository = mock.Mock()
+    repository.write_snapshot.side_effect = ValueError()
+    on_error = mock.Mock()
+    writer = SnapshotWriter(on_error=on_error)
+
+    writer.request(repository, SnapshotHint(Aggregate, identity, 1))
+    writer.request(repository, SnapshotHint(Aggregate, Identity.create(), 1))
+    writer.close()
+
+    assert on_error.call_count == 2
+    assert repository.write_snapshot.call_count == 2
+
+def test_async_write_in_background():
+    identity = Identity.create()
+    written = []
+
+    class Repository:
+        async def write_snapshot(self, hint):
+            written.append(hint)
+
+    async def run():
+        writer = AsyncSnapshotWriter()
+        repository = Repository()
+        writer.request(repository, SnapshotHint(Aggregate, identity, 1))
+        writer.request(repository, SnapshotHint(Aggregate, identity, 2))
+        assert written == []
+
+        await writer.close()
+
+    asyncio.run(run())
+
+    assert written == [SnapshotHint(Aggregate, identity, 2)]
+
+def test_async_request_after_close_raises():
+    class Repository:
+        async def write_snapshot(self, hint):
+            pass
+
+    async def run():
+        writer = AsyncSnapshotWriter()
+        await writer.close()
+
+        with pytest.raises(RuntimeError):
+            writer.request(Repository(), SnapshotHint(Aggregate, Identity.create(), 1))
+
+    asyncio.run(run())
+
+def test_async_flush_returns_when_cancelled():
+    class Repository:
+        async def write_snapshot(self, hint):
+            await asyncio.sleep(60)
+
+    async def run():
+        writer = AsyncSnapshotWriter()
+        writer.request(Repository(), SnapshotHint(Aggregate, Identity.create(), 1))
+        await asyncio.sleep(0)
+
+        writer._task.cancel()
+        await asyncio.wait_for(writer.flush(), timeout=1)
+
+    asyncio.run(run())
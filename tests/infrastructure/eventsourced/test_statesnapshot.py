@@ -0,0 +1,154 @@
+import typing
+
+from domainpy.domain.model.aggregate import AggregateRoot
+from domainpy.domain.model.entity import DomainEntity
+from domainpy.domain.model.event import DomainEvent
+from domainpy.domain.model.value_object import Identity, ValueObject
+from domainpy.infrastructure.eventsourced.statesnapshot import (
+    AggregateStateCodec,
+    state_schema_id,
+)
+from domainpy.infrastructure.transcoder import ICodec, Transcoder
+
+
+class Amount(ValueObject):
+    value: int
+
+
+class Item(DomainEntity):
+    name: str
+    amount: Amount
+
+    def mutate(self, event):
+        pass
+
+
+class Aggregate(AggregateRoot):
+    total: int
+    tags: typing.List[str]
+    items: typing.Dict[str, Item]
+    last: typing.Optional[Item]
+
+    def mutate(self, event):
+        pass
+
+
+def make_aggregate():
+    aggregate = Aggregate(Identity.create())
+    aggregate.__apply__(
+        aggregate.__stamp__(DomainEvent)(__trace_id__='tid', __context__='ctx', __version__=1)
+    )
+
+    item = Item(Identity.create(), aggregate)
+    item.name = 'x'
+    item.amount = Amount(value=2)
+
+    aggregate.total = 2
+    aggregate.tags = ['a', 'b']
+    aggregate.items = {'x': item}
+    return aggregate
+
+
+def test_take_and_restore():
+    codec = AggregateStateCodec()
+    aggregate = make_aggregate()
+
+    snapshot = codec.take_snapshot(aggregate)
+    assert snapshot.__stream_id__ == aggregate.create_snapshot_stream_id(aggregate.__identity__)
+    assert snapshot.__number__ == 1
+    assert snapshot.__trace_id__ == 'tid'
+    assert snapshot.schema == state_schema_id(Aggregate)
+    assert 'last' not in snapshot.state
+
+    restored = Aggregate(aggregate.__identity__)
+    assert codec.restore(restored, snapshot)
+
+    assert restored.__version__ == 1
+    assert restored.__seen__ == []
+    assert restored.total == 2
+    assert restored.tags == ['a', 'b']
+    assert not hasattr(restored, 'last')
+
+    item = restored.items['x']
+    assert item == aggregate.items['x']
+    assert item.name == 'x'
+    assert item.amount == Amount(value=2)
+    assert item.__aggregate__ is restored
+
+def test_restore_rejects_other_schema():
+    codec = AggregateStateCodec()
+    aggregate = make_aggregate()
+    snapshot = codec.take_snapshot(aggregate)
+
+    class Aggregate(AggregateRoot):
+        total: str
+
+        def mutate(self, event):
+            pass
+
+    restored = Aggregate(aggregate.__identity__)
+    assert not codec.restore(restored, snapshot)
+    assert restored.__version__ == 0
+    assert not hasattr(restored, 'total')
+
+def test_schema_id_follows_child_entities():
+    schema_id = state_schema_id(Aggregate)
+
+    class Item(DomainEntity):
+        name: str
+        amount: int
+
+        def mutate(self, event):
+            pass
+
+    class Other(AggregateRoot):
+        total: int
+        tags: typing.List[str]
+        items: typing.Dict[str, Item]
+        last: typing.Optional[Item]
+
+        def mutate(self, event):
+            pass
+
+    assert state_schema_id(Aggregate) == schema_id
+    assert state_schema_id(Other) != schema_id
+
+
+def test_shared_transcoder_left_untouched():
+    class Tag:
+        def __init__(self, value):
+            self.value = value
+
+    class TagCodec(ICodec):
+        def can_handle(self, field_type):
+            return field_type is Tag
+
+        def encode(self, obj, field_type):
+            return obj.value
+
+        def decode(self, data, field_type):
+            return Tag(data)
+
+    class Tagged(AggregateRoot):
+        tag: Tag
+
+        def mutate(self, event):
+            pass
+
+    transcoder = Transcoder()
+    transcoder.add_codec(TagCodec())
+    codecs = list(transcoder.codecs)
+
+    codec = AggregateStateCodec(transcoder)
+    AggregateStateCodec(transcoder)
+    assert transcoder.codecs == codecs
+
+    aggregate = Tagged(Identity.create())
+    aggregate.__apply__(
+        aggregate.__stamp__(DomainEvent)(__trace_id__='tid', __context__='ctx', __version__=1)
+    )
+    aggregate.tag = Tag('x')
+
+    restored = Tagged(aggregate.__identity__)
+    assert codec.restore(restored, codec.take_snapshot(aggregate))
+    assert restored.tag.value == 'x'
@@ -8,6 +8,7 @@ from domainpy.application.command import ApplicationCommand
 from domainpy.infrastructure.mappers import Mapper
 from domainpy.infrastructure.transcoder import Transcoder
 from domainpy.infrastructure.publishers.aws_sqs import AwsSimpleQueueServicePublisher
+from domainpy.infrastructure.recordformat import BinaryRecordFormat
 
 
 @pytest.fixture
@@ -43,3 +44,21 @@ def test_sqs_publish(sqs, queue_url, queue_name, region_name):
     
     sqs_messages = sqs.receive_message(QueueUrl=queue_url)
     assert len(sqs_messages['Messages']) == 1
+
+def test_sqs_publish_with_record_format(sqs, queue_url, queue_name, region_name):
+    command = ApplicationCommand(
+        __timestamp__=0.0,
+        __trace_id__='tid',
+        __version__=1
+    )
+
+    mapper = Mapper(transcoder=Transcoder())
+    mapper.register(ApplicationCommand)
+
+    record_format = BinaryRecordFormat(mapper)
+    pub = AwsSimpleQueueServicePublisher(queue_name, mapper, record_format=record_format, region_name=region_name)
+    pub.publish(command)
+    
+    sqs_messages = sqs.receive_message(QueueUrl=queue_url)
+    record = record_format.loads_text(sqs_messages['Messages'][0]['Body'])
+    assert record == mapper.serialize(command)
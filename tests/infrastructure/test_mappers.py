@@ -1,9 +1,13 @@
+import types
+import typing
 import pytest
 
 from domainpy.application.command import ApplicationCommand
+from domainpy.exceptions import DefinitionError
 from domainpy.infrastructure.mappers import Mapper, MessageTypeNotFoundError
 from domainpy.infrastructure.transcoder import Transcoder, MessageType
-from domainpy.infrastructure.records import CommandRecord
+from domainpy.domain.model.event import DomainEvent
+from domainpy.infrastructure.records import CommandRecord, EventRecord
 
 
 def test_mapper_serialize_command():
@@ -56,3 +60,148 @@ def test_mapper_deserializer_raises_if_not_registered():
 
     with pytest.raises(MessageTypeNotFoundError):
         mapper.deserialize(record)
+
+def test_mapper_serialize_many():
+    commands = [
+        ApplicationCommand(__timestamp__=float(i), __trace_id__=f'tid{i}', __version__=1)
+        for i in range(3)
+    ]
+
+    mapper = Mapper(transcoder=Transcoder())
+    records = mapper.serialize_many(commands)
+
+    assert [r.trace_id for r in records] == ['tid0', 'tid1', 'tid2']
+    assert all(isinstance(r, CommandRecord) for r in records)
+
+def test_mapper_deserialize_many_keeps_order():
+    class Command(ApplicationCommand):
+        pass
+
+    records = [
+        CommandRecord(
+            trace_id=f'tid{i}',
+            topic='ApplicationCommand' if i % 2 == 0 else 'Command',
+            version=1,
+            timestamp=0.0,
+            message=MessageType.APPLICATION_COMMAND.value,
+            payload={ }
+        )
+        for i in range(4)
+    ]
+
+    mapper = Mapper(transcoder=Transcoder())
+    mapper.register(ApplicationCommand)
+    mapper.register(Command)
+
+    messages = mapper.deserialize_many(records)
+    assert [m.__trace_id__ for m in messages] == ['tid0', 'tid1', 'tid2', 'tid3']
+    assert [type(m) for m in messages] == [ApplicationCommand, Command, ApplicationCommand, Command]
+
+def test_mapper_deserialize_many_stream():
+    record = CommandRecord(
+        trace_id='tid',
+        topic='ApplicationCommand',
+        version=1,
+        timestamp=0.0,
+        message=MessageType.APPLICATION_COMMAND.value,
+        payload={ }
+    )
+
+    mapper = Mapper(transcoder=Transcoder())
+
+    messages = mapper.deserialize_many([record], stream=True)
+    assert isinstance(messages, types.GeneratorType)
+
+    with pytest.raises(MessageTypeNotFoundError):
+        next(messages)
+
+def test_mapper_lazy_deserialize_many():
+    class Event(DomainEvent):
+        some_property: typing.Tuple[str, ...]
+
+    records = [
+        EventRecord(
+            stream_id='sid',
+            number=i,
+            topic='Event',
+            version=1,
+            timestamp=0.0,
+            trace_id='tid',
+            message=MessageType.DOMAIN_EVENT.value,
+            context='default',
+            payload={ 'some_property': ['x'] }
+        )
+        for i in range(2)
+    ]
+
+    mapper = Mapper(transcoder=Transcoder(), lazy=True)
+    mapper.register(Event)
+
+    messages = mapper.deserialize_many(records)
+    assert [m.__number__ for m in messages] == [0, 1]
+    assert 'some_property' not in messages[0].__dict__
+    assert messages[0].some_property == ('x',)
+    assert mapper.deserialize(records[1]) == messages[1]
+
+def test_mapper_upcast_chain():
+    record = CommandRecord(
+        trace_id='tid',
+        topic='Command',
+        version=1,
+        timestamp=0.0,
+        message=MessageType.APPLICATION_COMMAND.value,
+        payload={ 'name': 'x' }
+    )
+
+    mapper = Mapper(transcoder=Transcoder())
+    mapper.register_upcaster('Command', 1, 2, lambda p: { 'full_name': p['name'] })
+    mapper.register_upcaster('Command', 2, 3, lambda p: { **p, 'age': 0 })
+
+    upcasted = mapper.upcast(record)
+    assert upcasted.version == 3
+    assert upcasted.payload == { 'full_name': 'x', 'age': 0 }
+    assert record.payload == { 'name': 'x' }
+    assert mapper.upcast(upcasted) is upcasted
+
+def test_mapper_upcast_chain_is_cached():
+    mapper = Mapper(transcoder=Transcoder())
+    mapper.register_upcaster('Command', 1, 2, lambda p: p)
+
+    chain = mapper._get_chain('default', 'Command', 1)
+    assert chain.version == 2
+    assert mapper._get_chain('default', 'Command', 1) is chain
+
+    mapper.register_upcaster('Command', 2, 3, lambda p: p)
+    assert mapper._get_chain('default', 'Command', 1).version == 3
+
+def test_mapper_register_upcaster_raises_if_invalid():
+    mapper = Mapper(transcoder=Transcoder())
+    mapper.register_upcaster('Command', 1, 2, lambda p: p)
+
+    with pytest.raises(DefinitionError):
+        mapper.register_upcaster('Command', 1, 3, lambda p: p)
+
+    with pytest.raises(DefinitionError):
+        mapper.register_upcaster('Command', 2, 2, lambda p: p)
+
+def test_mapper_deserialize_upcasts():
+    class Command(ApplicationCommand):
+        full_name: str
+
+    record = CommandRecord(
+        trace_id='tid',
+        topic='Command',
+        version=1,
+        timestamp=0.0,
+        message=MessageType.APPLICATION_COMMAND.value,
+        payload={ 'name': 'x' }
+    )
+
+    mapper = Mapper(transcoder=Transcoder())
+    mapper.register(Command)
+    mapper.register_upcaster('Command', 1, 2, lambda p: { 'full_name': p.pop('name') })
+
+    message = mapper.deserialize(record)
+    assert message.full_name == 'x'
+    assert message.__version__ == 2
+    assert mapper.deserialize_many([record])[0] == message
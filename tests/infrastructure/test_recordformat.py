@@ -0,0 +1,111 @@
+import json
+import pytest
+import typing
+
+from domainpy.domain.model.event import DomainEvent
+from domainpy.domain.model.value_object import ValueObject
+from domainpy.infrastructure.mappers import Mapper
+from domainpy.infrastructure.recordformat import JsonRecordFormat, BinaryRecordFormat, SchemaMismatchError
+from domainpy.infrastructure.transcoder import Transcoder, record_asdict
+
+
+class Attribute(ValueObject):
+    some_property: str
+
+class Event(DomainEvent):
+    some_property: Attribute
+    some_sequence: typing.Tuple[int, ...]
+
+@pytest.fixture
+def mapper():
+    mapper = Mapper(transcoder=Transcoder())
+    mapper.register(Event)
+    return mapper
+
+@pytest.fixture
+def record(mapper):
+    return mapper.serialize(
+        Event(
+            __stream_id__='sid',
+            __number__=1,
+            __version__=1,
+            __timestamp__=0.0,
+            __trace_id__='tid',
+            __context__='some_context',
+            some_property=Attribute(some_property='x'),
+            some_sequence=tuple([1, 2, 3])
+        )
+    )
+
+def test_json_roundtrip(record):
+    fmt = JsonRecordFormat()
+
+    text = fmt.dumps_text(record)
+    assert json.loads(text) == record_asdict(record)
+    assert fmt.loads_text(text) == record
+    assert fmt.loads(fmt.dumps(record)) == record
+
+def test_binary_roundtrip(mapper, record):
+    fmt = BinaryRecordFormat(mapper)
+
+    data = fmt.dumps(record)
+    assert fmt.loads(data) == record
+    assert fmt.loads(memoryview(data)) == record
+    assert fmt.loads_text(fmt.dumps_text(record)) == record
+    assert len(data) < len(JsonRecordFormat().dumps(record))
+
+def test_binary_payload_roundtrip(mapper, record):
+    fmt = BinaryRecordFormat(mapper)
+
+    data = fmt.dumps_payload(record)
+    assert b'some_sequence' not in data
+    assert fmt.loads_payload(data, record.topic, record.context) == record.payload
+
+def test_binary_schema_mismatch_raises(record):
+    class Event(DomainEvent):
+        some_other_property: str
+
+    mapper = Mapper(transcoder=Transcoder())
+    mapper.register(Event)
+
+    fmt = BinaryRecordFormat(mapper)
+    with pytest.raises(SchemaMismatchError):
+        fmt.dumps(record)
+
+def test_binary_decodes_with_writer_schema(mapper, record):
+    schemas = {}
+    data = BinaryRecordFormat(mapper, schemas).dumps(record)
+    payload_data = BinaryRecordFormat(mapper, schemas).dumps_payload(record)
+
+    # Field added before the old ones and one removed since written
+    class Event(DomainEvent):
+        some_new_property: str
+        some_sequence: typing.Tuple[int, ...]
+
+    changed = Mapper(transcoder=Transcoder())
+    changed.register(Event)
+
+    fmt = BinaryRecordFormat(changed, schemas)
+    assert fmt.loads(data) == record
+    assert fmt.loads_payload(payload_data, record.topic, record.context) == record.payload
+
+    # Upcasters see the payload as written
+    changed.register_upcaster('Event', 1, 2, lambda p: {
+        'some_new_property': p['some_property']['some_property'],
+        'some_sequence': p['some_sequence']
+    })
+    event = changed.deserialize(fmt.loads(data))
+    assert event.some_new_property == 'x'
+    assert event.some_sequence == (1, 2, 3)
+
+def test_binary_unknown_schema_raises(mapper, record):
+    data = BinaryRecordFormat(mapper).dumps(record)
+
+    class Event(DomainEvent):
+        some_other_property: str
+
+    changed = Mapper(transcoder=Transcoder())
+    changed.register(Event)
+
+    with pytest.raises(SchemaMismatchError):
+        BinaryRecordFormat(changed).loads(data)
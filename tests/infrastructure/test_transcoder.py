@@ -1,13 +1,17 @@
 import sys
+import copy
+import pickle
 import pytest
 import typing
+from unittest import mock
 
 from domainpy.application.command import ApplicationCommand
 from domainpy.application.integration import IntegrationEvent
 from domainpy.domain.model.event import DomainEvent
 from domainpy.domain.model.value_object import ValueObject
-from domainpy.infrastructure.transcoder import Transcoder, MessageType, MissingCodecError, MissingFieldValueError, ICodec, record_fromdict
+from domainpy.infrastructure.transcoder import Transcoder, MessageType, MissingCodecError, MissingFieldValueError, ICodec, record_fromdict, record_asdict
 from domainpy.infrastructure.records import CommandRecord, IntegrationRecord, EventRecord
+from domainpy.utils.data import ImmutableError
 
 def test_serialize_command():
     class Command(ApplicationCommand):
@@ -195,6 +199,17 @@ def test_decode_single_type_sequence():
     m = t.decode(tuple([ 'x' ]), typing.Tuple[str, ...])
     assert m == ('x',)
 
+def test_encode_decode_list():
+    t = Transcoder()
+    assert t.encode(['x'], typing.List[str]) == ['x']
+    assert t.decode(['x'], typing.List[str]) == ['x']
+
+def test_encode_decode_any():
+    t = Transcoder()
+    data = {'a': [1, 'b']}
+    assert t.encode(data, typing.Dict[str, typing.Any]) == data
+    assert t.decode(data, typing.Dict[str, typing.Any]) == data
+
 def test_encode_primitive():
     t = Transcoder()
     
@@ -376,4 +391,288 @@ def test_message_type_of():
     assert MessageType.of(Event) == MessageType.DOMAIN_EVENT
 
     with pytest.raises(TypeError):
-        MessageType.of(UnknownType)
\ No newline at end of file
+        MessageType.of(UnknownType)
+
+
+def test_plan_is_compiled_once_per_type():
+    class Attribute(ValueObject):
+        some_property: str
+
+    t = Transcoder()
+    assert t.get_plan(Attribute) is t.get_plan(Attribute)
+
+def test_plan_roundtrip_nested_fields():
+    class Attribute(ValueObject):
+        some_property: str
+        some_optional_property: typing.Optional[int]
+
+    class Event(DomainEvent):
+        some_sequence: typing.Tuple[Attribute, ...]
+        some_mapping: typing.Dict[str, typing.Tuple[int, ...]]
+        some_optional: typing.Optional[Attribute]
+
+    m = Event(
+        __stream_id__='sid',
+        __number__=1,
+        __version__=1,
+        __timestamp__=0.0,
+        __trace_id__='tid',
+        __context__='some_context',
+        some_sequence=tuple([
+            Attribute(some_property='x', some_optional_property=None),
+            Attribute(some_property='y', some_optional_property=1)
+        ]),
+        some_mapping={ 'x': tuple([1, 2]) },
+        some_optional=None
+    )
+
+    t = Transcoder()
+    r = t.serialize(m)
+    assert r.payload == {
+        'some_sequence': [
+            { 'some_property': 'x', 'some_optional_property': None },
+            { 'some_property': 'y', 'some_optional_property': 1 }
+        ],
+        'some_mapping': { 'x': [1, 2] },
+        'some_optional': None
+    }
+
+    d = t.deserialize(r, Event)
+    assert d.some_sequence == m.some_sequence
+    assert d.some_mapping == m.some_mapping
+    assert d.some_optional is None
+
+def test_plan_falls_back_to_custom_codec():
+    NewType = type('NewType', (), {})
+
+    class NewTypeCodec(ICodec):
+        def can_handle(self, field_type: typing.Type) -> bool:
+            return field_type is NewType
+
+        def encode(self, obj: typing.Any, field_type: typing.Type) -> typing.Any:
+            return 'encoded'
+
+        def decode(self, data: dict, field_type: typing.Type) -> typing.Any:
+            return NewType()
+
+    class Attribute(ValueObject):
+        some_property: NewType
+
+    t = Transcoder()
+    t.add_codec(NewTypeCodec())
+
+    assert t.encode(Attribute(some_property=NewType()), Attribute) == { 'some_property': 'encoded' }
+    assert isinstance(t.decode({ 'some_property': 'encoded' }, Attribute).some_property, NewType)
+
+def test_decode_missing_field_raises():
+    class Attribute(ValueObject):
+        some_property: str
+
+    t = Transcoder()
+    with pytest.raises(MissingFieldValueError):
+        t.decode({ }, Attribute)
+
+def test_deserialize_reads_record_without_copy():
+    class Event(DomainEvent):
+        some_property: typing.Tuple[str, ...]
+
+    payload = { 'some_property': ['x'] }
+    r = EventRecord(
+        stream_id='sid',
+        number=1,
+        topic='Event',
+        version=1,
+        timestamp=0.0,
+        trace_id='tid',
+        message=MessageType.DOMAIN_EVENT.value,
+        context='some_context',
+        payload=payload
+    )
+
+    t = Transcoder()
+    with mock.patch('dataclasses.asdict') as asdict:
+        m = t.deserialize(r, Event)
+        asdict.assert_not_called()
+
+    assert m.some_property == ('x',)
+    assert m.__trace_id__ == 'tid'
+    assert m.__context__ == 'some_context'
+    assert r.payload is payload
+
+def test_record_asdict_shallow():
+    r = CommandRecord(
+        trace_id='tid',
+        topic='Command',
+        version=1,
+        timestamp=0.0,
+        message=MessageType.APPLICATION_COMMAND.value,
+        payload={ 'some_property': { 'some_property': 'x' } }
+    )
+
+    dct = record_asdict(r, shallow=True)
+    assert dct == record_asdict(r)
+    assert dct['payload'] is r.payload
+    assert record_asdict(r)['payload'] is not r.payload
+
+def test_deserialize_lazy_decodes_payload_on_access():
+    class Attribute(ValueObject):
+        some_property: str
+
+    class Event(DomainEvent):
+        some_property: Attribute
+        other_property: str
+
+    r = EventRecord(
+        stream_id='sid',
+        number=1,
+        topic='Event',
+        version=1,
+        timestamp=0.0,
+        trace_id='tid',
+        message=MessageType.DOMAIN_EVENT.value,
+        context='some_context',
+        payload={ 'some_property': { 'some_property': 'x' }, 'other_property': 'y' }
+    )
+
+    t = Transcoder()
+    m = t.deserialize(r, Event, lazy=True)
+
+    assert m.__dict__['__stream_id__'] == 'sid'
+    assert m.__dict__['__number__'] == 1
+    assert m.__dict__['other_property'] == 'y'
+    assert 'some_property' not in m.__dict__
+
+    assert m.some_property == Attribute(some_property='x')
+    assert '__pending__' not in m.__dict__
+    assert m == t.deserialize(r, Event)
+
+    with pytest.raises(ImmutableError):
+        m.some_property = Attribute(some_property='z')
+
+class PickledAttribute(ValueObject):
+    some_property: str
+
+
+class PickledEvent(DomainEvent):
+    some_property: PickledAttribute
+
+
+def test_deserialize_lazy_pickles_and_copies():
+    r = EventRecord(
+        stream_id='sid',
+        number=1,
+        topic='PickledEvent',
+        version=1,
+        timestamp=0.0,
+        trace_id='tid',
+        message=MessageType.DOMAIN_EVENT.value,
+        context='some_context',
+        payload={ 'some_property': { 'some_property': 'x' } }
+    )
+
+    t = Transcoder()
+    expected = t.deserialize(r, PickledEvent)
+
+    m = t.deserialize(r, PickledEvent, lazy=True)
+    assert pickle.loads(pickle.dumps(m)) == expected
+
+    m = t.deserialize(r, PickledEvent, lazy=True)
+    assert copy.deepcopy(m) == expected
+    assert '__pending__' not in m.__dict__
+
+def test_deserialize_lazy_equality_materializes():
+    class Attribute(ValueObject):
+        some_property: str
+
+    class Event(DomainEvent):
+        some_property: Attribute
+
+    r = EventRecord(
+        stream_id='sid',
+        number=1,
+        topic='Event',
+        version=1,
+        timestamp=0.0,
+        trace_id='tid',
+        message=MessageType.DOMAIN_EVENT.value,
+        context='default',
+        payload={ 'some_property': { 'some_property': 'x' } }
+    )
+
+    t = Transcoder()
+    m = t.deserialize(r, Event, lazy=True)
+
+    assert t.deserialize(r, Event) == m
+    assert 'Attribute' in repr(t.deserialize(r, Event, lazy=True))
+    with pytest.raises(AttributeError):
+        m.unknown_property
+
+def test_deserialize_lazy_checks_missing_field():
+    class Attribute(ValueObject):
+        some_property: str
+
+    class Event(DomainEvent):
+        some_property: Attribute
+
+    r = EventRecord(
+        stream_id='sid',
+        number=1,
+        topic='Event',
+        version=1,
+        timestamp=0.0,
+        trace_id='tid',
+        message=MessageType.DOMAIN_EVENT.value,
+        context='default',
+        payload={ }
+    )
+
+    t = Transcoder()
+    with pytest.raises(MissingFieldValueError):
+        t.deserialize(r, Event, lazy=True)
+
+def test_decode_checks_types_of_strict_classes():
+    NewType = type('NewType', (), {})
+
+    class BrokenCodec(ICodec):
+        def can_handle(self, field_type: typing.Type) -> bool:
+            return field_type is NewType
+
+        def encode(self, obj: typing.Any, field_type: typing.Type) -> typing.Any:
+            return None
+
+        def decode(self, data: dict, field_type: typing.Type) -> typing.Any:
+            return None
+
+    class Command(ApplicationCommand):
+        some_property: NewType
+
+    class Event(DomainEvent):
+        some_property: NewType
+
+    t = Transcoder()
+    t.add_codec(BrokenCodec())
+
+    command_record = CommandRecord(
+        trace_id='tid',
+        topic=Command.__name__,
+        version=1,
+        timestamp=0.0,
+        message=MessageType.APPLICATION_COMMAND.value,
+        payload={ 'some_property': 'x' }
+    )
+    with pytest.raises(TypeError):
+        t.deserialize(command_record, Command)
+
+    # Events are decoded from stored data, trusted
+    event_record = EventRecord(
+        stream_id='sid',
+        number=1,
+        topic=Event.__name__,
+        version=1,
+        timestamp=0.0,
+        trace_id='tid',
+        message=MessageType.DOMAIN_EVENT.value,
+        context='some_context',
+        payload={ 'some_property': 'x' }
+    )
+    assert t.deserialize(event_record, Event).some_property is None
@@ -0,0 +1,43 @@
+import pytest
+
+from domainpy.utils.binary import BinaryFormatError, pack_value, unpack_value
+
+
+@pytest.mark.parametrize('value', [
+    None,
+    True,
+    False,
+    0,
+    1,
+    -1,
+    2 ** 63 - 1,
+    -(2 ** 63),
+    2 ** 80,
+    1.5,
+    '',
+    'x',
+    'ñ',
+    b'x',
+    [1, 'x', None],
+    { 'x': { 'y': [1.0] } }
+])
+
+
+def test_pack_unpack(value):
+    buffer = bytearray()
+    pack_value(buffer, value)
+
+    unpacked, offset = unpack_value(memoryview(buffer), 0)
+    assert unpacked == value
+    assert type(unpacked) is type(value)
+    assert offset == len(buffer)
+
+
+def test_pack_unsupported_raises():
+    with pytest.raises(BinaryFormatError):
+        pack_value(bytearray(), object())
+
+
+def test_unpack_unknown_tag_raises():
+    with pytest.raises(BinaryFormatError):
+        unpack_value(b'\xff', 0)
@@ -1,8 +1,11 @@
 
 import pytest
+import copy
 import typing
 
-from domainpy.utils.data import SystemData, ImmutableError, UnsupportedAnnotationInStrError
+from domainpy.application.command import ApplicationCommand
+from domainpy.domain.model.event import DomainEvent
+from domainpy.utils.data import SystemData, ImmutableError, UnsupportedAnnotationInStrError, Validation, ValidationLevel
 
 
 def test_constructor():
@@ -142,4 +145,156 @@ def test_fail_if_str_annotations():
                     'some_property': 'str'
                 }
             }
-        )
\ No newline at end of file
+        )
+
+
+def test_schema_precomputed_per_class():
+    class Message(SystemData):
+        __meta_property__: str
+        some_property: str
+        some_defaulted_property: str = 'x'
+
+    schema = Message.__schema__
+    assert [f.name for f in schema.fields] == ['__meta_property__', 'some_property', 'some_defaulted_property']
+    assert [f.name for f in schema.meta_fields] == ['__meta_property__']
+    assert [f.name for f in schema.payload_fields] == ['some_property', 'some_defaulted_property']
+    assert schema.required == frozenset(['__meta_property__', 'some_property'])
+    assert schema.defaults == { 'some_defaulted_property': 'x' }
+    assert schema.record_names == { '__meta_property__': 'meta_property' }
+
+    with pytest.raises(TypeError):
+        schema.defaults['some_property'] = 'y'
+
+def test_schema_not_shared_with_subclass():
+    class Message(SystemData):
+        some_property: str
+
+    class SubMessage(Message):
+        some_other_property: str
+
+    assert len(Message.__schema__.fields) == 1
+    assert len(SubMessage.__schema__.fields) == 2
+
+def test_trusted_construction_skips_type_checking():
+    class Message(SystemData):
+        some_property: str
+
+    x = Message.__trusted__(some_property=1)
+    assert x.some_property == 1
+    assert x == Message.__trusted__(some_property=1)
+
+    with pytest.raises(TypeError):
+        Message.__trusted__()
+
+def test_trusted_construction_with_custom_init():
+    class Message(SystemData):
+        some_property: str
+
+        def __init__(self, some_property) -> None:
+            self.__dict__.update({ 'some_property': some_property.upper() })
+
+    x = Message.__trusted__(some_property='x')
+    assert x.some_property == 'X'
+
+def test_validation_off():
+    class Message(SystemData):
+        __validation__ = Validation(ValidationLevel.OFF)
+
+        some_property: str
+
+    x = Message(some_property=1)
+    assert x.some_property == 1
+
+def test_validation_sampled():
+    class Message(SystemData):
+        __validation__ = Validation(ValidationLevel.SAMPLED, sample_rate=0.0)
+
+        some_property: str
+
+    Message(some_property=1)
+
+    Message.__validation__.configure(ValidationLevel.SAMPLED, sample_rate=1.0)
+    with pytest.raises(TypeError):
+        Message(some_property=1)
+
+    with pytest.raises(ValueError):
+        Message.__validation__.configure(ValidationLevel.SAMPLED, sample_rate=2.0)
+
+    with pytest.raises(ValueError):
+        Validation(ValidationLevel.SAMPLED, sample_rate=-0.5)
+
+def test_default_validation():
+    class Message(SystemData):
+        some_property: str
+
+    class Command(ApplicationCommand):
+        some_property: str
+
+    SystemData.set_default_validation(ValidationLevel.OFF)
+    try:
+        Message(some_property=1)
+
+        # Commands keep type checking at the edge
+        with pytest.raises(TypeError):
+            Command(__timestamp__=0.0, __version__=1, some_property=1)
+    finally:
+        SystemData.set_default_validation(ValidationLevel.STRICT)
+
+    with pytest.raises(TypeError):
+        Message(some_property=1)
+
+def test_compact():
+    class Message(SystemData, compact=True):
+        some_property: str
+        some_defaulted_property: str = 'x'
+
+    m = Message(some_property='y', some_other_property=1)
+
+    assert Message.__compact__
+    assert 'some_property' in Message.__slots__
+    assert m.some_property == 'y'
+    assert m.some_defaulted_property == 'x'
+    assert m.some_other_property == 1
+    assert Message.some_defaulted_property == 'x'
+    assert Message.__schema__.defaults == { 'some_defaulted_property': 'x' }
+    assert m == Message(some_property='y')
+    assert m != Message(some_property='y', some_defaulted_property='z')
+    assert 'some_property' in repr(m)
+
+    with pytest.raises(ImmutableError):
+        m.some_property = 'z'
+
+    with pytest.raises(TypeError):
+        Message(some_property=1)
+
+def test_compact_is_inherited():
+    class Message(SystemData, compact=True):
+        some_property: str
+
+    class OtherMessage(Message):
+        some_other_property: str
+
+    m = OtherMessage(some_property='x', some_other_property='y')
+
+    assert OtherMessage.__compact__
+    assert OtherMessage.__slots__ == ('some_other_property',)
+    assert m.some_property == 'x'
+    assert m.some_other_property == 'y'
+    assert copy.deepcopy(m) == m
+
+def test_compact_event_keeps_trace():
+    class Event(DomainEvent, compact=True):
+        some_property: str
+
+    e = Event(
+        __stream_id__='sid',
+        __number__=1,
+        __timestamp__=0.0,
+        __version__=1,
+        __trace_id__='tid',
+        some_property='x'
+    )
+
+    assert e.__trace_id__ == 'tid'
+    assert e.__context__ == Event.__context__
+    assert e.__message__ == 'domain_event'
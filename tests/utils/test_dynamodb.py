@@ -0,0 +1,76 @@
+import pytest
+
+from boto3.dynamodb.types import TypeSerializer
+
+from domainpy.infrastructure.records import EventRecord
+from domainpy.utils.dynamodb import (
+    serialize,
+    client_serialize,
+    client_deserialize,
+    client_serialize_record,
+    client_deserialize_record,
+)
+
+
+@pytest.mark.parametrize('value', [
+    'x',
+    1,
+    -1,
+    1.5,
+    True,
+    None,
+    b'x',
+    { 'some_property': [1, 'x', { 'some_other_property': None }] },
+    ['x', 1.5],
+    { 'x', 'y' },
+    { 1, 2 },
+])
+
+
+def test_serialize_matches_boto3(value):
+    expected = TypeSerializer().serialize(serialize(value))
+
+    serialized = client_serialize(value)
+    assert serialized.keys() == expected.keys()
+    assert client_deserialize(serialized) == value
+
+
+def test_serialize_tuple_as_list():
+    assert client_serialize(('x', 1)) == { 'L': [{ 'S': 'x' }, { 'N': '1' }] }
+
+
+def test_serialize_raises_on_nan():
+    with pytest.raises(TypeError):
+        client_serialize(float('nan'))
+
+
+def test_serialize_raises_on_unsupported():
+    with pytest.raises(TypeError):
+        client_serialize(object())
+
+
+def test_deserialize_numbers():
+    assert client_deserialize({ 'N': '10' }) == 10
+    assert isinstance(client_deserialize({ 'N': '10' }), int)
+    assert isinstance(client_deserialize({ 'N': '1.0' }), int)
+    assert client_deserialize({ 'N': '0.25' }) == 0.25
+    assert client_deserialize({ 'N': '1e3' }) == 1000
+    assert isinstance(client_deserialize({ 'N': '123456789012345678901234567890.5' }), float)
+
+
+def test_record_roundtrip():
+    record = EventRecord(
+        stream_id='sid',
+        number=1,
+        topic='Event',
+        version=1,
+        timestamp=0.5,
+        trace_id='tid',
+        message='domain_event',
+        context='ctx',
+        payload={ 'some_property': 'x' }
+    )
+
+    attribute = client_serialize_record(record)
+    assert attribute['M']['number'] == { 'N': '1' }
+    assert client_deserialize_record(attribute, EventRecord) == record